@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -8,17 +9,107 @@ class Settings(BaseSettings):
     OPENROUTER_MODEL: str = "arcee-ai/trinity-large-preview:free"
     DATABASE_URL: str
 
+    OPENROUTER_BASE_URL: str = Field(default="https://openrouter.ai/api/v1", description="OpenAI-compatible API base URL")
+
+    # Fallback / hedging across models
+    OPENROUTER_FALLBACK_MODELS: str = Field(default="", description="Comma-separated models tried after OPENROUTER_MODEL")
+    OPENROUTER_MAX_ATTEMPTS: int = Field(default=3, description="Upstream attempts before the first token (across models)")
+    OPENROUTER_RETRY_BACKOFF_MS: int = Field(default=250, description="Base of the exponential retry backoff")
+    OPENROUTER_HEDGE_AFTER_MS: int = Field(default=0, description="Start a hedged request to the next model if no token by then (0 = off)")
+
+    # OpenRouter HTTP client (shared for the app lifetime)
+    OPENROUTER_HTTP2: bool = Field(default=True, description="Use HTTP/2 to OpenRouter when h2 is installed")
+    OPENROUTER_MAX_CONNECTIONS: int = Field(default=20, description="Max concurrent upstream connections")
+    OPENROUTER_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=10, description="Idle connections kept warm")
+    OPENROUTER_KEEPALIVE_EXPIRY_SECONDS: float = Field(default=120.0, description="Idle time before a kept-alive connection is closed")
+    OPENROUTER_CONNECT_TIMEOUT_SECONDS: float = Field(default=5.0, description="Connect / pool-acquire timeout")
+    OPENROUTER_READ_TIMEOUT_SECONDS: float = Field(default=60.0, description="Max gap between streamed chunks")
+
     # Rate limiting
     RATE_LIMIT_MAX_REQUESTS: int = Field(default=20, description="Max requests per window")
     RATE_LIMIT_WINDOW_SECONDS: int = Field(default=60, description="Rate limit window in seconds")
+    RATE_LIMIT_BACKEND: Literal["memory", "database"] = Field(default="memory", description="Per-process counters, or shared counters in the app database")
+    RATE_LIMIT_KEY: Literal["session", "ip", "both"] = Field(default="session", description="What a rate limit is counted per")
+    RATE_LIMIT_TRUST_PROXY_HEADERS: bool = Field(default=False, description="Take the client IP from X-Forwarded-For / X-Real-IP")
+    RATE_LIMIT_TRUSTED_PROXY_HOPS: int = Field(default=1, description="Trusted proxies in front of the app; the client IP is the X-Forwarded-For entry this many from the right")
+    RATE_LIMIT_EVICT_INTERVAL_SECONDS: int = Field(default=60, description="How often idle rate-limit keys are evicted")
 
     # RAG settings
     CHUNK_SIZE: int = Field(default=300, description="Text chunk size for embeddings")
     CHUNK_OVERLAP: int = Field(default=50, description="Overlap between chunks")
+    CHUNK_SIZE_UNIT: Literal["chars", "tokens"] = Field(default="chars", description="Unit of CHUNK_SIZE / CHUNK_OVERLAP; tokens = embedding-model tokens, capped at its max sequence length so chunks are never truncated")
+    PDF_WORKERS: int = Field(default=0, description="Processes extracting and cleaning PDF pages in parallel (0 = one per CPU, 1 = in-process)")
     TOP_K_RESULTS: int = Field(default=8, description="Number of top results from vector search")
     MAX_CHAT_HISTORY: int = Field(default=10, description="Max chat history messages to include in context")
+    HISTORY_CACHE_MAX_SESSIONS: int = Field(default=1000, description="Sessions whose recent turns are cached in memory (0 = off)")
+    HISTORY_CACHE_TTL_SECONDS: int = Field(default=300, description="Re-read a cached session from the database after this long")
+    HISTORY_WRITE_BATCH_SIZE: int = Field(default=100, description="Max chat messages per bulk insert")
+    HISTORY_WRITE_FLUSH_MS: int = Field(default=50, description="Max time a queued chat message waits before being written")
+    HISTORY_WRITE_QUEUE_SIZE: int = Field(default=10000, description="Queued chat messages before writers wait (backpressure)")
+
+    # Prompt budgeting (tokens counted with the local embedding tokenizer; <= 0 disables a budget)
+    CONTEXT_TOKEN_BUDGET: int = Field(default=1200, description="Max tokens of retrieved context in the prompt")
+    HISTORY_TOKEN_BUDGET: int = Field(default=600, description="Max tokens of chat history in the prompt")
+    MIN_CHUNK_SIMILARITY: float = Field(default=0.2, description="Drop vector hits below this cosine similarity (keyword matches are kept)")
+
+    # Retrieval
+    RETRIEVAL_MODE: Literal["vector", "hybrid"] = Field(default="hybrid", description="vector = cosine search only; hybrid = fuse with a BM25 keyword index")
+    HYBRID_CANDIDATES: int = Field(default=20, description="Candidates taken from each retriever before fusion")
+    RRF_K: int = Field(default=60, description="Reciprocal-rank fusion constant (higher flattens rank differences)")
+
+    EMBEDDING_BACKEND: Literal["sentence-transformers", "onnx", "remote"] = Field(default="sentence-transformers", description="Embedding inference backend (onnx avoids importing torch; remote uses the shared embedding pool)")
+    EMBEDDING_ONNX_MODEL_FILE: str = Field(default="onnx/model_quint8_avx2.onnx", description="ONNX export in the model repo (or a local path)")
+    EMBEDDING_ONNX_THREADS: int = Field(default=0, description="ONNX Runtime intra-op threads (0 = runtime default)")
+    EMBEDDING_MAX_SEQ_LENGTH: int = Field(default=256, description="Token truncation for the onnx backend (matches the model's max_seq_length)")
+
+    # Shared embedding pool (python -m app.embedding_server; EMBEDDING_BACKEND=remote)
+    EMBEDDING_POOL_ADDRESS: str = Field(default="127.0.0.1:6010", description="host:port or unix socket path of the embedding pool")
+    EMBEDDING_POOL_AUTHKEY: str = Field(default="", description="Shared secret between API processes and the pool (required; the pool unpickles what it receives)")
+    EMBEDDING_POOL_WORKERS: int = Field(default=0, description="Pool worker processes (0 = one per core)")
+    EMBEDDING_POOL_WORKER_BACKEND: Literal["sentence-transformers", "onnx"] = Field(default="sentence-transformers", description="Backend each pool worker runs")
+
+    EMBEDDING_MICROBATCH_ENABLED: bool = Field(default=True, description="Merge concurrent query encodes into one forward pass")
+    EMBEDDING_MICROBATCH_MAX_SIZE: int = Field(default=32, description="Max queries per micro-batch")
+    EMBEDDING_MICROBATCH_MAX_WAIT_MS: float = Field(default=2.0, description="How long a micro-batch waits for more queries")
+    EMBEDDING_EXECUTOR_WORKERS: int = Field(default=2, description="Threads running embedding inference for async callers")
+    EMBEDDING_BATCH_SIZE: int = Field(default=64, description="Chunks per forward pass during ingestion")
+
+    # Query-embedding cache
+    EMBEDDING_CACHE_MAX_MB: float = Field(default=16.0, description="Memory budget of the query-embedding cache")
+    EMBEDDING_CACHE_TTL_SECONDS: int = Field(default=86400, description="Lifetime of a cached query embedding")
+    EMBEDDING_CACHE_PATH: str = Field(default="", description="SQLite file for the on-disk cache tier (empty = memory only)")
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES: int = Field(default=100000, description="Row cap of the on-disk cache tier (oldest rows are deleted first)")
+
+    # Semantic answer cache
+    ANSWER_CACHE_ENABLED: bool = Field(default=True, description="Replay cached answers for near-identical questions")
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = Field(default=0.95, description="Min cosine similarity to reuse an answer")
+    ANSWER_CACHE_MAX_ENTRIES: int = Field(default=500, description="Max cached answers")
+    ANSWER_CACHE_TTL_SECONDS: int = Field(default=3600, description="Lifetime of a cached answer")
+    CORPUS_VERSION_TTL_SECONDS: int = Field(default=30, description="How often the corpus version is re-checked")
+
+    # Vector store backend: "pgvector" queries Postgres on every request,
+    # "memory" serves kNN from an in-process matrix synced from pgvector
+    VECTOR_STORE_BACKEND: Literal["pgvector", "memory"] = Field(default="pgvector", description="Retrieval backend")
+    VECTOR_INDEX_PATH: str = Field(default="", description="File prefix to persist / memory-map the in-process index")
+
+    # pgvector schema / ANN index (see app/services/vector_schema.py)
+    VECTOR_STORAGE: Literal["vector", "halfvec"] = Field(default="vector", description="Embedding column type; halfvec (pgvector >= 0.7) halves storage and I/O")
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat", "none"] = Field(default="hnsw", description="ANN index on document_embeddings (none = exact scans)")
+    HNSW_M: int = Field(default=16, description="HNSW graph degree (build time)")
+    HNSW_EF_CONSTRUCTION: int = Field(default=64, description="HNSW build candidate list size")
+    HNSW_EF_SEARCH: int = Field(default=40, description="HNSW search candidate list size, set on every query (>= top-k)")
+    IVFFLAT_LISTS: int = Field(default=0, description="IVFFlat lists (0 = rows / 1000)")
+    IVFFLAT_PROBES: int = Field(default=10, description="IVFFlat lists probed per query")
+
+    # Vector store connection pool
+    VECTOR_DB_POOL_MIN_SIZE: int = Field(default=1, description="Connections kept open in each pgvector pool")
+    VECTOR_DB_POOL_MAX_SIZE: int = Field(default=10, description="Max connections in each pgvector pool")
+    VECTOR_DB_POOL_TIMEOUT_SECONDS: float = Field(default=10.0, description="Max wait for a free pooled connection")
+    VECTOR_DB_POOL_MAX_IDLE_SECONDS: float = Field(default=300.0, description="Close pooled connections idle for longer than this")
 
     # Message constraints
+    SSE_COALESCE_MS: int = Field(default=25, description="Group streamed tokens into one SSE frame per this many ms (0 = per token)")
+    SSE_COALESCE_MAX_BYTES: int = Field(default=512, description="Flush a coalesced frame early at this size (0 = no cap)")
     MAX_MESSAGE_LENGTH: int = Field(default=1000, description="Max length of user message")
 
     class Config:
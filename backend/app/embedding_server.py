@@ -0,0 +1,189 @@
+"""
+Multi-process embedding pool shared by all API workers.
+
+Runs N worker processes (default: one per core), each loading the embedding
+model once. API processes started with EMBEDDING_BACKEND=remote send texts
+over a local `multiprocessing.connection` socket along with the name of a
+SharedMemory block they allocated; a worker encodes the texts and writes the
+float32 result into that block, so vectors never go through pickling. The API
+process owns the block and unlinks it (its resource tracker does so if it dies
+mid-request), so nothing leaks when a reply is never read. Web workers
+(I/O-bound) and embedding workers (CPU-bound) can then be scaled separately.
+
+Usage:
+    python -m app.embedding_server                # EMBEDDING_POOL_WORKERS, default = cores
+    python -m app.embedding_server --workers 2
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from app.config import settings
+from app.services.embedding_backends import load_backend, parse_pool_address
+
+logger = logging.getLogger("embedding_server")
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+_model = None
+
+
+# ── Pool worker side ───────────────────────────────────────────────────────
+def _init_worker(threads: int) -> None:
+    """Load the model once per worker process, with a fair share of the cores."""
+    global _model
+    # Must be set before torch / onnxruntime spin up their thread pools
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    _model = load_backend(
+        settings.EMBEDDING_POOL_WORKER_BACKEND,
+        MODEL_NAME,
+        onnx_model_file=settings.EMBEDDING_ONNX_MODEL_FILE,
+        max_seq_length=settings.EMBEDDING_MAX_SEQ_LENGTH,
+        threads=threads,
+    )
+    if settings.EMBEDDING_POOL_WORKER_BACKEND == "sentence-transformers":
+        import torch
+
+        torch.set_num_threads(threads)
+    logger.info(f"Embedding worker {os.getpid()} ready ({threads} threads)")
+
+
+def _attach(name: str) -> SharedMemory:
+    """Open the client's shared-memory block without taking ownership of it."""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    shm = SharedMemory(name=name)
+    # Before 3.13 attaching registers the block with this process's resource
+    # tracker, which would unlink it at exit; the client unlinks it
+    if os.name == "posix":
+        resource_tracker.unregister(f"/{shm.name.lstrip('/')}", "shared_memory")
+    return shm
+
+
+def _encode_into_shm(name: str, texts: list[str], batch_size: int) -> tuple[int, ...]:
+    """Encode *texts* into the client's shared-memory block *name*; returns the shape."""
+    vectors = np.ascontiguousarray(_model.encode(texts, batch_size=batch_size), dtype=np.float32)
+    shm = _attach(name)
+    try:
+        if vectors.nbytes > shm.size:
+            raise ValueError(f"{vectors.nbytes} bytes of vectors do not fit the {shm.size}-byte block")
+        np.ndarray(vectors.shape, dtype=np.float32, buffer=shm.buf)[...] = vectors
+        return vectors.shape
+    finally:
+        shm.close()
+
+
+def _dimension() -> int:
+    return int(_model.encode(["dimension"], batch_size=1).shape[1])
+
+
+def _count_tokens(text: str) -> int:
+    return _model.count_tokens(text)
+
+
+# ── Server side ────────────────────────────────────────────────────────────
+def _serve_connection(conn, pool: ProcessPoolExecutor, dimension: int) -> None:
+    """Handle requests from one API process until it disconnects."""
+    try:
+        while True:
+            try:
+                op, payload = conn.recv()
+            except (EOFError, ConnectionResetError):
+                return
+            try:
+                if op == "encode":
+                    name, texts, batch_size = payload
+                    result = pool.submit(_encode_into_shm, name, texts, batch_size).result()
+                elif op == "dimension":
+                    result = dimension
+                elif op == "count_tokens":
+                    result = pool.submit(_count_tokens, payload).result()
+                elif op == "ping":
+                    result = "pong"
+                else:
+                    raise ValueError(f"Unknown operation {op!r}")
+                conn.send(("ok", result))
+            except Exception as e:
+                logger.error(f"Embedding request failed: {e}")
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding worker pool")
+    parser.add_argument("--workers", type=int, default=settings.EMBEDDING_POOL_WORKERS,
+                        help="Worker processes (0 = one per core)")
+    parser.add_argument("--address", default=settings.EMBEDDING_POOL_ADDRESS,
+                        help="host:port or a unix socket path")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s │ %(levelname)-8s │ %(name)s │ %(message)s",
+    )
+
+    # Connections carry pickles, so the key is all that stands between a local
+    # process and code execution in the pool: never fall back to a known value
+    if not settings.EMBEDDING_POOL_AUTHKEY:
+        print("  ✗ EMBEDDING_POOL_AUTHKEY is not set; refusing to start without a shared secret")
+        sys.exit(1)
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or cores
+    threads = max(1, cores // workers)
+    address = parse_pool_address(args.address)
+
+    print(f"{'─' * 50}")
+    print("🧠 Portfolio RAG — Embedding pool")
+    print(f"{'─' * 50}")
+    print(f"  Workers : {workers} × {threads} thread(s) ({settings.EMBEDDING_POOL_WORKER_BACKEND})")
+    print(f"  Address : {args.address}")
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,))
+    # Load the model in every worker now rather than on the first requests
+    for f in [pool.submit(_count_tokens, "warmup") for _ in range(workers)]:
+        f.result()
+    dimension = pool.submit(_dimension).result()
+    print(f"  ✓ Model loaded in every worker ({dimension}-d vectors)")
+
+    listener = Listener(address, authkey=settings.EMBEDDING_POOL_AUTHKEY.encode())
+    stop = threading.Event()
+
+    def shutdown(*_):
+        stop.set()
+        listener.close()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print("  ✓ Accepting connections (Ctrl+C to stop)")
+    try:
+        while not stop.is_set():
+            try:
+                conn = listener.accept()
+            except OSError:
+                break
+            except Exception as e:
+                # e.g. AuthenticationError from a client with the wrong key
+                logger.warning(f"Rejected connection: {e}")
+                continue
+            threading.Thread(target=_serve_connection, args=(conn, pool, dimension), daemon=True).start()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        print("  ✓ Embedding pool stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Ingest documents (PDF, plain text, Markdown) into the vector store.
+
+Each file is one source: its stored chunks are synced with the file (see
+vector_store.sync_documents), so re-running only embeds what changed.
+Files flow through a pipeline of stages, each in its own thread, connected
+by bounded queues:
+
+    extract (+ clean) → chunk → embed → store
+
+While one document is embedded (the model releases the GIL) the previous
+one is written to Postgres and the next is extracted; the queues cap how
+many documents are in flight. Large PDFs are extracted across a process
+pool (PDF_WORKERS). Chunking follows CHUNK_SIZE / CHUNK_OVERLAP /
+CHUNK_SIZE_UNIT.
+
+With --watch the inputs are re-scanned every --interval seconds and only
+files whose content hash changed are re-ingested; chunks of deleted files
+are removed.
+
+Usage:
+    python -m app.ingest app/data
+    python -m app.ingest "reports/**/*.pdf" notes.md
+    python -m app.ingest docs/ --watch --interval 5
+    python -m app.ingest app/data --prune     # also drop legacy chunks no document claims
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from app.config import settings
+from app.services.embeddings import generate_embeddings
+from app.services.pdf_loader import iter_pdf_pages
+from app.services.text_chunker import iter_chunks
+from app.services.vector_store import SyncPlan, SyncResult, apply_sync, plan_sync, prune_unclaimed, count as vs_count
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md", ".markdown")
+
+
+@dataclass
+class _Document:
+    source: str                      # path (relative to the working directory when inside it)
+    digest: str = ""                 # sha256 of the file contents ("" once deleted)
+    deleted: bool = False
+    pieces: list[str] | None = None
+    chunks: list[str] = field(default_factory=list)
+    plan: SyncPlan | None = None
+    embeddings: list = field(default_factory=list)
+    result: SyncResult | None = None
+    error: str | None = None
+
+
+# ── Discovery ──────────────────────────────────────────────────────────────
+def discover(inputs: list[str]) -> list[str]:
+    """Supported files under *inputs* (files, directories walked recursively, or globs)."""
+    found: set[str] = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _dirs, files in os.walk(item):
+                found.update(os.path.join(root, name) for name in files)
+        elif any(c in item for c in "*?["):
+            found.update(glob.glob(item, recursive=True))
+        elif os.path.isfile(item):
+            found.add(item)
+    return sorted(
+        _source_name(path)
+        for path in found
+        if path.lower().endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(path)
+    )
+
+
+def _source_name(path: str) -> str:
+    """Relative paths match the sources the loader scripts use (e.g. app/data/…)."""
+    rel = os.path.relpath(path)
+    return os.path.abspath(path) if rel.startswith("..") else rel
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ── Stages (each returns the number of units it processed) ────────────────
+def _extract(doc: _Document) -> int:
+    if doc.deleted:
+        doc.pieces = []
+        return 0
+    if doc.source.lower().endswith(".pdf"):
+        # Same text as extract_text_from_pdf: non-empty pages joined by blank lines
+        pages = [page for page in iter_pdf_pages(doc.source) if page]
+        doc.pieces = [piece for i, page in enumerate(pages) for piece in ((page,) if i == 0 else ("\n\n", page))]
+        units = len(pages)
+    else:
+        with open(doc.source, encoding="utf-8") as f:
+            doc.pieces = f.readlines()
+        units = 1
+    if not any(piece.strip() for piece in doc.pieces):
+        raise ValueError("no text could be extracted")
+    return units
+
+
+def _chunk(doc: _Document) -> int:
+    doc.chunks = list(iter_chunks(
+        doc.pieces, chunk_size=settings.CHUNK_SIZE, overlap=settings.CHUNK_OVERLAP, unit=settings.CHUNK_SIZE_UNIT,
+    ))
+    doc.pieces = None
+    return len(doc.chunks)
+
+
+def _embed(doc: _Document) -> int:
+    doc.plan = plan_sync(doc.source, doc.chunks)
+    doc.embeddings = list(generate_embeddings(doc.plan.new_chunks)) if doc.plan.to_add else []
+    return len(doc.embeddings)
+
+
+def _store(doc: _Document) -> int:
+    doc.result = apply_sync(doc.plan, doc.embeddings)
+    doc.embeddings = []
+    r = doc.result
+    return r.added + r.removed + r.adopted + r.linked
+
+
+class _Stage:
+    """One pipeline stage: a thread moving documents from its inbox to the next stage."""
+
+    def __init__(self, name: str, unit: str, fn: Callable[[_Document], int], inbox: queue.Queue, outbox: queue.Queue):
+        self.name = name
+        self.unit = unit
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.docs = 0
+        self.units = 0
+        self.busy = 0.0
+        self.thread = threading.Thread(target=self._run, name=f"ingest-{name}", daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            doc = self.inbox.get()
+            if doc is None:                       # end of input: pass it on
+                self.outbox.put(None)
+                return
+            if doc.error is None:
+                start = time.perf_counter()
+                try:
+                    self.units += self.fn(doc)
+                    self.docs += 1
+                except Exception as e:
+                    doc.error = f"{self.name}: {e}"
+                self.busy += time.perf_counter() - start
+            # Failed documents still travel on, so they are reported in order
+            self.outbox.put(doc)
+
+
+def run_pipeline(docs: list[_Document], queue_size: int) -> tuple[list[_Document], list[_Stage], float]:
+    """Push *docs* through the stages; returns them (in order), the stages and wall time."""
+    specs = [("extract", "pages", _extract), ("chunk", "chunks", _chunk), ("embed", "chunks", _embed), ("store", "rows", _store)]
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(specs) + 1)]
+    stages = [_Stage(name, unit, fn, queues[i], queues[i + 1]) for i, (name, unit, fn) in enumerate(specs)]
+
+    start = time.perf_counter()
+    for stage in stages:
+        stage.thread.start()
+
+    def feed():
+        for doc in docs:
+            queues[0].put(doc)
+        queues[0].put(None)
+
+    threading.Thread(target=feed, name="ingest-feed", daemon=True).start()
+
+    done: list[_Document] = []
+    while (doc := queues[-1].get()) is not None:
+        _report(doc)
+        done.append(doc)
+    return done, stages, time.perf_counter() - start
+
+
+# ── Output ─────────────────────────────────────────────────────────────────
+def _report(doc: _Document) -> None:
+    if doc.error:
+        print(f"  ✗ {doc.source}: {doc.error}")
+        return
+    r = doc.result
+    if doc.deleted:
+        print(f"  ✓ {doc.source}: deleted, removed {r.removed} chunks")
+        return
+    print(f"  ✓ {doc.source}: {r.added + r.unchanged + r.adopted + r.linked} chunks (added {r.added}, "
+          f"removed {r.removed}, unchanged {r.unchanged}" + (f", adopted {r.adopted}" if r.adopted else "")
+          + (f", shared {r.linked}" if r.linked else "") + ")")
+
+
+def _summary(done: list[_Document], stages: list[_Stage], wall: float) -> None:
+    print(f"\n  {'stage':<8} {'docs':>5} {'units':>14} {'busy':>8} {'throughput':>18}")
+    for s in stages:
+        rate = s.units / s.busy if s.busy else 0.0
+        print(f"  {s.name:<8} {s.docs:>5} {s.units:>7,} {s.unit:<6} {s.busy:>7.2f}s {rate:>10,.1f} {s.unit}/s")
+
+    ok = [d for d in done if not d.error]
+    failed = len(done) - len(ok)
+    added = sum(d.result.added for d in ok)
+    removed = sum(d.result.removed for d in ok)
+    unchanged = sum(d.result.unchanged for d in ok)
+    # Busy time summed over stages vs wall time shows how much the stages overlapped
+    overlap = sum(s.busy for s in stages) / wall if wall else 0.0
+    print(f"\n  {'✓' if not failed else '✗'} {len(ok)}/{len(done)} files in {wall:.2f}s "
+          f"({len(ok) / wall if wall else 0:,.1f} files/s, {overlap:.1f}× stage overlap)")
+    print(f"  ✓ Chunks: added {added}, removed {removed}, unchanged {unchanged}")
+
+
+def ingest(paths: list[str], digests: dict[str, str], queue_size: int, deleted: list[str] = ()) -> list[_Document]:
+    """Run one pipeline pass over *paths* (+ *deleted* sources); prints progress and a summary."""
+    docs = [_Document(source=p, digest=digests.get(p, "")) for p in paths]
+    docs += [_Document(source=p, deleted=True) for p in deleted]
+    done, stages, wall = run_pipeline(docs, queue_size)
+    _summary(done, stages, wall)
+    return done
+
+
+def _changed_files(paths: list[str], known: dict[str, str], stat_cache: dict[str, tuple]) -> tuple[list[str], dict[str, str]]:
+    """Files whose content hash differs from *known*; stat() first so unchanged files aren't re-read."""
+    changed: list[str] = []
+    digests: dict[str, str] = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature = (st.st_mtime_ns, st.st_size)
+            if path in known and stat_cache.get(path) == signature:
+                continue
+            digest = file_digest(path)
+        except OSError:
+            continue                           # vanished between scan and read
+        stat_cache[path] = signature
+        if known.get(path) != digest:
+            changed.append(path)
+            digests[path] = digest
+    return changed, digests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns (.pdf, .txt, .md)")
+    parser.add_argument("--watch", action="store_true", help="Keep re-ingesting files whose contents change")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between scans in --watch mode")
+    parser.add_argument("--queue-size", type=int, default=2, help="Documents buffered between stages")
+    parser.add_argument("--prune", action="store_true",
+                        help="Afterwards, delete stored chunks no document claims (legacy rows without a source)")
+    args = parser.parse_args()
+
+    print(f"{'─' * 50}")
+    print("📚 Portfolio RAG — Document Ingestion")
+    print(f"{'─' * 50}")
+
+    paths = discover(args.inputs)
+    if not paths and not args.watch:
+        print(f"  ✗ No {', '.join(SUPPORTED_EXTENSIONS)} files found in: {' '.join(args.inputs)}")
+        sys.exit(1)
+    print(f"  ✓ {len(paths)} files (chunk_size={settings.CHUNK_SIZE}, overlap={settings.CHUNK_OVERLAP} "
+          f"{settings.CHUNK_SIZE_UNIT})\n")
+
+    # Content hash per ingested file; failed files are recorded too, so they are
+    # retried once they change rather than on every scan
+    known: dict[str, str] = {}
+    stat_cache: dict[str, tuple] = {}
+    _, digests = _changed_files(paths, known, stat_cache)
+    done = ingest(paths, digests, args.queue_size)
+    known.update({d.source: d.digest for d in done})
+    if args.prune:
+        print(f"  ✓ Pruned {prune_unclaimed()} unclaimed chunks")
+    print(f"  ✓ Total documents in collection: {vs_count()}")
+
+    if not args.watch:
+        print(f"\n{'─' * 50}")
+        failed = sum(1 for d in done if d.error)
+        print("✅ Ingestion complete!" if not failed else f"⚠️  Ingestion finished with {failed} failed file(s)")
+        print(f"{'─' * 50}")
+        sys.exit(1 if failed else 0)
+
+    print(f"\n👀 Watching {' '.join(args.inputs)} every {args.interval:g}s (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(args.interval)
+            paths = discover(args.inputs)
+            changed, digests = _changed_files(paths, known, stat_cache)
+            present = set(paths)
+            deleted = [p for p in known if p not in present]
+            if not changed and not deleted:
+                continue
+            print(f"\n[{time.strftime('%H:%M:%S')}] {len(changed)} changed, {len(deleted)} deleted")
+            for doc in ingest(changed, digests, args.queue_size, deleted):
+                if doc.deleted and not doc.error:
+                    known.pop(doc.source, None)
+                    stat_cache.pop(doc.source, None)
+                elif not doc.deleted:
+                    known[doc.source] = doc.digest
+    except KeyboardInterrupt:
+        print("\n  ✓ Stopped watching")
+
+
+if __name__ == "__main__":
+    main()
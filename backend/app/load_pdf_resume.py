@@ -1,14 +1,16 @@
 """
-One-time script to ingest the PDF resume into the vector store.
+Ingest the PDF resume into the vector store.
+Re-running it syncs the stored chunks with the current PDF.
 
 Usage:
     python -m app.load_pdf_resume
 """
 
 import sys
+import time
 from app.services.pdf_loader import extract_text_from_pdf
 from app.services.text_chunker import chunk_text
-from app.services.vector_store import add_documents, count as vs_count
+from app.services.vector_store import sync_documents, count as vs_count
 from app.config import settings
 
 PDF_PATH = "app/data/Aman-Paswan-Resume.pdf"
@@ -21,16 +23,28 @@ def main():
 
     # 1. Extract text
     print(f"\n[1/3] Extracting text from: {PDF_PATH}")
+    pages = 0
+
+    def _progress(done: int, chars: int) -> None:
+        nonlocal pages
+        pages = done
+        print(f"\r  … {done} pages, {chars:,} characters", end="", flush=True)
+
+    start = time.perf_counter()
     try:
-        text = extract_text_from_pdf(PDF_PATH)
+        text = extract_text_from_pdf(PDF_PATH, progress=_progress)
     except (FileNotFoundError, ValueError, RuntimeError) as e:
-        print(f"  ✗ Error: {e}")
+        print(f"\n  ✗ Error: {e}")
         sys.exit(1)
-    print(f"  ✓ Extracted {len(text):,} characters")
+    elapsed = time.perf_counter() - start
+    print(f"\r  ✓ Extracted {len(text):,} characters from {pages} pages in {elapsed:.2f}s "
+          f"({pages / elapsed if elapsed else 0:,.1f} pages/s)")
 
     # 2. Chunk text
-    print(f"\n[2/3] Chunking text (chunk_size={settings.CHUNK_SIZE}, overlap={settings.CHUNK_OVERLAP})")
-    chunks = chunk_text(text, chunk_size=settings.CHUNK_SIZE, overlap=settings.CHUNK_OVERLAP)
+    print(f"\n[2/3] Chunking text (chunk_size={settings.CHUNK_SIZE}, overlap={settings.CHUNK_OVERLAP} {settings.CHUNK_SIZE_UNIT})")
+    chunks = chunk_text(
+        text, chunk_size=settings.CHUNK_SIZE, overlap=settings.CHUNK_OVERLAP, unit=settings.CHUNK_SIZE_UNIT
+    )
     print(f"  ✓ Created {len(chunks)} chunks")
 
     # Show chunk preview
@@ -41,9 +55,15 @@ def main():
         print(f"    … and {len(chunks) - 3} more")
 
     # 3. Store in vector DB (with deduplication)
-    print(f"\n[3/3] Storing in vector DB (existing: {vs_count()} docs)")
-    added = add_documents(chunks)
-    print(f"  ✓ Added {added} new chunks (skipped {len(chunks) - added} duplicates)")
+    # Incremental sync: chunks from an older version of the resume are removed
+    print(f"\n[3/3] Syncing with vector DB (existing: {vs_count()} docs)")
+    start = time.perf_counter()
+    result = sync_documents(PDF_PATH, chunks)
+    elapsed = time.perf_counter() - start
+    print(f"  ✓ Added {result.added}, removed {result.removed}, unchanged {result.unchanged}"
+          + (f", adopted {result.adopted} legacy rows" if result.adopted else "")
+          + (f", shared {result.linked} with other documents" if result.linked else ""))
+    print(f"  ✓ Embedded + stored in {elapsed:.2f}s ({result.added / elapsed if elapsed else 0:,.1f} new chunks/s)")
     print(f"  ✓ Total documents in collection: {vs_count()}")
 
     print(f"\n{'─' * 50}")
@@ -2,19 +2,29 @@
 Ingest portfolio_data.txt into the vector store.
 Run this whenever the portfolio data file is updated.
 
+By default only the difference is applied: new chunks are embedded and
+inserted, vanished ones deleted, in a single transaction. `--full` restores
+the old behaviour of wiping this document's chunks and re-embedding all.
+
 Usage:
-    python -m app.load_portfolio_data
+    python -m app.load_portfolio_data [--full]
 """
 
+import argparse
 import sys
+import time
 from app.services.text_chunker import chunk_text
-from app.services.vector_store import add_documents, wipe_collection, count as vs_count
+from app.services.vector_store import add_documents, sync_documents, wipe_collection, count as vs_count
 from app.config import settings
 
 DATA_PATH = "app/data/portfolio_data.txt"
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Ingest portfolio_data.txt into the vector store")
+    parser.add_argument("--full", action="store_true", help="wipe and re-embed instead of syncing")
+    args = parser.parse_args()
+
     print("─" * 50)
     print("📋 Portfolio RAG — Text Data Ingestion")
     print("─" * 50)
@@ -30,8 +40,10 @@ def main():
     print(f"  ✓ Loaded {len(text):,} characters")
 
     # 2. Chunk text
-    print(f"\n[2/3] Chunking (chunk_size={settings.CHUNK_SIZE}, overlap={settings.CHUNK_OVERLAP})")
-    chunks = chunk_text(text, chunk_size=settings.CHUNK_SIZE, overlap=settings.CHUNK_OVERLAP)
+    print(f"\n[2/3] Chunking (chunk_size={settings.CHUNK_SIZE}, overlap={settings.CHUNK_OVERLAP} {settings.CHUNK_SIZE_UNIT})")
+    chunks = chunk_text(
+        text, chunk_size=settings.CHUNK_SIZE, overlap=settings.CHUNK_OVERLAP, unit=settings.CHUNK_SIZE_UNIT
+    )
     print(f"  ✓ Created {len(chunks)} chunks")
     for i, chunk in enumerate(chunks[:3]):
         preview = chunk[:80].replace("\n", " ")
@@ -39,12 +51,24 @@ def main():
     if len(chunks) > 3:
         print(f"    … and {len(chunks) - 3} more")
 
-    # 3. Wipe old chunks (safe — keeps collection reference valid) then re-add
-    print(f"\n[3/3] Wiping old chunks and storing {len(chunks)} new chunks…")
-    removed = wipe_collection()
-    print(f"  ✓ Removed {removed} old chunks")
-    added = add_documents(chunks)
-    print(f"  ✓ Added {added} chunks")
+    start = time.perf_counter()
+    if args.full:
+        # 3. Wipe this document's chunks then re-add everything
+        print(f"\n[3/3] Wiping old chunks and storing {len(chunks)} new chunks…")
+        removed = wipe_collection(source=DATA_PATH)
+        print(f"  ✓ Removed {removed} old chunks")
+        added = add_documents(chunks, source=DATA_PATH)
+        print(f"  ✓ Added {added} chunks")
+    else:
+        # 3. Incremental sync: embed/insert only new chunks, delete vanished ones
+        print(f"\n[3/3] Syncing {len(chunks)} chunks (existing: {vs_count()} docs)…")
+        result = sync_documents(DATA_PATH, chunks)
+        added = result.added
+        print(f"  ✓ Added {result.added}, removed {result.removed}, unchanged {result.unchanged}"
+              + (f", adopted {result.adopted} legacy rows" if result.adopted else "")
+              + (f", shared {result.linked} with other documents" if result.linked else ""))
+    elapsed = time.perf_counter() - start
+    print(f"  ✓ Embedded + stored in {elapsed:.2f}s ({added / elapsed if elapsed else 0:,.1f} new chunks/s)")
     print(f"  ✓ Total documents in collection: {vs_count()}")
 
     print("\n" + "─" * 50)
@@ -3,7 +3,13 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from .database import Base, engine
+from .models import ChatHistory
+from .services import corpus_watch, db_pool, embeddings, history_writer, metrics, openrouter, rate_limiter, retrieval, vector_schema, vector_store
+from .services.answer_cache import answer_cache
+from .services.history_cache import history_cache
 
 logger = logging.getLogger(__name__)
 
@@ -22,16 +28,54 @@ async def lifespan(app: FastAPI):
     
     logger.info("Creating database tables (if not exists)…")
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes of tables that already exist
+    for index in ChatHistory.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
     
     # Pre-load embedding model to avoid first-request latency
-    from .services.embeddings import generate_embedding
+    from .services.embeddings import generate_embedding, shutdown_executor
     logger.info("Pre-warming embedding model...")
-    generate_embedding("warmup")
+    generate_embedding("warmup", use_cache=False)
+
+    # Create the vector table / ANN index if missing, open the pgvector connection
+    # pool so the first chat skips the handshake, and watch the corpus so cached
+    # answers are dropped when it changes
+    if db_pool.is_postgres_url():
+        try:
+            await run_in_threadpool(vector_schema.ensure_schema)
+            await db_pool.open_async_pool()
+            await corpus_watch.start_watching()
+        except Exception as e:
+            logger.warning(f"Could not connect to pgvector at startup (will retry lazily): {e}")
+
+    # Chat messages are persisted in batches by a background writer
+    history_writer.start()
+
+    # Shared OpenRouter client with a pre-warmed connection
+    await openrouter.start_client()
+
+    # Load the in-process vector index (no-op unless VECTOR_STORE_BACKEND=memory)
+    try:
+        await vector_store.start_memory_index()
+    except Exception as e:
+        logger.warning(f"In-process vector index not loaded (will sync on first query): {e}")
+
+    # Build the BM25 keyword index for hybrid retrieval (no-op with RETRIEVAL_MODE=vector)
+    try:
+        await retrieval.start_lexical_index()
+    except Exception as e:
+        logger.warning(f"BM25 index not built (will build on first query): {e}")
     
     logger.info("Portfolio backend is ready ✓")
     yield
     # Shutdown
     logger.info("Shutting down…")
+    await history_writer.stop()
+    await openrouter.close_client()
+    await corpus_watch.stop_watching()
+    await db_pool.close_async_pool()
+    db_pool.close_sync_pool()
+    shutdown_executor()
 
 
 # ── FastAPI app ────────────────────────────────────────────────────────────
@@ -68,4 +112,35 @@ app.include_router(chat.router, prefix="/api", tags=["Chat"])
 # ── Health check ───────────────────────────────────────────────────────────
 @app.get("/health", tags=["System"])
 async def health_check():
-    return {"status": "ok", "service": "portfolio-rag-backend"}
\ No newline at end of file
+    return {"status": "ok", "service": "portfolio-rag-backend"}
+
+
+@app.get("/health/db", tags=["System"])
+async def health_db():
+    result = await db_pool.ping()
+    return JSONResponse(
+        status_code=200 if result["ok"] else 503,
+        content={"status": "ok" if result["ok"] else "unavailable", "vector_db": result},
+    )
+
+
+# ── Prometheus metrics (per-stage chat latency, see services/metrics.py) ───
+@app.get("/metrics", tags=["System"], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# ── Runtime stats ──────────────────────────────────────────────────────────
+@app.get("/stats", tags=["System"])
+async def stats():
+    return {
+        "vector_db_pool": db_pool.pool_stats(),
+        "embedding_cache": embeddings.cache_stats(),
+        "embedding_batcher": embeddings.batcher_stats(),
+        "retrieval": retrieval.lexical_stats(),
+        "answer_cache": answer_cache.stats(),
+        "openrouter": openrouter.client_stats(),
+        "rate_limiter": rate_limiter.rate_limiter.stats(),
+        "history_cache": history_cache.stats(),
+        "history_writer": history_writer.stats(),
+    }
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import BigInteger, Column, Float, Index, Integer, String, Text, DateTime
 from sqlalchemy.sql import func
 from .database import Base
 
 
 class ChatHistory(Base):
     __tablename__ = "chat_history"
+    __table_args__ = (
+        # Serves "newest N messages of a session" and keyset pagination without a sort
+        Index("ix_chat_history_session_created", "session_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(100), index=True, nullable=False)
@@ -13,4 +17,15 @@ class ChatHistory(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     def __repr__(self):
-        return f"<ChatHistory(id={self.id}, session_id={self.session_id!r}, role={self.role!r})>"
\ No newline at end of file
+        return f"<ChatHistory(id={self.id}, session_id={self.session_id!r}, role={self.role!r})>"
+
+
+class RateLimitCounter(Base):
+    """Sliding-window counter per rate-limit key (see services/rate_limiter.py)."""
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(255), primary_key=True)
+    window_start = Column(BigInteger, nullable=False)     # epoch seconds
+    previous_count = Column(Integer, nullable=False, default=0)
+    current_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Float, nullable=False, index=True)  # epoch seconds, for eviction
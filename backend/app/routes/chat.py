@@ -1,11 +1,21 @@
+import asyncio
+import json
 import logging
-import time
-from collections import defaultdict
-from fastapi import APIRouter, HTTPException
+import math
+
+import anyio
+from fastapi import APIRouter, HTTPException, Query, Request
+from sqlalchemy import and_, or_
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 from ..database import SessionLocal
 from ..models import ChatHistory
-from ..services.rag_pipeline import build_messages
+from ..services import corpus_watch, history_writer, metrics, rate_limiter
+from ..services.answer_cache import answer_cache, replay_tokens
+from ..services.history_cache import history_cache
+from ..services.embeddings import generate_embedding_array_async
+from ..services.rag_pipeline import build_messages_async
+from ..services.sse import coalesce
 from ..services.openrouter import stream_openrouter
 from ..config import settings
 from sse_starlette.sse import EventSourceResponse
@@ -13,28 +23,76 @@ from sse_starlette.sse import EventSourceResponse
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# ── Simple in-memory rate limiter ──────────────────────────────────────────
-_rate_limit_store: dict[str, list[float]] = defaultdict(list)
-
-
-def _check_rate_limit(session_id: str):
-    """Raise 429 if the session has exceeded the rate limit."""
-    now = time.time()
-    window = settings.RATE_LIMIT_WINDOW_SECONDS
-    max_requests = settings.RATE_LIMIT_MAX_REQUESTS
-
-    # Prune timestamps outside the window
-    _rate_limit_store[session_id] = [
-        ts for ts in _rate_limit_store[session_id] if now - ts < window
-    ]
+# ── Rate limiting (see services/rate_limiter.py) ───────────────────────────
+async def _check_rate_limit(session_id: str, http_request: Request):
+    """Raise 429 if the session and/or client IP has exceeded the rate limit."""
+    ip = rate_limiter.client_ip(http_request.headers, http_request.client.host if http_request.client else None)
+    keys = rate_limiter.rate_limit_keys(session_id, ip)
+    if settings.RATE_LIMIT_BACKEND == "database":
+        rejected = await run_in_threadpool(rate_limiter.check, keys)
+    else:
+        rejected = rate_limiter.check(keys)
 
-    if len(_rate_limit_store[session_id]) >= max_requests:
+    if rejected is not None:
+        window = settings.RATE_LIMIT_WINDOW_SECONDS
+        max_requests = settings.RATE_LIMIT_MAX_REQUESTS
         raise HTTPException(
             status_code=429,
             detail=f"Rate limit exceeded. Max {max_requests} requests per {window}s.",
+            headers={"Retry-After": str(max(1, math.ceil(rejected.retry_after)))},
         )
 
-    _rate_limit_store[session_id].append(now)
+
+# ── History (reads are sync SQLAlchemy via run_in_threadpool; writes are
+#    queued to the write-behind writer, see services/history_writer.py) ─────
+def _load_recent_history(db, session_id: str) -> list[dict]:
+    """The newest MAX_CHAT_HISTORY messages of a session, oldest first."""
+    rows = (
+        db.query(ChatHistory.role, ChatHistory.message)
+        .filter(ChatHistory.session_id == session_id)
+        .order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc())
+        .limit(settings.MAX_CHAT_HISTORY)
+        .all()
+    )
+    return [{"role": role, "message": message} for role, message in reversed(rows)]
+
+
+def _load_and_cache_history(session_id: str) -> list[dict]:
+    with SessionLocal() as db:
+        history = _load_recent_history(db, session_id)
+    history_cache.load(session_id, history)
+    return history
+
+
+async def _get_history(session_id: str) -> list[dict]:
+    """Recent turns for the prompt, from the per-session cache when possible."""
+    history = history_cache.get(session_id)
+    if history is None:
+        history = await run_in_threadpool(_load_and_cache_history, session_id)
+    return history
+
+
+# ── Semantic answer cache ──────────────────────────────────────────────────
+async def _lookup_cached_answer(query_embedding, chat_history: list[dict]) -> tuple[str | None, str | None]:
+    """
+    Return (cached answer or None, corpus version the answer must match).
+    The version is None when the turn must bypass the cache: answers are keyed
+    by the question alone, so only the first turn of a conversation (no prior
+    history a follow-up could refer to) may be replayed or stored.
+    """
+    if not settings.ANSWER_CACHE_ENABLED or chat_history:
+        return None, None
+    try:
+        corpus_version = await corpus_watch.get_version()
+    except Exception as e:
+        logger.warning(f"Answer cache bypassed, corpus version unavailable: {e}")
+        return None, None
+    return answer_cache.lookup(query_embedding, corpus_version), corpus_version
+
+
+async def _replay(answer: str):
+    for token in replay_tokens(answer):
+        yield token
 
 
 # ── Request / Response schemas ─────────────────────────────────────────────
@@ -45,7 +103,7 @@ class ChatRequest(BaseModel):
 
 # ── Chat endpoint ──────────────────────────────────────────────────────────
 @router.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     # Validate message length
     if len(request.message) > settings.MAX_MESSAGE_LENGTH:
         raise HTTPException(
@@ -53,95 +111,160 @@ async def chat(request: ChatRequest):
             detail=f"Message too long. Max {settings.MAX_MESSAGE_LENGTH} characters.",
         )
 
+    # Every stage below is timed (see services/metrics.py)
+    timing = metrics.start_request()
+
     # Rate limit check
-    _check_rate_limit(request.session_id)
+    try:
+        with metrics.stage("rate_limit"):
+            await _check_rate_limit(request.session_id, http_request)
+    except HTTPException:
+        metrics.REQUESTS.inc("rate_limited")
+        raise
+    except Exception as e:
+        # A shared-backend outage shouldn't take the chat down with it
+        logger.error(f"Rate limiter unavailable, allowing request: {e}")
 
-    # Save user message to DB
+    # Load recent history, then queue the user message for persistence
     try:
-        db = SessionLocal()
-        db.add(ChatHistory(
-            session_id=request.session_id,
-            role="user",
-            message=request.message,
-        ))
-        db.commit()
-
-        # Load recent chat history for conversational memory
-        history_rows = (
-            db.query(ChatHistory)
-            .filter(ChatHistory.session_id == request.session_id)
-            .order_by(ChatHistory.created_at.asc())
-            .limit(settings.MAX_CHAT_HISTORY)
-            .all()
-        )
-        chat_history = [{"role": row.role, "message": row.message} for row in history_rows]
-        db.close()
+        with metrics.stage("history_load"):
+            chat_history = await _get_history(request.session_id)
+        with metrics.stage("history_save"):
+            await history_writer.enqueue(request.session_id, "user", request.message)
     except Exception as e:
-        logger.error(f"Database error while saving user message: {e}")
+        metrics.REQUESTS.inc("error")
+        logger.error(f"Database error while loading chat history: {e}")
         raise HTTPException(status_code=500, detail="Internal server error.")
 
-    # Build RAG-augmented messages
+    # Encode the query once: it keys the answer cache and drives retrieval.
+    # On a semantic cache hit the stored answer is replayed without calling the LLM.
+    # (retrieval / prompt_build are timed inside build_messages_async)
     try:
-        messages = build_messages(request.message, chat_history=chat_history)
+        with metrics.stage("embedding"):
+            query_embedding = await generate_embedding_array_async(request.message)
+        with metrics.stage("answer_cache"):
+            cached_answer, corpus_version = await _lookup_cached_answer(query_embedding, chat_history)
+        messages = None
+        if cached_answer is None:
+            messages = await build_messages_async(
+                request.message, chat_history=chat_history, query_embedding=query_embedding
+            )
     except Exception as e:
+        metrics.REQUESTS.inc("error")
         logger.error(f"Error building RAG messages: {e}")
         raise HTTPException(status_code=500, detail="Failed to process your question.")
 
-    # Stream response via SSE
+    # Stream response via SSE, tokens coalesced into frames (see services/sse.py)
     async def event_generator():
-        full_response = ""
+        parts: list[str] = []
+        full_response: str | None = None
+        outcome = "cached" if cached_answer is not None else "ok"
 
+        if cached_answer is not None:
+            tokens = _replay(cached_answer)
+        else:
+            tokens = metrics.timed_stream(stream_openrouter(messages), timing)
+        frames = coalesce(tokens, settings.SSE_COALESCE_MS, settings.SSE_COALESCE_MAX_BYTES)
         try:
-            async for token in stream_openrouter(messages):
-                full_response += token
-                yield {"data": token}
+            async for frame in frames:
+                parts.append(frame)
+                yield {"data": frame}
+            if cached_answer is None and parts and corpus_version is not None:
+                answer_cache.store(request.message, query_embedding, "".join(parts), corpus_version)
         except RuntimeError as e:
             # Friendly error from our openrouter wrapper
             yield {"data": str(e)}
             full_response = f"[Error] {e}"
+            outcome = "error"
+        except asyncio.CancelledError:
+            # The browser went away: sse_starlette cancels us; stop paying for tokens nobody reads
+            logger.info(f"Client disconnected after {sum(map(len, parts))} chars; aborting upstream stream")
+            outcome = "disconnected"
+            raise
         except Exception as e:
             logger.error(f"Unexpected streaming error: {e}")
             yield {"data": "Sorry, something went wrong. Please try again."}
             full_response = f"[Error] {e}"
+            outcome = "error"
+        finally:
+            # Shielded: on disconnect this runs inside an already-cancelled scope
+            with anyio.CancelScope(shield=True):
+                await frames.aclose()
+                if full_response is None:
+                    full_response = "".join(parts)
+                # Queue the assistant response; the write-behind writer commits it off the request path
+                try:
+                    with metrics.stage("history_save"):
+                        await history_writer.enqueue(request.session_id, "assistant", full_response)
+                except Exception as e:
+                    logger.error(f"Failed to queue assistant response: {e}")
+                metrics.REQUESTS.inc(outcome)
 
-        # Save assistant response in a NEW session (the Depends session is already closed)
-        try:
-            save_db = SessionLocal()
-            save_db.add(ChatHistory(
-                session_id=request.session_id,
-                role="assistant",
-                message=full_response,
-            ))
-            save_db.commit()
-            save_db.close()
-        except Exception as e:
-            logger.error(f"Failed to save assistant response: {e}")
+        # Not reached on disconnect. Named event: clients that only read
+        # `data:` text must skip it (see frontend ChatContext).
+        timing.finish()
+        yield {"event": "timing", "data": json.dumps(timing.as_dict())}
 
-    return EventSourceResponse(event_generator())
+    # Stages up to here are known before the first byte; the rest arrive in the timing event
+    return EventSourceResponse(event_generator(), headers={"Server-Timing": timing.server_timing()})
 
 
 # ── History endpoint ───────────────────────────────────────────────────────
 @router.get("/history")
-def get_history(session_id: str):
+def get_history(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=200, description="Messages per page"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+):
+    """
+    Page through a session's messages, newest page first.
+    Each page is in chronological order; pass `next_cursor` to fetch the
+    page of older messages (null when there are none).
+    """
     if not session_id:
         raise HTTPException(status_code=400, detail="session_id is required.")
 
     db = SessionLocal()
     try:
+        query = db.query(ChatHistory).filter(ChatHistory.session_id == session_id)
+        if cursor is not None:
+            try:
+                cursor_id = int(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor.")
+            # Keyset on (created_at, id); the anchor timestamp is read in SQL so it
+            # compares exactly as stored, whatever the backend's datetime format.
+            anchor = (
+                db.query(ChatHistory.created_at)
+                .filter(ChatHistory.id == cursor_id, ChatHistory.session_id == session_id)
+                .scalar_subquery()
+            )
+            query = query.filter(
+                or_(
+                    ChatHistory.created_at < anchor,
+                    and_(ChatHistory.created_at == anchor, ChatHistory.id < cursor_id),
+                )
+            )
+
         chats = (
-            db.query(ChatHistory)
-            .filter(ChatHistory.session_id == session_id)
-            .order_by(ChatHistory.created_at.asc())
+            query.order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc())
+            .limit(limit + 1)
             .all()
         )
-        return [
-            {
-                "id": c.id,
-                "role": c.role,
-                "message": c.message,
-                "created_at": c.created_at.isoformat() if c.created_at else None,
-            }
-            for c in chats
-        ]
+        has_more = len(chats) > limit
+        chats = chats[:limit]
+        chats.reverse()
+        return {
+            "messages": [
+                {
+                    "id": c.id,
+                    "role": c.role,
+                    "message": c.message,
+                    "created_at": c.created_at.isoformat() if c.created_at else None,
+                }
+                for c in chats
+            ],
+            "next_cursor": str(chats[0].id) if has_more else None,
+        }
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,131 @@
+"""
+Semantic cache of finished LLM answers.
+
+A new question is compared (cosine similarity of query embeddings) with the
+questions answered recently; if one is close enough and was answered against
+the same corpus version, its stored answer is replayed instead of calling
+OpenRouter. Entries are bounded (LRU), expire after a TTL and are dropped
+wholesale when the corpus changes. Only standalone questions are cached: the
+chat route bypasses the cache for turns with prior history, whose meaning
+may depend on it ("tell me more").
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+from ..config import settings
+from . import corpus_watch
+
+_REPLAY_TOKEN_RE = re.compile(r"\s*\S+|\s+")
+
+
+@dataclass(slots=True)
+class _Entry:
+    question: str
+    embedding: np.ndarray
+    answer: str
+    corpus_version: str
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """Thread-safe nearest-neighbour cache of answers keyed by query embedding."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        # Stacked embeddings of all entries, rebuilt lazily after writes
+        self._matrix: np.ndarray | None = None
+        self._matrix_ids: list[int] = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, embedding: np.ndarray, corpus_version: str) -> str | None:
+        """Return the cached answer for the most similar question, or None."""
+        query = _normalize(embedding)
+        now = time.time()
+        with self._lock:
+            matrix = self._get_matrix()
+            if matrix is not None:
+                sims = matrix @ query
+                for idx in np.argsort(-sims):
+                    if sims[idx] < self.threshold:
+                        break
+                    entry_id = self._matrix_ids[idx]
+                    entry = self._entries[entry_id]
+                    if entry.corpus_version != corpus_version or now - entry.created_at > self.ttl_seconds:
+                        continue
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return entry.answer
+            self.misses += 1
+            return None
+
+    def store(self, question: str, embedding: np.ndarray, answer: str, corpus_version: str) -> None:
+        with self._lock:
+            self._entries[self._next_id] = _Entry(
+                question=question,
+                embedding=_normalize(embedding),
+                answer=answer,
+                corpus_version=corpus_version,
+                created_at=time.time(),
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self) -> None:
+        """Drop every entry (the corpus the answers were grounded on changed)."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def _get_matrix(self) -> np.ndarray | None:
+        if self._matrix is None and self._entries:
+            self._matrix_ids = list(self._entries)
+            self._matrix = np.stack([e.embedding for e in self._entries.values()])
+        return self._matrix
+
+
+answer_cache = SemanticAnswerCache(
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+)
+corpus_watch.on_change(lambda _version: answer_cache.invalidate())
+
+
+def _normalize(embedding) -> np.ndarray:
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+def replay_tokens(answer: str) -> Iterator[str]:
+    """Split a stored answer back into word-sized tokens for SSE replay."""
+    return (m.group(0) for m in _REPLAY_TOKEN_RE.finditer(answer))
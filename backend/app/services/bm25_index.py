@@ -0,0 +1,155 @@
+"""
+In-process BM25 (lexical) index over the stored chunk contents.
+
+Cosine search over sentence embeddings is weak on exact names — a project
+called "Naxcure", a library or a company name carries little meaning for the
+embedding model but is a perfect keyword match. This index complements
+vector search for those queries (see retrieval.py for the fusion).
+
+The index is an inverted index in CSR form: one int32 array of document
+positions and one float32 array of precomputed BM25 term weights, with an
+offsets array marking where each term's postings start. A query sums the
+weight slices of its terms into a score vector, so a lookup is a handful of
+numpy slice operations (microseconds for the portfolio corpus) and each
+posting costs 8 bytes. Like memory_index.py it is rebuilt from pgvector and
+swapped in atomically, so readers never lock.
+"""
+import math
+import re
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+# Keeps "c++", "c#" and version-ish tokens like "python3" whole; "node.js" → node, js
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+_STOPWORDS = frozenset("""
+a about an and are as at be been but by can did do does for from had has have he her his how i
+in into is it its me my of on or our she so than that the their them then there these they this
+to was we were what when where which who whom why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word tokens of *text*, without stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class _Snapshot:
+    """Immutable view of the index; swapped atomically so readers never lock."""
+
+    __slots__ = ("chunk_ids", "contents", "sources", "vocabulary", "offsets", "postings", "weights")
+
+    def __init__(
+        self,
+        chunk_ids: list[str],
+        contents: list[str],
+        sources: list[str | None],
+        vocabulary: dict[str, int],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        weights: np.ndarray,
+    ):
+        self.chunk_ids = chunk_ids
+        self.contents = contents
+        self.sources = sources
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of chunks."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._snapshot: _Snapshot | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def count(self) -> int:
+        snap = self._snapshot
+        return len(snap.chunk_ids) if snap else 0
+
+    def replace(self, rows: Iterable[tuple[str, str, str | None]]) -> int:
+        """Rebuild the whole index from *rows* of (chunk_id, content, source)."""
+        snap = self._build(list(rows))
+        self._snapshot = snap
+        return len(snap.chunk_ids)
+
+    def _build(self, rows: list[tuple[str, str, str | None]]) -> _Snapshot:
+        chunk_ids = [cid for cid, _, _ in rows]
+        contents = [content for _, content, _ in rows]
+        sources = [source for _, _, source in rows]
+        term_counts = [Counter(tokenize(content)) for content in contents]
+        lengths = np.array([sum(tc.values()) for tc in term_counts], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) and lengths.sum() else 1.0
+
+        # Group (doc, tf) pairs by term
+        by_term: dict[str, list[tuple[int, int]]] = {}
+        for doc, tc in enumerate(term_counts):
+            for term, tf in tc.items():
+                by_term.setdefault(term, []).append((doc, tf))
+
+        n_docs = len(rows)
+        vocabulary: dict[str, int] = {}
+        offsets = np.zeros(len(by_term) + 1, dtype=np.int64)
+        n_postings = sum(len(p) for p in by_term.values())
+        postings = np.empty(n_postings, dtype=np.int32)
+        weights = np.empty(n_postings, dtype=np.float32)
+
+        pos = 0
+        for term_id, (term, plist) in enumerate(by_term.items()):
+            vocabulary[term] = term_id
+            docs = np.fromiter((d for d, _ in plist), dtype=np.int32, count=len(plist))
+            tfs = np.fromiter((tf for _, tf in plist), dtype=np.float32, count=len(plist))
+            idf = math.log(1.0 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * lengths[docs] / avg_length)
+            end = pos + len(plist)
+            postings[pos:end] = docs
+            weights[pos:end] = idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+            offsets[term_id + 1] = end
+            pos = end
+
+        return _Snapshot(chunk_ids, contents, sources, vocabulary, offsets, postings, weights)
+
+    def search(self, query: str, top_k: int) -> list[tuple[str, str, str | None, float]]:
+        """
+        Return up to *top_k* (chunk_id, content, source, BM25 score) tuples,
+        best first; only chunks matching a query term.
+        """
+        snap = self._snapshot
+        if snap is None or not snap.chunk_ids or top_k <= 0:
+            return []
+        term_ids = {snap.vocabulary[t] for t in tokenize(query) if t in snap.vocabulary}
+        if not term_ids:
+            return []
+
+        scores = np.zeros(len(snap.chunk_ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = snap.offsets[term_id], snap.offsets[term_id + 1]
+            # A document appears at most once per term, so fancy-index += is safe
+            scores[snap.postings[start:end]] += snap.weights[start:end]
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(snap.chunk_ids[i], snap.contents[i], snap.sources[i], float(scores[i])) for i in candidates]
+
+    def stats(self) -> dict:
+        snap = self._snapshot
+        if snap is None:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "chunks": len(snap.chunk_ids),
+            "terms": len(snap.vocabulary),
+            "postings": int(len(snap.postings)),
+            "postings_bytes": int(snap.postings.nbytes + snap.weights.nbytes + snap.offsets.nbytes),
+        }
@@ -0,0 +1,108 @@
+"""
+Tracks the version of the document corpus stored in pgvector.
+
+The version is a digest of every stored `chunk_id`, so it changes whenever
+the loaders add or remove chunks — even when they run in another process.
+Writers in vector_store.py also `NOTIFY` on CORPUS_CHANNEL; while the app is
+running we LISTEN on it so caches derived from the corpus are dropped right
+away, with a periodic re-check as a fallback for missed notifications.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from typing import Awaitable, Callable
+
+from ..config import settings
+from .db_pool import database_url, get_async_conn
+
+logger = logging.getLogger(__name__)
+
+CORPUS_CHANNEL = "document_embeddings_changed"
+
+CORPUS_VERSION_SQL = """
+    SELECT COUNT(*)::text || ':' || COALESCE(md5(string_agg(chunk_id, ',' ORDER BY chunk_id)), '')
+    FROM document_embeddings
+"""
+
+ChangeCallback = Callable[[str], Awaitable[None] | None]
+
+_version: str | None = None
+_checked_at = 0.0
+_callbacks: list[ChangeCallback] = []
+_listen_conn = None
+_refresh_lock: asyncio.Lock | None = None
+
+
+def on_change(callback: ChangeCallback) -> None:
+    """Register *callback(new_version)* to run whenever the corpus changes."""
+    _callbacks.append(callback)
+
+
+async def get_version(force: bool = False) -> str:
+    """
+    Return the current corpus version, re-reading it from the database when
+    the cached value is older than CORPUS_VERSION_TTL_SECONDS (or *force*).
+    """
+    global _refresh_lock
+    if not force and _version is not None and time.monotonic() - _checked_at < settings.CORPUS_VERSION_TTL_SECONDS:
+        return _version
+
+    if _refresh_lock is None:
+        _refresh_lock = asyncio.Lock()
+    async with _refresh_lock:
+        if not force and _version is not None and time.monotonic() - _checked_at < settings.CORPUS_VERSION_TTL_SECONDS:
+            return _version
+        async with get_async_conn() as conn:
+            version = await conn.fetchval(CORPUS_VERSION_SQL)
+        await _set_version(version)
+    return _version
+
+
+async def _set_version(version: str) -> None:
+    global _version, _checked_at
+    previous, _version, _checked_at = _version, version, time.monotonic()
+    if previous is not None and previous != version:
+        logger.info(f"Corpus changed ({previous[:16]} → {version[:16]})")
+        for callback in list(_callbacks):
+            try:
+                result = callback(version)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Corpus change callback failed: {e}")
+
+
+def _on_notify(conn, pid, channel, payload) -> None:
+    # Runs on the event loop; re-read the version (which fires callbacks) in a task
+    asyncio.get_running_loop().create_task(_refresh_after_notify())
+
+
+async def _refresh_after_notify() -> None:
+    try:
+        await get_version(force=True)
+    except Exception as e:
+        logger.warning(f"Failed to refresh corpus version after NOTIFY: {e}")
+
+
+async def start_watching() -> None:
+    """Read the initial version and LISTEN for change notifications."""
+    global _listen_conn
+    await get_version(force=True)
+    if _listen_conn is None:
+        import asyncpg
+
+        # A dedicated connection: LISTEN must outlive any single pool checkout
+        _listen_conn = await asyncpg.connect(dsn=database_url())
+        await _listen_conn.add_listener(CORPUS_CHANNEL, _on_notify)
+        logger.info(f"Listening for corpus changes on '{CORPUS_CHANNEL}'")
+
+
+async def stop_watching() -> None:
+    global _listen_conn
+    if _listen_conn is not None:
+        conn, _listen_conn = _listen_conn, None
+        try:
+            await conn.close()
+        except Exception as e:
+            logger.warning(f"Error closing corpus listener: {e}")
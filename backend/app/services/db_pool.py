@@ -0,0 +1,286 @@
+"""
+Connection pools for the pgvector store.
+
+Opening a new Postgres connection costs a TCP + TLS handshake and a server
+slot, which dominated retrieval latency when every call used its own
+`psycopg2.connect()`. This module keeps two long-lived pools instead:
+
+- a thread-safe psycopg2 pool for the synchronous helpers (ingestion scripts,
+  CLI tools, threadpool callers), and
+- an asyncpg pool for the request path, so `/api/chat` can talk to the
+  database without blocking the event loop.
+
+Both are sized from Settings and created lazily on first use; `main.lifespan`
+opens the async pool at startup and closes both on shutdown.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import extensions as pg_ext
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def database_url() -> str:
+    """Return the Postgres URL for the vector store (DATABASE_URL from env)."""
+    url = os.environ.get("DATABASE_URL") or ""
+    if not url:
+        url = settings.DATABASE_URL
+    return url
+
+
+def is_postgres_url(url: str | None = None) -> bool:
+    """True if *url* (default: DATABASE_URL) points at PostgreSQL."""
+    url = url if url is not None else database_url()
+    return url.startswith(("postgres://", "postgresql://"))
+
+
+# ---------------------------------------------------------------------------
+# Synchronous pool (psycopg2)
+# ---------------------------------------------------------------------------
+
+class _SyncPoolStats:
+    """Counters describing how the sync pool is being used."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.discarded = 0
+        self.timeouts = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "discarded": self.discarded,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait_s / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_s, 3),
+            }
+
+
+_sync_pool: pg_pool.ThreadedConnectionPool | None = None
+_sync_slots: threading.BoundedSemaphore | None = None
+_sync_last_used: dict[int, float] = {}
+_sync_init_lock = threading.Lock()
+_sync_stats = _SyncPoolStats()
+
+
+def _get_sync_pool() -> pg_pool.ThreadedConnectionPool:
+    global _sync_pool, _sync_slots
+    if _sync_pool is None:
+        with _sync_init_lock:
+            if _sync_pool is None:
+                max_size = max(1, settings.VECTOR_DB_POOL_MAX_SIZE)
+                min_size = min(max(0, settings.VECTOR_DB_POOL_MIN_SIZE), max_size)
+                _sync_pool = pg_pool.ThreadedConnectionPool(
+                    min_size,
+                    max_size,
+                    dsn=database_url(),
+                    # TCP keepalives stop NATs / poolers from silently dropping idle sockets
+                    keepalives=1,
+                    keepalives_idle=30,
+                    keepalives_interval=10,
+                    keepalives_count=3,
+                )
+                # ThreadedConnectionPool raises instead of waiting when exhausted,
+                # so a semaphore turns that into a bounded wait.
+                _sync_slots = threading.BoundedSemaphore(max_size)
+                logger.info(f"Opened pgvector connection pool (min={min_size}, max={max_size})")
+    return _sync_pool
+
+
+def _checkout(pool: pg_pool.ThreadedConnectionPool):
+    """Take a connection from *pool*, replacing it if it sat idle too long."""
+    conn = pool.getconn()
+    last_used = _sync_last_used.get(id(conn))
+    max_idle = settings.VECTOR_DB_POOL_MAX_IDLE_SECONDS
+    if conn.closed or (last_used is not None and time.monotonic() - last_used > max_idle):
+        _sync_last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+        with _sync_stats.lock:
+            _sync_stats.discarded += 1
+        conn = pool.getconn()
+    return conn
+
+
+@contextmanager
+def get_conn():
+    """
+    Borrow a pooled psycopg2 connection.
+
+    Any open transaction is rolled back when the block exits, so callers must
+    `commit()` writes themselves (as they did with a fresh connection).
+    Connections that broke during use are closed instead of being returned.
+    """
+    pool = _get_sync_pool()
+    start = time.perf_counter()
+    if not _sync_slots.acquire(timeout=settings.VECTOR_DB_POOL_TIMEOUT_SECONDS):
+        with _sync_stats.lock:
+            _sync_stats.timeouts += 1
+        raise TimeoutError("Timed out waiting for a vector store connection.")
+
+    try:
+        conn = _checkout(pool)
+    except Exception:
+        _sync_slots.release()
+        raise
+
+    waited = time.perf_counter() - start
+    with _sync_stats.lock:
+        _sync_stats.checkouts += 1
+        _sync_stats.in_use += 1
+        _sync_stats.total_wait_s += waited
+        _sync_stats.max_wait_s = max(_sync_stats.max_wait_s, waited)
+
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        if not broken and not conn.closed:
+            try:
+                if conn.get_transaction_status() != pg_ext.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        broken = broken or bool(conn.closed)
+        if broken:
+            _sync_last_used.pop(id(conn), None)
+        else:
+            _sync_last_used[id(conn)] = time.monotonic()
+        pool.putconn(conn, close=broken)
+        _sync_slots.release()
+        with _sync_stats.lock:
+            _sync_stats.in_use -= 1
+            if broken:
+                _sync_stats.discarded += 1
+
+
+def close_sync_pool() -> None:
+    """Close every connection held by the sync pool."""
+    global _sync_pool, _sync_slots
+    with _sync_init_lock:
+        if _sync_pool is not None:
+            _sync_pool.closeall()
+            _sync_pool = None
+            _sync_slots = None
+            _sync_last_used.clear()
+
+
+# ---------------------------------------------------------------------------
+# Async pool (asyncpg)
+# ---------------------------------------------------------------------------
+
+_async_pool = None
+_async_init_lock: asyncio.Lock | None = None
+
+
+async def _init_async_conn(conn) -> None:
+    """Apply the vector index query knobs (hnsw.ef_search / ivfflat.probes) to a new connection."""
+    from .vector_schema import search_settings_sql
+
+    sql = search_settings_sql()
+    if sql:
+        await conn.execute(sql)
+
+
+async def _reset_async_conn(conn) -> None:
+    """
+    asyncpg's release reset ends with RESET ALL, which would drop the index
+    knobs; re-apply them in the same round trip instead of on every acquire.
+    """
+    from .vector_schema import search_settings_sql
+
+    sql = "\n".join(filter(None, (conn.get_reset_query(), search_settings_sql())))
+    if sql:
+        await conn.execute(sql)
+
+
+async def open_async_pool():
+    """Create the asyncpg pool if it does not exist yet and return it."""
+    global _async_pool, _async_init_lock
+    if _async_pool is not None:
+        return _async_pool
+
+    if _async_init_lock is None:
+        _async_init_lock = asyncio.Lock()
+    async with _async_init_lock:
+        if _async_pool is None:
+            import asyncpg
+
+            max_size = max(1, settings.VECTOR_DB_POOL_MAX_SIZE)
+            min_size = min(max(0, settings.VECTOR_DB_POOL_MIN_SIZE), max_size)
+            _async_pool = await asyncpg.create_pool(
+                dsn=database_url(),
+                min_size=min_size,
+                max_size=max_size,
+                max_inactive_connection_lifetime=settings.VECTOR_DB_POOL_MAX_IDLE_SECONDS,
+                command_timeout=settings.VECTOR_DB_POOL_TIMEOUT_SECONDS * 3,
+                init=_init_async_conn,
+                reset=_reset_async_conn,
+            )
+            logger.info(f"Opened async pgvector connection pool (min={min_size}, max={max_size})")
+    return _async_pool
+
+
+@asynccontextmanager
+async def get_async_conn():
+    """Borrow a pooled asyncpg connection."""
+    pool = _async_pool or await open_async_pool()
+    async with pool.acquire(timeout=settings.VECTOR_DB_POOL_TIMEOUT_SECONDS) as conn:
+        yield conn
+
+
+async def close_async_pool() -> None:
+    """Gracefully close the asyncpg pool."""
+    global _async_pool
+    if _async_pool is not None:
+        pool, _async_pool = _async_pool, None
+        await pool.close()
+
+
+# ---------------------------------------------------------------------------
+# Health / stats
+# ---------------------------------------------------------------------------
+
+async def ping() -> dict:
+    """Round-trip `SELECT 1` through the async pool and report the latency."""
+    start = time.perf_counter()
+    try:
+        async with get_async_conn() as conn:
+            await conn.fetchval("SELECT 1")
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "latency_ms": round(1000 * (time.perf_counter() - start), 3)}
+
+
+def pool_stats() -> dict:
+    """Return sizing and usage counters for both pools."""
+    stats: dict = {
+        "max_size": settings.VECTOR_DB_POOL_MAX_SIZE,
+        "sync": {"open": _sync_pool is not None, **_sync_stats.snapshot()},
+        "async": {"open": _async_pool is not None},
+    }
+    if _async_pool is not None:
+        stats["async"].update(
+            size=_async_pool.get_size(),
+            idle=_async_pool.get_idle_size(),
+            min_size=_async_pool.get_min_size(),
+            max_size=_async_pool.get_max_size(),
+        )
+    return stats
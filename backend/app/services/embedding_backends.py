@@ -0,0 +1,242 @@
+"""
+Interchangeable inference backends for the embedding model.
+
+Both produce the same vectors for all-MiniLM-L6-v2 (mean-pooled token
+embeddings, L2-normalised, inputs truncated to the model's 256-token
+max_seq_length), so documents embedded with one can be queried with the other.
+
+* "sentence-transformers" — the reference implementation (PyTorch).
+* "onnx"                  — ONNX Runtime with the int8-quantised export
+  published in the model repo's `onnx/` folder and the Rust `tokenizers`
+  fast tokenizer. No torch import: smaller RSS and much faster cold start.
+* "remote"                — no model in this process; texts are sent to the
+  shared worker pool (`python -m app.embedding_server`), which runs one of
+  the backends above and returns vectors through shared memory.
+
+Heavy libraries are imported inside the backend constructors, so only the
+selected backend's dependencies are ever loaded.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HF_REPO = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class SentenceTransformerBackend:
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str):
+        # Force offline mode for faster startup if model is already downloaded
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        from sentence_transformers import SentenceTransformer
+
+        try:
+            # Try local first
+            self.model = SentenceTransformer(model_name)
+        except Exception as e:
+            logger.warning(f"Offline load failed, attempting online download: {e}")
+            os.environ["TRANSFORMERS_OFFLINE"] = "0"
+            os.environ["HF_HUB_OFFLINE"] = "0"
+            self.model = SentenceTransformer(model_name)
+        self.tokenizer = self.model.tokenizer
+        self.max_seq_length = self.model.max_seq_length
+        # encode() sets truncation on the shared fast tokenizer from the inference
+        # threads; counting on it from other threads would race ("Already borrowed")
+        backend_tokenizer = getattr(self.tokenizer, "backend_tokenizer", None)
+        self._counting_tokenizer = _counting_copy(backend_tokenizer) if backend_tokenizer is not None else None
+
+    def encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        vectors = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def count_tokens(self, text: str) -> int:
+        return self.count_tokens_batch([text])[0]
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        if self._counting_tokenizer is None:
+            # Slow (pure Python) tokenizer: no shared Rust state to race on
+            return [len(self.tokenizer.encode(t, add_special_tokens=False, verbose=False)) for t in texts]
+        return [len(e.ids) for e in self._counting_tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model_file: str, max_seq_length: int, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = _hub_file(model_file)
+        # A local export may ship its tokenizer.json alongside the model
+        local_tokenizer = os.path.join(os.path.dirname(model_file), "tokenizer.json")
+        tokenizer_path = local_tokenizer if os.path.exists(model_file) and os.path.exists(local_tokenizer) else _hub_file("tokenizer.json")
+
+        self.max_seq_length = max_seq_length
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+        # Truncation/padding are tokenizer state; counting needs an untouched copy
+        self._counting_tokenizer = _counting_copy(self.tokenizer)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"ONNX embedding model loaded from {model_path}")
+
+    def encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        out = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        return np.vstack(out)
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2-normalise (the model's Pooling + Normalize modules)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def count_tokens(self, text: str) -> int:
+        return self.count_tokens_batch([text])[0]
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        return [len(e.ids) for e in self._counting_tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+
+class RemoteBackend:
+    """Client of the embedding pool server (see app/embedding_server.py)."""
+
+    name = "remote"
+
+    def __init__(self, address: str, authkey: str):
+        if not authkey:
+            raise RuntimeError("EMBEDDING_POOL_AUTHKEY must be set to the embedding pool's secret")
+        self.address = parse_pool_address(address)
+        self.authkey = authkey.encode()
+        # One connection per calling thread: requests on a connection are sequential
+        self._local = threading.local()
+        self._call("ping", None)
+        # Result blocks are allocated here, sized from the pool's vector width
+        self.dimension = self._call("dimension", None)
+        logger.info(f"Connected to embedding pool at {address}")
+        # Prompt budgeting counts tokens on the request path; a local
+        # tokenizer-only copy avoids an IPC round-trip per count
+        try:
+            from tokenizers import Tokenizer
+
+            self._counting_tokenizer = _counting_copy(Tokenizer.from_file(_hub_file("tokenizer.json")))
+        except Exception as e:
+            logger.warning(f"No local tokenizer, token counts will be estimated: {e}")
+            self._counting_tokenizer = None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            from multiprocessing.connection import Client
+
+            conn = self._local.conn = Client(self.address, authkey=self.authkey)
+        return conn
+
+    def _call(self, op: str, payload):
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.send((op, payload))
+                status, result = conn.recv()
+                break
+            except (EOFError, OSError) as e:
+                # Pool restarted: reconnect once
+                self._local.conn = None
+                if attempt == 2:
+                    raise RuntimeError(f"Embedding pool unavailable: {e}") from e
+        if status != "ok":
+            raise RuntimeError(f"Embedding pool error: {result}")
+        return result
+
+    def encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        from multiprocessing.shared_memory import SharedMemory
+
+        # This process owns the block: it is unlinked here whether or not the
+        # pool replies, and by our resource tracker if this process dies first
+        shm = SharedMemory(create=True, size=max(len(texts) * self.dimension * 4, 1))
+        try:
+            shape = self._call("encode", (shm.name, texts, batch_size))
+            return np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def count_tokens(self, text: str) -> int:
+        return self.count_tokens_batch([text])[0]
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        if self._counting_tokenizer is None:
+            raise RuntimeError("tokenizer not available")
+        return [len(e.ids) for e in self._counting_tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+
+def _counting_copy(tokenizer):
+    """Independent copy of a `tokenizers.Tokenizer` without truncation or padding."""
+    from tokenizers import Tokenizer
+
+    counting = Tokenizer.from_str(tokenizer.to_str())
+    counting.no_truncation()
+    counting.no_padding()
+    return counting
+
+
+def parse_pool_address(address: str):
+    """'host:port' → (host, port) for TCP; anything else is a unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def _hub_file(filename: str) -> str:
+    """Path of *filename* from the model repo (or a local path), downloading it once."""
+    if os.path.exists(filename):
+        return filename
+    from huggingface_hub import hf_hub_download
+
+    try:
+        # Cached copy first: no network round-trip on startup
+        return hf_hub_download(HF_REPO, filename, local_files_only=True)
+    except Exception:
+        logger.info(f"Downloading {HF_REPO}/{filename}…")
+        return hf_hub_download(HF_REPO, filename)
+
+
+def load_backend(kind: str, model_name: str, onnx_model_file: str, max_seq_length: int, threads: int = 0):
+    """Instantiate the configured embedding backend."""
+    if kind == "remote":
+        from ..config import settings
+
+        return RemoteBackend(settings.EMBEDDING_POOL_ADDRESS, settings.EMBEDDING_POOL_AUTHKEY)
+    if kind == "onnx":
+        return OnnxBackend(onnx_model_file, max_seq_length, threads)
+    return SentenceTransformerBackend(model_name)
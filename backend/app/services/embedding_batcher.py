@@ -0,0 +1,131 @@
+"""
+Micro-batching in front of the embedding model.
+
+Concurrent chat requests each need one query embedding. Encoding them one by
+one runs batch-size-1 forward passes back to back; a single batched forward
+pass over the same texts costs little more than one of them. The batcher
+owns a dedicated inference thread: callers enqueue a text and get a Future,
+the thread takes whatever is waiting (up to `max_batch`, lingering at most
+`max_wait_ms` for stragglers once it has work), encodes it in one call and
+resolves every caller's future.
+
+Queue wait, batch size, encode time and throughput are exported as
+histograms on /metrics (see metrics.py); rolling percentiles are on /stats.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+
+from . import metrics
+from .stats import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """Collects encode requests from any thread and runs them as batches."""
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        max_batch: int,
+        max_wait_ms: float,
+    ):
+        self._encode = encode
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self.items = 0
+        self.batches = 0
+        self.queue_wait = LatencyStats()
+        self.batch_size = LatencyStats()
+        self.encode_time = LatencyStats()
+
+    def submit(self, text: str) -> Future:
+        """Queue *text*; the returned future resolves to its float32 vector."""
+        self._ensure_thread()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            # Take what is already waiting, then linger briefly for stragglers
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.put(_STOP)      # finish this batch, then stop
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list[tuple[str, Future, float]]) -> None:
+        start = time.perf_counter()
+        live = [(text, future, queued) for text, future, queued in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        for _, _, queued in live:
+            self.queue_wait.observe(start - queued)
+            metrics.EMBEDDING_QUEUE_WAIT_SECONDS.observe(start - queued)
+        try:
+            vectors = self._encode([text for text, _, _ in live])
+        except BaseException as e:
+            for _, future, _ in live:
+                future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+        self.encode_time.observe(elapsed)
+        self.batch_size.observe(len(live))
+        metrics.EMBEDDING_ENCODE_SECONDS.observe(elapsed)
+        metrics.EMBEDDING_BATCH_SIZE.observe(len(live))
+        if elapsed > 0:
+            metrics.EMBEDDING_THROUGHPUT.observe(len(live) / elapsed)
+        self.items += len(live)
+        self.batches += 1
+        for (_, future, _), vec in zip(live, vectors):
+            future.set_result(vec)
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout=5)
+        self._thread = None
+
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self._started_at
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "items_per_s": round(self.items / uptime, 2) if uptime > 0 else 0.0,
+            "pending": self._queue.qsize(),
+            "batch_size": self.batch_size.snapshot(scale=1.0, unit="items"),
+            "queue_wait": self.queue_wait.snapshot(),
+            "encode": self.encode_time.snapshot(),
+        }
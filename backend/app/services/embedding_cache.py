@@ -0,0 +1,205 @@
+"""
+Bounded cache for query embeddings.
+
+The chatbot sees the same few dozen questions over and over, so encoding
+them again on every turn is wasted CPU. Entries are keyed on a normalised
+form of the query (case, whitespace and trailing punctuation folded), stored as
+compact float32 arrays, and evicted LRU-first once the memory budget is
+exceeded or when they outlive the TTL. An optional SQLite file acts as a
+second tier that survives restarts.
+"""
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_PUNCT_RE = re.compile(r"[\s.,;:!?]+$")
+_WS_RE = re.compile(r"\s+")
+
+# Rough per-entry bookkeeping cost (OrderedDict node, tuple, ndarray header)
+_ENTRY_OVERHEAD_BYTES = 200
+
+# The disk tier drops expired rows and trims itself to its cap every this many puts
+_DISK_PRUNE_EVERY = 256
+
+
+def normalize_key(text: str) -> str:
+    """
+    Fold case, collapse whitespace and drop trailing punctuation: 'Tech stack?'
+    → 'tech stack'. Other punctuation is kept, so 'C++', 'C#' and 'C' differ.
+    """
+    return _TRAILING_PUNCT_RE.sub("", _WS_RE.sub(" ", text.lower()).strip())
+
+
+class EmbeddingCache:
+    """Thread-safe LRU/TTL cache of float32 embedding vectors."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        disk_path: str | None = None,
+        disk_max_entries: int = 100_000,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self._disk_puts = 0
+        self._entries: OrderedDict[str, tuple[np.ndarray, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._disk: sqlite3.Connection | None = None
+        if disk_path:
+            try:
+                self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+                # WAL + relaxed fsync keeps puts cheap; losing the last few entries on a crash is fine
+                self._disk.execute("PRAGMA journal_mode=WAL")
+                self._disk.execute("PRAGMA synchronous=NORMAL")
+                self._disk.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings "
+                    "(key TEXT PRIMARY KEY, vec BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._disk.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_created_at ON embeddings (created_at)")
+                self._disk.commit()
+                self._disk_prune(time.time())
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding disk cache disabled ({disk_path}): {e}")
+                self._disk = None
+
+    @staticmethod
+    def _entry_size(key: str, vec: np.ndarray) -> int:
+        return vec.nbytes + sys.getsizeof(key) + _ENTRY_OVERHEAD_BYTES
+
+    @property
+    def has_disk_tier(self) -> bool:
+        """True if lookups may touch SQLite (i.e. block on file I/O)."""
+        return self._disk is not None
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Return the cached vector for *key* or None; expired entries count as misses."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vec, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vec
+                self._remove(key)
+
+            row = self._disk_get(key, now)
+            if row is not None:
+                vec, created_at = row
+                self.disk_hits += 1
+                self._insert(key, vec, created_at)
+                return vec
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        # Own copy: *vec* may be a row view of a batch matrix (which would then be
+        # kept alive and counted at the row's size) and must stay writable for the caller
+        vec = np.array(vec, dtype=np.float32, copy=True)
+        vec.setflags(write=False)
+        now = time.time()
+        with self._lock:
+            self._insert(key, vec, now)
+            self._disk_put(key, vec, now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM embeddings")
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_tier": self._disk is not None,
+            }
+
+    # ── internals (caller holds the lock) ──────────────────────────────────
+    def _insert(self, key: str, vec: np.ndarray, created_at: float) -> None:
+        if key in self._entries:
+            self._remove(key)
+        size = self._entry_size(key, vec)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (vec, created_at)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        vec, _ = self._entries.pop(key)
+        self._bytes -= self._entry_size(key, vec)
+
+    def _disk_get(self, key: str, now: float) -> tuple[np.ndarray, float] | None:
+        if self._disk is None:
+            return None
+        try:
+            row = self._disk.execute(
+                "SELECT vec, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache read failed: {e}")
+            return None
+        if row is None or now - row[1] > self.ttl_seconds:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32), row[1]
+
+    def _disk_put(self, key: str, vec: np.ndarray, created_at: float) -> None:
+        if self._disk is None:
+            return
+        try:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vec, created_at) VALUES (?, ?, ?)",
+                (key, vec.tobytes(), created_at),
+            )
+            self._disk.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache write failed: {e}")
+            return
+        self._disk_puts += 1
+        if self._disk_puts % _DISK_PRUNE_EVERY == 0:
+            self._disk_prune(created_at)
+
+    def _disk_prune(self, now: float) -> None:
+        """Delete expired rows, then the oldest ones beyond `disk_max_entries`."""
+        try:
+            self._disk.execute("DELETE FROM embeddings WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._disk.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (max(0, self.disk_max_entries),),
+            )
+            self._disk.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache prune failed: {e}")
@@ -1,31 +1,227 @@
-import os
-from sentence_transformers import SentenceTransformer
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 import logging
+import numpy as np
+from ..config import settings
+from .embedding_backends import load_backend
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_cache import EmbeddingCache, normalize_key
 
 logger = logging.getLogger(__name__)
 
-# Force offline mode for faster startup if model is already downloaded
-os.environ["TRANSFORMERS_OFFLINE"] = "1"
-os.environ["HF_HUB_OFFLINE"] = "1"
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Query embeddings are cached in front of the model; see embedding_cache.py
+_cache = EmbeddingCache(
+    max_bytes=int(settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024),
+    ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+    disk_path=settings.EMBEDDING_CACHE_PATH or None,
+    disk_max_entries=settings.EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+)
+
 
 @lru_cache(maxsize=1)
-def _get_model() -> SentenceTransformer:
-    """Lazy-load the embedding model (only loaded on first call)."""
-    try:
-        logger.info("Loading embedding model (all-MiniLM-L6-v2)...")
-        # Try local first
-        return SentenceTransformer("all-MiniLM-L6-v2")
-    except Exception as e:
-        logger.warning(f"Offline load failed, attempting online download: {e}")
-        os.environ["TRANSFORMERS_OFFLINE"] = "0"
-        os.environ["HF_HUB_OFFLINE"] = "0"
-        return SentenceTransformer("all-MiniLM-L6-v2")
+def _get_model():
+    """Lazy-load the embedding backend (only loaded on first call); see embedding_backends.py."""
+    logger.info(f"Loading embedding model ({MODEL_NAME}, backend={settings.EMBEDDING_BACKEND})...")
+    return load_backend(
+        settings.EMBEDDING_BACKEND,
+        MODEL_NAME,
+        onnx_model_file=settings.EMBEDDING_ONNX_MODEL_FILE,
+        max_seq_length=settings.EMBEDDING_MAX_SEQ_LENGTH,
+        threads=settings.EMBEDDING_ONNX_THREADS,
+    )
 
 
-def generate_embedding(text: str) -> list[float]:
-    """Generate embedding vector for the given text."""
-    model = _get_model()
+def generate_embedding_array(text: str, use_cache: bool = True) -> np.ndarray:
+    """
+    Generate the embedding for *text* as a float32 array.
+
+    With *use_cache* (the default, meant for user queries) the vector is served
+    from / stored in the embedding cache under a normalised key. Ingestion
+    passes ``use_cache=False`` so document chunks don't evict hot queries.
+    """
     # clean text to reduce unnecessary computation
-    clean_text = text.strip().replace("\n", " ")
-    return model.encode(clean_text, convert_to_numpy=True).tolist()
+    clean_text = _clean(text)
+
+    key = _cache_key(clean_text) if use_cache else ""
+    if key:
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+    vec = _encode_one(clean_text)
+    if key:
+        _cache.put(key, vec)
+    return vec
+
+
+def _clean(text: str) -> str:
+    return text.strip().replace("\n", " ")
+
+
+def _cache_key(clean_text: str) -> str:
+    return f"{MODEL_NAME}:{normalize_key(clean_text)}"
+
+
+def _encode_one(clean_text: str) -> np.ndarray:
+    """Encode a single text, through the micro-batcher when it is enabled."""
+    if settings.EMBEDDING_MICROBATCH_ENABLED:
+        return _get_batcher().submit(clean_text).result()
+    return _get_model().encode([clean_text], batch_size=1)[0]
+
+
+def generate_embedding(text: str, use_cache: bool = True) -> list[float]:
+    """Generate embedding vector for the given text."""
+    return generate_embedding_array(text, use_cache=use_cache).tolist()
+
+
+def generate_embeddings(texts: list[str], batch_size: int | None = None) -> np.ndarray:
+    """
+    Encode many texts in batched forward passes (ingestion path, uncached).
+    Returns a float32 array of shape (len(texts), dim).
+    """
+    clean_texts = [_clean(t) for t in texts]
+    return _get_model().encode(clean_texts, batch_size=batch_size or settings.EMBEDDING_BATCH_SIZE)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of *text* under the embedding model's local tokenizer.
+
+    Used for prompt budgeting: it is not the LLM's tokenizer, but WordPiece
+    counts track BPE counts closely enough for sizing a prompt without a
+    network call. Falls back to ~4 characters per token if the model
+    isn't available.
+    """
+    if not text:
+        return 0
+    try:
+        return _get_model().count_tokens(text)
+    except Exception:
+        return max(1, len(text) // 4)
+
+
+def count_tokens_many(texts: list[str]) -> list[int]:
+    """`count_tokens` for several texts in one tokenizer call."""
+    if not texts:
+        return []
+    try:
+        model = _get_model()
+        if hasattr(model, "count_tokens_batch"):
+            counts = model.count_tokens_batch(texts)
+        else:
+            counts = [model.count_tokens(t) for t in texts]
+        return [n if t else 0 for t, n in zip(texts, counts)]
+    except Exception:
+        return [max(1, len(t) // 4) if t else 0 for t in texts]
+
+
+def max_seq_length() -> int:
+    """Tokens the embedding model reads per text; anything longer is truncated."""
+    try:
+        return getattr(_get_model(), "max_seq_length", None) or settings.EMBEDDING_MAX_SEQ_LENGTH
+    except Exception:
+        return settings.EMBEDDING_MAX_SEQ_LENGTH
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters and size of the query-embedding cache."""
+    return _cache.stats()
+
+
+# ── Async access ───────────────────────────────────────────────────────────
+# Model inference is CPU-bound and releases the GIL inside torch, so a small
+# dedicated thread pool keeps it off the event loop without letting a burst
+# of requests spawn unbounded encode threads.
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.EMBEDDING_EXECUTOR_WORKERS),
+            thread_name_prefix="embedding",
+        )
+    return _executor
+
+
+async def generate_embedding_array_async(text: str) -> np.ndarray:
+    """
+    Async variant of `generate_embedding_array` (cached).
+
+    With micro-batching the request goes straight to the batcher's queue and
+    is awaited as a future, so concurrent callers share one forward pass;
+    otherwise the whole call runs on the bounded inference executor.
+    """
+    loop = asyncio.get_running_loop()
+    if not settings.EMBEDDING_MICROBATCH_ENABLED:
+        return await loop.run_in_executor(_get_executor(), generate_embedding_array, text)
+
+    clean_text = _clean(text)
+    key = _cache_key(clean_text)
+    # The SQLite disk tier would block the event loop; hop to the executor for it
+    if _cache.has_disk_tier:
+        cached = await loop.run_in_executor(_get_executor(), _cache.get, key)
+    else:
+        cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    vec = await asyncio.wrap_future(_get_batcher().submit(clean_text))
+    if _cache.has_disk_tier:
+        await loop.run_in_executor(_get_executor(), _cache.put, key, vec)
+    else:
+        _cache.put(key, vec)
+    return vec
+
+
+async def generate_embedding_async(text: str) -> list[float]:
+    """Async variant of `generate_embedding`."""
+    return (await generate_embedding_array_async(text)).tolist()
+
+
+def shutdown_executor() -> None:
+    """Stop the inference executor and batcher (called on application shutdown)."""
+    global _executor, _batcher
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _batcher is not None:
+        _batcher.stop()
+        _batcher = None
+
+
+# ── Micro-batching ─────────────────────────────────────────────────────────
+# Concurrent query encodes are merged into one forward pass on a dedicated
+# inference thread; see embedding_batcher.py.
+_batcher: EmbeddingBatcher | None = None
+_batcher_lock = threading.Lock()
+
+
+def _encode_batch(texts: list[str]) -> np.ndarray:
+    return _get_model().encode(texts, batch_size=len(texts))
+
+
+def _get_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        # Double-checked: concurrent first callers must share one inference thread
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = EmbeddingBatcher(
+                    _encode_batch,
+                    max_batch=settings.EMBEDDING_MICROBATCH_MAX_SIZE,
+                    max_wait_ms=settings.EMBEDDING_MICROBATCH_MAX_WAIT_MS,
+                )
+    return _batcher
+
+
+def batcher_stats() -> dict:
+    """Batch sizes, queue wait and encode time of the micro-batcher."""
+    if _batcher is None:
+        return {"enabled": settings.EMBEDDING_MICROBATCH_ENABLED}
+    return {"enabled": settings.EMBEDDING_MICROBATCH_ENABLED, **_batcher.stats()}
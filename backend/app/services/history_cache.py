@@ -0,0 +1,84 @@
+"""
+Bounded in-memory cache of each session's most recent chat turns.
+
+Every chat turn needs the last MAX_CHAT_HISTORY messages of its session. The
+cache keeps them in a per-session ring buffer (deque with maxlen), written
+through whenever a message is saved, so consecutive turns of an active
+session skip the history query. Sessions are evicted LRU beyond
+`max_sessions`, and an entry older than `ttl_seconds` is re-read from the
+database so turns written by another worker are picked up eventually.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from ..config import settings
+
+
+class _SessionEntry:
+    __slots__ = ("turns", "loaded_at")
+
+    def __init__(self, turns: deque, loaded_at: float):
+        self.turns = turns
+        self.loaded_at = loaded_at
+
+
+class SessionHistoryCache:
+    """LRU map of session_id → ring buffer of {"role", "message"} dicts."""
+
+    def __init__(self, max_sessions: int, max_turns: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self._sessions: OrderedDict[str, _SessionEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str) -> list[dict] | None:
+        """Recent turns (oldest first), or None if the session must be loaded."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return list(entry.turns)
+
+    def load(self, session_id: str, turns: list[dict]) -> None:
+        """Seed a session from the database (replaces any cached turns)."""
+        if self.max_sessions <= 0:
+            return
+        with self._lock:
+            self._sessions[session_id] = _SessionEntry(
+                deque(turns, maxlen=self.max_turns), time.monotonic()
+            )
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def append(self, session_id: str, role: str, message: str) -> None:
+        """Write-through after a save; sessions not cached are left to load lazily."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry.turns.append({"role": role, "message": message})
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+history_cache = SessionHistoryCache(
+    max_sessions=settings.HISTORY_CACHE_MAX_SESSIONS,
+    max_turns=settings.MAX_CHAT_HISTORY,
+    ttl_seconds=settings.HISTORY_CACHE_TTL_SECONDS,
+)
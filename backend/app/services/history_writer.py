@@ -0,0 +1,147 @@
+"""
+Write-behind persistence of chat messages.
+
+The chat route enqueues each message instead of committing it on the request
+path. A background task (started in main.lifespan) drains the queue and
+inserts messages in bulk, one transaction per batch of up to
+HISTORY_WRITE_BATCH_SIZE rows or every HISTORY_WRITE_FLUSH_MS, whichever
+comes first. The queue is bounded: when the database falls behind, `enqueue`
+waits for room (backpressure) rather than growing without limit. Remaining
+messages are flushed on shutdown.
+
+`created_at` is stamped when a message is enqueued, so ordering reflects when
+the turn happened rather than when its batch was written. The per-session
+history cache is updated at enqueue time, so the next turn sees the message
+even before it is flushed; `/api/history` may lag by one flush interval.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import ChatHistory
+from .history_cache import history_cache
+from .stats import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+_MAX_WRITE_ATTEMPTS = 3
+
+_queue: asyncio.Queue | None = None
+_task: asyncio.Task | None = None
+_flush_stats = LatencyStats()
+_batch_sizes = LatencyStats()
+_written = 0
+_dropped = 0
+
+
+def _insert_rows(rows: list[dict]) -> None:
+    """Insert *rows* in a single transaction (runs in the threadpool)."""
+    with SessionLocal() as db:
+        with db.begin():
+            db.execute(insert(ChatHistory), rows)
+
+
+async def _write_batch(rows: list[dict]) -> None:
+    global _written, _dropped
+    start = time.perf_counter()
+    for attempt in range(1, _MAX_WRITE_ATTEMPTS + 1):
+        try:
+            await run_in_threadpool(_insert_rows, rows)
+            _written += len(rows)
+            _flush_stats.observe(time.perf_counter() - start)
+            _batch_sizes.observe(len(rows))
+            return
+        except Exception as e:
+            if attempt == _MAX_WRITE_ATTEMPTS:
+                _dropped += len(rows)
+                logger.error(f"Dropping {len(rows)} chat messages after {attempt} failed writes: {e}")
+                return
+            logger.warning(f"Chat history write failed (attempt {attempt}): {e}")
+            await asyncio.sleep(0.1 * 2 ** attempt)
+
+
+async def _run(queue: asyncio.Queue) -> None:
+    batch_size = max(1, settings.HISTORY_WRITE_BATCH_SIZE)
+    flush_after = settings.HISTORY_WRITE_FLUSH_MS / 1000
+    stopping = False
+
+    while not stopping:
+        first = await queue.get()
+        if first is None:
+            break
+        batch = [first]
+
+        # Gather more rows until the batch is full or the flush deadline passes
+        deadline = time.monotonic() + flush_after
+        while len(batch) < batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(queue.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+
+        await _write_batch(batch)
+
+
+def start() -> None:
+    """Create the queue and start the background writer (called from main.lifespan)."""
+    global _queue, _task
+    if _task is None:
+        _queue = asyncio.Queue(maxsize=max(1, settings.HISTORY_WRITE_QUEUE_SIZE))
+        _task = asyncio.create_task(_run(_queue), name="history-writer")
+        logger.info("Chat history write-behind queue started")
+
+
+async def stop(timeout: float = 10.0) -> None:
+    """Flush everything still queued, then stop the writer."""
+    global _queue, _task
+    if _task is None:
+        return
+    queue, task = _queue, _task
+    _queue, _task = None, None          # later enqueues write synchronously
+    await queue.put(None)
+    try:
+        await asyncio.wait_for(task, timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"History writer did not flush within {timeout}s; {queue.qsize()} messages lost")
+        task.cancel()
+
+
+async def enqueue(session_id: str, role: str, message: str) -> None:
+    """
+    Queue a message for persistence; waits only if the queue is full.
+    Without a running writer (scripts, tests) the row is written directly.
+    """
+    row = {
+        "session_id": session_id,
+        "role": role,
+        "message": message,
+        "created_at": datetime.now(timezone.utc),
+    }
+    history_cache.append(session_id, role, message)
+    if _queue is None:
+        await _write_batch([row])
+        return
+    await _queue.put(row)
+
+
+def stats() -> dict:
+    return {
+        "running": _task is not None and not _task.done(),
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "queue_max_size": _queue.maxsize if _queue is not None else 0,
+        "written": _written,
+        "dropped": _dropped,
+        "batch_size": _batch_sizes.snapshot(scale=1.0, unit="rows"),
+        "flush": _flush_stats.snapshot(),
+    }
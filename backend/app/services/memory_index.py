@@ -0,0 +1,202 @@
+"""
+In-process vector index for small corpora.
+
+The portfolio corpus is a few hundred chunks, so a single float32 matrix of
+L2-normalised embeddings fits comfortably in memory and an exact top-k over
+it (one matmul + `argpartition`) takes microseconds — no network round-trip
+to Postgres on the hot path. pgvector stays the source of truth; this index
+is rebuilt from it at startup and whenever the corpus changes.
+
+The matrix can be persisted to `<path>.npy` (+ `<path>.json` for chunk ids,
+contents and sources) and loaded memory-mapped, which lets several workers share one copy
+of the pages and lets the app start even if Postgres is briefly unreachable. The
+JSON records a digest of the matrix so a pair written by two different syncs is
+rejected on load.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    """Immutable view of the index; swapped atomically so readers never lock."""
+
+    __slots__ = ("matrix", "chunk_ids", "contents", "sources", "positions")
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        chunk_ids: list[str],
+        contents: list[str],
+        sources: list[str | None],
+    ):
+        self.matrix = matrix
+        self.chunk_ids = chunk_ids
+        self.contents = contents
+        self.sources = sources
+        self.positions = {cid: i for i, cid in enumerate(chunk_ids)}
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class InMemoryVectorIndex:
+    """Exact cosine-similarity index over a float32 matrix."""
+
+    def __init__(self):
+        self._snapshot: _Snapshot | None = None
+        self._write_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def count(self) -> int:
+        snap = self._snapshot
+        return len(snap.chunk_ids) if snap else 0
+
+    def replace(self, rows: Iterable[tuple[str, str, np.ndarray, str | None]]) -> int:
+        """Replace the whole index with *rows* of (chunk_id, content, embedding, source)."""
+        chunk_ids: list[str] = []
+        contents: list[str] = []
+        sources: list[str | None] = []
+        vectors: list[np.ndarray] = []
+        for chunk_id, content, embedding, source in rows:
+            chunk_ids.append(chunk_id)
+            contents.append(content)
+            sources.append(source)
+            vectors.append(np.asarray(embedding, dtype=np.float32))
+        matrix = _normalize_rows(np.vstack(vectors)) if vectors else np.zeros((0, 0), dtype=np.float32)
+        with self._write_lock:
+            self._snapshot = _Snapshot(matrix, chunk_ids, contents, sources)
+        return len(chunk_ids)
+
+    def add(self, rows: Iterable[tuple[str, str, np.ndarray, str | None]]) -> int:
+        """Append rows whose chunk_id is not indexed yet; returns how many were added."""
+        with self._write_lock:
+            snap = self._snapshot or _Snapshot(np.zeros((0, 0), dtype=np.float32), [], [], [])
+            new = [
+                (cid, content, np.asarray(emb, dtype=np.float32), source)
+                for cid, content, emb, source in rows
+                if cid not in snap.positions
+            ]
+            if not new:
+                return 0
+            added = _normalize_rows(np.vstack([emb for _, _, emb, _ in new]))
+            matrix = np.vstack([snap.matrix, added]) if snap.chunk_ids else added
+            self._snapshot = _Snapshot(
+                matrix,
+                snap.chunk_ids + [cid for cid, _, _, _ in new],
+                snap.contents + [content for _, content, _, _ in new],
+                snap.sources + [source for _, _, _, source in new],
+            )
+            return len(new)
+
+    def clear(self) -> None:
+        with self._write_lock:
+            self._snapshot = _Snapshot(np.zeros((0, 0), dtype=np.float32), [], [], [])
+
+    def search(
+        self,
+        query_embeddings,
+        top_k: int,
+        max_distance: float | None = None,
+    ) -> list[list[tuple[str, str, str | None, float]]]:
+        """
+        For each row of *query_embeddings*, return up to *top_k*
+        (chunk_id, content, source, cosine distance) tuples, nearest first,
+        skipping chunks farther than *max_distance*. All queries are scored
+        with one matrix product.
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        snap = self._snapshot
+        if snap is None or not snap.chunk_ids or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        queries = _normalize_rows(queries)
+        scores = queries @ snap.matrix.T
+        n = scores.shape[1]
+        k = min(top_k, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n), (len(queries), n))
+
+        results = []
+        for row, candidates in zip(scores, top):
+            candidates = candidates[np.argsort(-row[candidates], kind="stable")]
+            hits = []
+            for i in candidates:
+                distance = float(1.0 - row[i])
+                if max_distance is not None and distance > max_distance:
+                    break
+                hits.append((snap.chunk_ids[i], snap.contents[i], snap.sources[i], distance))
+            results.append(hits)
+        return results
+
+    # ── persistence ────────────────────────────────────────────────────────
+    def save(self, path: str) -> None:
+        """Write the matrix to `<path>.npy` and the metadata to `<path>.json`."""
+        snap = self._snapshot
+        if snap is None:
+            return
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        meta = {
+            "digest": _digest(snap.matrix),
+            "chunk_ids": snap.chunk_ids,
+            "contents": snap.contents,
+            "sources": snap.sources,
+        }
+        # Unique temp file + rename so concurrent savers (one per worker) never
+        # share a temp file and a memory-mapped reader never sees a torn one
+        _atomic_write(f"{path}.npy", directory, lambda f: np.save(f, snap.matrix, allow_pickle=False))
+        _atomic_write(f"{path}.json", directory, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    def load(self, path: str) -> bool:
+        """Memory-map a previously saved index; returns False if none exists."""
+        if not (os.path.exists(f"{path}.npy") and os.path.exists(f"{path}.json")):
+            return False
+        matrix = np.load(f"{path}.npy", mmap_mode="r", allow_pickle=False)
+        with open(f"{path}.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if matrix.shape[0] != len(meta["chunk_ids"]) or meta.get("digest") != _digest(matrix):
+            logger.warning(f"Ignoring inconsistent vector index at {path}")
+            return False
+        with self._write_lock:
+            # Files saved before sources were tracked have none
+            sources = meta.get("sources") or [None] * len(meta["chunk_ids"])
+            self._snapshot = _Snapshot(matrix, meta["chunk_ids"], meta["contents"], sources)
+        return True
+
+
+def _digest(matrix: np.ndarray) -> str:
+    """Fingerprint of the matrix, stored alongside the metadata it belongs to."""
+    h = hashlib.sha256(str(matrix.shape).encode())
+    h.update(np.ascontiguousarray(matrix).tobytes())
+    return h.hexdigest()
+
+
+def _atomic_write(target: str, directory: str, write) -> None:
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,224 @@
+"""
+Hot-path latency instrumentation for /api/chat (and the embedding
+micro-batcher behind it), exported in the Prometheus text format on /metrics.
+
+Histograms have fixed buckets: an observation is one `bisect` plus a few
+integer increments under a lock, cheap enough to time every stage of every
+request. Label sets are small and fixed (stage / outcome names), so memory
+stays constant.
+
+Each chat request also gets a `RequestTiming` (held in a context variable)
+that collects its own stage durations; the route sends them back as a
+`Server-Timing` header (stages before the stream starts) and as a final
+`timing` SSE event (all stages, including upstream time-to-first-byte).
+Stages timed outside a request (scripts, warm-up) only feed the histograms.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator
+
+# Seconds; spans sub-millisecond cache hits to slow upstream streams
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+THROUGHPUT_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one optional label."""
+
+    def __init__(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS, label: str | None = None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.label = label
+        self._series: dict[str, list] = {}     # label value → [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: str = "") -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_value, series in sorted(snapshot.items()):
+            labels = f'{self.label}="{label_value}",' if self.label else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}le="+Inf"}} {series[-1]}')
+            suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{suffix} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter with one label."""
+
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str, amount: int = 1) -> None:
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f'{self.name}{{{self.label}="{k}"}} {v}' for k, v in sorted(snapshot.items())]
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "chat_stage_seconds",
+    "Duration of each /api/chat stage (rate_limit, history_load, history_save, embedding, "
+    "answer_cache, retrieval, prompt_build, upstream_ttfb, stream, total).",
+    label="stage",
+)
+STREAM_TOKENS_PER_SECOND = Histogram(
+    "chat_stream_tokens_per_second",
+    "Upstream streaming rate (deltas per second after the first token).",
+    buckets=RATE_BUCKETS,
+)
+REQUESTS = Counter(
+    "chat_requests_total",
+    "Chat requests by outcome (ok, cached, error, disconnected, rate_limited).",
+    label="outcome",
+)
+
+
+# Embedding micro-batcher (services/embedding_batcher.py)
+EMBEDDING_QUEUE_WAIT_SECONDS = Histogram(
+    "embedding_batch_queue_wait_seconds",
+    "Time a query waits in the micro-batcher queue before its forward pass starts.",
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Queries encoded per micro-batch forward pass.",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+EMBEDDING_ENCODE_SECONDS = Histogram(
+    "embedding_batch_encode_seconds",
+    "Duration of each micro-batch forward pass.",
+)
+EMBEDDING_THROUGHPUT = Histogram(
+    "embedding_batch_items_per_second",
+    "Micro-batch throughput: queries encoded per second of forward pass.",
+    buckets=THROUGHPUT_BUCKETS,
+)
+
+_registry = [
+    STAGE_SECONDS, STREAM_TOKENS_PER_SECOND, REQUESTS,
+    EMBEDDING_QUEUE_WAIT_SECONDS, EMBEDDING_BATCH_SIZE, EMBEDDING_ENCODE_SECONDS, EMBEDDING_THROUGHPUT,
+]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in _registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# ── Per-request timing ─────────────────────────────────────────────────────
+class RequestTiming:
+    """Stage durations of one request (a stage timed twice is summed)."""
+
+    __slots__ = ("start", "stages", "tokens_per_second")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.tokens_per_second: float | None = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage)
+
+    def finish(self) -> None:
+        """Record the `total` stage: request start until now."""
+        self.record("total", time.perf_counter() - self.start)
+
+    def server_timing(self) -> str:
+        """The stages so far as a `Server-Timing` header value."""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+    def as_dict(self) -> dict:
+        out: dict = {f"{stage}_ms": round(seconds * 1000, 2) for stage, seconds in self.stages.items()}
+        if self.tokens_per_second is not None:
+            out["tokens_per_s"] = round(self.tokens_per_second, 1)
+        return out
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def start_request() -> RequestTiming:
+    """Begin timing the current request; later `stage()` blocks report into it."""
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def observe(stage: str, seconds: float) -> None:
+    timing = _current.get()
+    if timing is not None:
+        timing.record(stage, seconds)
+    else:
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage *name*."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+async def timed_stream(tokens: AsyncIterator[str], timing: RequestTiming) -> AsyncIterator[str]:
+    """
+    Pass *tokens* through, recording upstream time-to-first-byte, total stream
+    duration and tokens/sec into *timing*. Closes *tokens* when closed.
+    """
+    start = time.perf_counter()
+    first: float | None = None
+    count = 0
+    try:
+        async for token in tokens:
+            if first is None:
+                first = time.perf_counter()
+                timing.record("upstream_ttfb", first - start)
+            count += 1
+            yield token
+    finally:
+        await tokens.aclose()
+        end = time.perf_counter()
+        timing.record("stream", end - start)
+        if first is not None and count > 1 and end > first:
+            timing.tokens_per_second = (count - 1) / (end - first)
+            STREAM_TOKENS_PER_SECOND.observe(timing.tokens_per_second)
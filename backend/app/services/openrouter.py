@@ -1,19 +1,172 @@
+import asyncio
 import json
 import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator
 import httpx
 from ..config import settings
+from .stats import LatencyStats
 
 logger = logging.getLogger(__name__)
 
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_URL = f"{settings.OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
 
+# Upstream statuses worth retrying (on the same or another model) before the first token
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
 
-async def stream_openrouter(messages: list[dict]) -> str:
+# ── Shared HTTP client ─────────────────────────────────────────────────────
+# One pooled client for the whole app lifetime (opened in main.lifespan), so
+# chat turns reuse warm keep-alive / HTTP/2 connections instead of paying
+# DNS + TCP + TLS before the first token.
+_client: httpx.AsyncClient | None = None
+
+# Time to response headers (TTFB) and to the first content token (TTFT)
+_ttfb_stats = LatencyStats()
+_ttft_stats = LatencyStats()
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.OPENROUTER_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENROUTER_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OPENROUTER_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.OPENROUTER_CONNECT_TIMEOUT_SECONDS,
+        read=settings.OPENROUTER_READ_TIMEOUT_SECONDS,
+        write=settings.OPENROUTER_CONNECT_TIMEOUT_SECONDS,
+        pool=settings.OPENROUTER_CONNECT_TIMEOUT_SECONDS,
+    )
+    try:
+        return httpx.AsyncClient(http2=settings.OPENROUTER_HTTP2, limits=limits, timeout=timeout)
+    except ImportError:
+        # http2=True needs the optional `h2` package (httpx[http2])
+        logger.warning("HTTP/2 support not installed; falling back to HTTP/1.1 keep-alive")
+        return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use (e.g. outside the app)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def start_client() -> None:
+    """Create the shared client and pre-warm a connection to OpenRouter."""
+    client = get_client()
+    start = time.perf_counter()
+    try:
+        # Any request opens (and keeps alive) the TLS connection; the status is irrelevant
+        await client.head(OPENROUTER_URL)
+        logger.info(f"Pre-warmed OpenRouter connection in {1000 * (time.perf_counter() - start):.0f}ms")
+    except httpx.HTTPError as e:
+        logger.warning(f"Could not pre-warm OpenRouter connection: {e}")
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+# ── Per-model health ───────────────────────────────────────────────────────
+@dataclass
+class _ModelStats:
+    """Latency and error history of one model; drives the fallback order."""
+    attempts: int = 0
+    successes: int = 0
+    failures: int = 0
+    hedges_won: int = 0
+    error_rate: float = 0.0          # EWMA of failures (0 = healthy, 1 = always failing)
+    cooldown_until: float = 0.0      # set from Retry-After on 429
+    last_error: str | None = None
+    ttft: LatencyStats = field(default_factory=lambda: LatencyStats(window=200))
+
+    def record_success(self, ttft_s: float) -> None:
+        self.successes += 1
+        self.error_rate *= 0.8
+        self.ttft.observe(ttft_s)
+
+    def record_failure(self, error: str, retry_after: float | None = None) -> None:
+        self.failures += 1
+        self.error_rate = 0.8 * self.error_rate + 0.2
+        self.last_error = error
+        if retry_after:
+            self.cooldown_until = time.monotonic() + retry_after
+
+
+_model_stats: dict[str, _ModelStats] = {}
+
+
+def _stats_for(model: str) -> _ModelStats:
+    if model not in _model_stats:
+        _model_stats[model] = _ModelStats()
+    return _model_stats[model]
+
+
+def configured_models() -> list[str]:
+    """OPENROUTER_MODEL followed by OPENROUTER_FALLBACK_MODELS (comma-separated), de-duplicated."""
+    models = [settings.OPENROUTER_MODEL]
+    models += [m.strip() for m in settings.OPENROUTER_FALLBACK_MODELS.split(",") if m.strip()]
+    return list(dict.fromkeys(models))
+
+
+def _ordered_models() -> list[str]:
     """
-    Stream chat completions from OpenRouter.
+    Configured models re-ordered by observed health: models cooling down after
+    a 429 or failing most of the time go last; among the rest, the one with
+    the lowest median time-to-first-token goes first. Models without samples
+    keep their configured position behind measured ones.
+    """
+    now = time.monotonic()
+    configured = configured_models()
 
-    Yields extracted text content tokens (not raw JSON).
-    Raises on HTTP errors or connection failures.
+    def key(item: tuple[int, str]):
+        idx, model = item
+        stats = _stats_for(model)
+        median = stats.ttft.percentile(0.5)
+        return (
+            stats.cooldown_until > now,
+            stats.error_rate >= 0.5,
+            median if median is not None else float("inf"),
+            idx,
+        )
+
+    return [model for _, model in sorted(enumerate(configured), key=key)]
+
+
+def client_stats() -> dict:
+    """Upstream latency percentiles for /stats."""
+    return {
+        "http2": settings.OPENROUTER_HTTP2,
+        "ttfb": _ttfb_stats.snapshot(),
+        "ttft": _ttft_stats.snapshot(),
+        "model_order": _ordered_models(),
+        "models": {
+            model: {
+                "attempts": s.attempts,
+                "successes": s.successes,
+                "failures": s.failures,
+                "hedges_won": s.hedges_won,
+                "error_rate": round(s.error_rate, 3),
+                "last_error": s.last_error,
+                "ttft": s.ttft.snapshot(),
+            }
+            for model, s in _model_stats.items()
+        },
+    }
+
+
+# ── Streaming ──────────────────────────────────────────────────────────────
+async def _model_stream(model: str, messages: list[dict]) -> AsyncIterator[str]:
+    """
+    Stream one completion from *model*, yielding text tokens.
+    Raises httpx.HTTPStatusError for non-200 responses before any token.
     """
     headers = {
         "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
@@ -21,48 +174,194 @@ async def stream_openrouter(messages: list[dict]) -> str:
     }
 
     payload = {
-        "model": settings.OPENROUTER_MODEL,
+        "model": model,
         "messages": messages,
         "stream": True,
     }
 
+    stats = _stats_for(model)
+    stats.attempts += 1
+    start = time.perf_counter()
+    first_token = True
+
+    async with get_client().stream("POST", OPENROUTER_URL, headers=headers, json=payload) as response:
+        _ttfb_stats.observe(time.perf_counter() - start)
+
+        # Check for HTTP errors (401, 429, 500, etc.)
+        if response.status_code != 200:
+            error_body = await response.aread()
+            logger.error(f"OpenRouter API error {response.status_code} ({model}): {error_body.decode()}")
+            raise httpx.HTTPStatusError(
+                f"OpenRouter returned {response.status_code}",
+                request=response.request,
+                response=response
+            )
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+
+            data = line[len("data:"):].strip()
+
+            # Stream end signal
+            if data == "[DONE]":
+                break
+
+            try:
+                parsed = json.loads(data)
+                # Extract the actual text content from the SSE payload
+                delta = parsed.get("choices", [{}])[0].get("delta", {})
+                content = delta.get("content")
+                if content:
+                    if first_token:
+                        ttft = time.perf_counter() - start
+                        _ttft_stats.observe(ttft)
+                        stats.record_success(ttft)
+                        first_token = False
+                    yield content
+            except (json.JSONDecodeError, IndexError, KeyError) as e:
+                logger.warning(f"Failed to parse SSE chunk: {data!r} — {e}")
+                continue
+
+
+async def _discard(task: asyncio.Future, stream: AsyncIterator[str]) -> None:
+    """Cancel a losing/abandoned attempt and close its upstream response."""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await stream.aclose()
+
+
+async def _first_token(
+    messages: list[dict],
+    model: str,
+    hedge_model: str | None,
+) -> tuple[str, AsyncIterator[str], str | None]:
+    """
+    Start *model* and wait for its first token. If hedging is enabled and no
+    token arrives within OPENROUTER_HEDGE_AFTER_MS, also start *hedge_model*;
+    whichever produces a token first wins and the other is cancelled.
+
+    Returns (winning model, its token stream, first token or None if the
+    stream ended empty). Re-raises the last error if every contender failed.
+    """
+    contenders: dict[asyncio.Future, tuple[str, AsyncIterator[str]]] = {}
+
+    def launch(m: str) -> None:
+        stream = _model_stream(m, messages)
+        contenders[asyncio.ensure_future(stream.__anext__())] = (m, stream)
+
+    launch(model)
+    hedge_delay = settings.OPENROUTER_HEDGE_AFTER_MS / 1000 if hedge_model else None
+    last_error: BaseException | None = None
+
     try:
-        async with httpx.AsyncClient(timeout=60) as client:
-            async with client.stream("POST", OPENROUTER_URL, headers=headers, json=payload) as response:
-                # Check for HTTP errors (401, 429, 500, etc.)
-                if response.status_code != 200:
-                    error_body = await response.aread()
-                    logger.error(f"OpenRouter API error {response.status_code}: {error_body.decode()}")
-                    raise httpx.HTTPStatusError(
-                        f"OpenRouter returned {response.status_code}",
-                        request=response.request,
-                        response=response
+        while contenders:
+            done, _ = await asyncio.wait(
+                contenders, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                logger.info(f"No token from {model} after {settings.OPENROUTER_HEDGE_AFTER_MS}ms; hedging with {hedge_model}")
+                launch(hedge_model)
+                hedge_delay = None
+                continue
+
+            for task in done:
+                m, stream = contenders.pop(task)
+                try:
+                    token = task.result()
+                except StopAsyncIteration:
+                    return m, stream, None
+                except Exception as e:
+                    last_error = e
+                    status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                    _stats_for(m).record_failure(
+                        f"HTTP {status}" if status else type(e).__name__,
+                        _retry_after(e),
                     )
+                    continue
+                if m != model:
+                    _stats_for(m).hedges_won += 1
+                return m, stream, token
 
-                async for line in response.aiter_lines():
-                    if not line.startswith("data:"):
-                        continue
+            # The primary failed before the hedge timer fired: no point hedging now
+            if hedge_delay is not None and not contenders:
+                break
+    finally:
+        for task, (_, stream) in list(contenders.items()):
+            await _discard(task, stream)
 
-                    data = line[len("data:"):].strip()
+    raise last_error
 
-                    # Stream end signal
-                    if data == "[DONE]":
-                        break
 
-                    try:
-                        parsed = json.loads(data)
-                        # Extract the actual text content from the SSE payload
-                        delta = parsed.get("choices", [{}])[0].get("delta", {})
-                        content = delta.get("content")
-                        if content:
-                            yield content
-                    except (json.JSONDecodeError, IndexError, KeyError) as e:
-                        logger.warning(f"Failed to parse SSE chunk: {data!r} — {e}")
-                        continue
+def _retry_after(error: BaseException) -> float | None:
+    if isinstance(error, httpx.HTTPStatusError):
+        value = error.response.headers.get("retry-after")
+        try:
+            return min(float(value), 60.0) if value else None
+        except ValueError:
+            return None
+    return None
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError,))
+
+
+def _backoff_seconds(attempt: int, error: BaseException) -> float:
+    """Exponential backoff with full jitter, capped; never longer than Retry-After suggests."""
+    base = settings.OPENROUTER_RETRY_BACKOFF_MS / 1000
+    delay = random.uniform(0, base * (2 ** attempt))
+    retry_after = _retry_after(error)
+    return min(delay, retry_after) if retry_after is not None else min(delay, 5.0)
+
+
+async def stream_openrouter(messages: list[dict]) -> AsyncIterator[str]:
+    """
+    Stream chat completions from OpenRouter.
+
+    Yields extracted text content tokens (not raw JSON).
+    Raises on HTTP errors or connection failures.
+
+    Models are tried in health order (see `_ordered_models`). A 429/5xx or
+    connection error before the first token is retried with backoff on the
+    next model, up to OPENROUTER_MAX_ATTEMPTS. With OPENROUTER_HEDGE_AFTER_MS
+    set, a slow first token also triggers a hedged request to the next model.
+    Errors after the first token cannot be retried and propagate as before.
+    """
+    models = _ordered_models()
+    max_attempts = max(1, settings.OPENROUTER_MAX_ATTEMPTS)
+    hedging = settings.OPENROUTER_HEDGE_AFTER_MS > 0 and len(models) > 1
+
+    try:
+        for attempt in range(max_attempts):
+            model = models[attempt % len(models)]
+            hedge_model = models[(attempt + 1) % len(models)] if hedging else None
+            try:
+                winner, stream, first = await _first_token(messages, model, hedge_model)
+            except Exception as e:
+                if attempt + 1 >= max_attempts or not _is_retryable(e):
+                    raise
+                delay = _backoff_seconds(attempt, e)
+                logger.warning(f"OpenRouter attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if winner != settings.OPENROUTER_MODEL:
+                logger.info(f"Serving response from fallback model {winner}")
+            try:
+                if first is not None:
+                    yield first
+                async for token in stream:
+                    yield token
+            finally:
+                await stream.aclose()
+            return
 
     except httpx.ConnectError:
         logger.error("Failed to connect to OpenRouter API")
         raise RuntimeError("Could not connect to the AI service. Please try again later.")
     except httpx.TimeoutException:
         logger.error("OpenRouter API request timed out")
-        raise RuntimeError("AI service request timed out. Please try again.")
\ No newline at end of file
+        raise RuntimeError("AI service request timed out. Please try again.")
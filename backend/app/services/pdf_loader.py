@@ -1,29 +1,56 @@
+import logging
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator
+
 from pypdf import PdfReader
 
+logger = logging.getLogger(__name__)
+
+# Below this many pages a process pool costs more than it saves
+_PARALLEL_MIN_PAGES = 8
+
+# ── Patterns (compiled once) ───────────────────────────────────────────────
+# A run of single characters separated by single spaces, starting at a word
+# boundary. No trailing assertion, so the greedy `+` never backtracks and a
+# scan is linear; the end of the run is checked in `_collapse` instead.
+_SPACED_RUN = re.compile(r'(?<!\w)[A-Za-z0-9](?: [A-Za-z0-9])+')
+_WORD_CHAR = re.compile(r'\w')
+
+_ICON_PREFIX = re.compile(r'/[a-z][a-z0-9\-]+\b', re.IGNORECASE)       # /envelope /linkedin /github etc.
+# Stray Unicode symbols/private-use chars from icon fonts, plus glyph fragments
+# (¶ is inside the Latin range kept by the first class, so it is listed explicitly)
+_SYMBOLS = re.compile(
+    r'[^\x00-\x7F\u00A0-\u024F\u2013\u2014\u2018\u2019\u201C\u201D\u2022\u2026\u20B9]|[⌢♂¶▪◦●◆■□▶►]'
+)
+_ICON_RESIDUE = re.compile(r'\b(mobile-alt|envelope|alt)\b', re.IGNORECASE)
+_MULTI_SPACE = re.compile(r' {2,}')
+_TWO_ALNUM = re.compile(r'[A-Za-z0-9][^A-Za-z0-9]*[A-Za-z0-9]')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def _collapse(m: re.Match) -> str:
+    run, tail = m.group(0), ''
+    # The run must end before a non-word character: if its last letter runs
+    # into a word ("a b cd"), that letter isn't part of it
+    if _WORD_CHAR.match(m.string, m.end()):
+        run, tail = run[:-2], run[-2:]
+    if len(run) < 5:                          # fewer than 3 characters
+        return m.group(0)
+    return run.replace(' ', '') + tail
+
 
 def _fix_spaced_chars(text: str) -> str:
     """
     Fix PDF font-encoding artefact where each character is extracted with a
     space between it, e.g. 'N a x c u r e' → 'Naxcure'.
-    """
-    pattern = re.compile(
-        r'(?<!\w)'
-        r'([A-Za-z0-9])'
-        r'(?: ([A-Za-z0-9]))'
-        r'(?: ([A-Za-z0-9]))+'
-        r'(?!\w)'
-    )
-
-    def _collapse(m: re.Match) -> str:
-        return m.group(0).replace(' ', '')
 
-    prev = None
-    while prev != text:
-        prev = text
-        text = pattern.sub(_collapse, text)
-
-    return text
+    One linear pass: a collapsed run becomes a multi-character word, which can
+    never start or extend another run, so no fixed-point loop is needed.
+    """
+    return _SPACED_RUN.sub(_collapse, text)
 
 
 def _clean_pdf_symbols(text: str) -> str:
@@ -33,56 +60,110 @@ def _clean_pdf_symbols(text: str) -> str:
       /envel⌢pe  ♂¶obile-alt  /linkedin  /github  etc.
     Also strips control characters and normalises whitespace.
     """
-    # Remove common PDF-icon prefixes left by font extraction
-    text = re.sub(r'/[a-z][a-z0-9\-]+\b', '', text, flags=re.IGNORECASE)  # /envelope /linkedin /github etc.
-    # Remove stray Unicode symbols/private-use chars from icon fonts
-    text = re.sub(r'[^\x00-\x7F\u00A0-\u024F\u2013\u2014\u2018\u2019\u201C\u201D\u2022\u2026\u20B9]', '', text)
-    # Remove leftover glyph fragments like ⌢ ♂ ¶ and other misc symbols
-    text = re.sub(r'[⌢♂¶▪◦●◆■□▶►]', '', text)
-    # Strip icon-font residue patterns like "mobile-alt" or "alt" on their own after stripping prefix
-    text = re.sub(r'\b(mobile-alt|envelope|alt)\b', '', text, flags=re.IGNORECASE)
+    # Icon prefixes go first: dropping symbols before would join "/env⌢elope" into one word
+    text = _ICON_PREFIX.sub('', text)
+    text = _SYMBOLS.sub('', text)
+    # Strip icon-font residue like "mobile-alt" or "alt" on their own after stripping prefix
+    text = _ICON_RESIDUE.sub('', text)
     # Collapse multiple spaces that are now left over
-    text = re.sub(r' {2,}', ' ', text)
-    # Remove lines that are purely whitespace or have only a few noise characters
-    lines = text.splitlines()
+    text = _MULTI_SPACE.sub(' ', text)
+    # Keep a line only if it has at least 2 real alphanumeric characters;
+    # blank lines are preserved for paragraph separation
     cleaned_lines = []
-    for line in lines:
+    for line in text.splitlines():
         stripped = line.strip()
-        # Keep the line only if it has at least 2 real alphanumeric characters
-        if len(re.sub(r'[^A-Za-z0-9]', '', stripped)) >= 2:
+        if stripped == '' or _TWO_ALNUM.search(stripped):
             cleaned_lines.append(stripped)
-        elif stripped == '':
-            cleaned_lines.append('')  # preserve blank lines for paragraph separation
     # Collapse runs of 3+ blank lines into double newline
-    text = '\n'.join(cleaned_lines)
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _BLANK_LINES.sub('\n\n', '\n'.join(cleaned_lines))
     return text.strip()
 
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract and clean text from a PDF file."""
+def clean_page(page_text: str) -> str:
+    """Clean the extracted text of one page."""
+    cleaned = page_text.strip()
+    cleaned = _fix_spaced_chars(cleaned)      # 1. collapse spaced-out chars first
+    return _clean_pdf_symbols(cleaned)        # 2. strip icon/glyph artefacts
+
+
+# ── Page pipeline ──────────────────────────────────────────────────────────
+# Each pool worker opens the PDF once and extracts + cleans the pages it is given
+_worker_reader: PdfReader | None = None
+
+
+def _init_worker(pdf_path: str) -> None:
+    global _worker_reader
+    _worker_reader = PdfReader(pdf_path)
+
+
+def _extract_page(index: int) -> str:
+    return clean_page(_worker_reader.pages[index].extract_text() or '')
+
+
+def _open(pdf_path: str) -> PdfReader:
     try:
-        reader = PdfReader(pdf_path)
+        return PdfReader(pdf_path)
     except FileNotFoundError:
         raise FileNotFoundError(f"PDF file not found at: {pdf_path}")
     except Exception as e:
         raise RuntimeError(f"Failed to read PDF: {e}")
 
-    if len(reader.pages) == 0:
+
+def iter_pdf_pages(pdf_path: str, workers: int | None = None) -> Iterator[str]:
+    """
+    Yield the cleaned text of each page of *pdf_path*, in page order, as soon
+    as it is ready. Large documents are extracted and cleaned across a process
+    pool of *workers* processes (default: PDF_WORKERS; 0 = one per CPU,
+    1 = in this process). Pages without text yield an empty string.
+    """
+    reader = _open(pdf_path)
+    n_pages = len(reader.pages)
+    if n_pages == 0:
         raise ValueError("PDF has no pages.")
 
+    if workers is None:
+        from ..config import settings
+
+        workers = settings.PDF_WORKERS
+    workers = min(workers or os.cpu_count() or 1, n_pages)
+
+    if workers <= 1 or n_pages < _PARALLEL_MIN_PAGES:
+        for page in reader.pages:
+            yield clean_page(page.extract_text() or '')
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pdf_path,)) as pool:
+        # map() keeps page order; chunks amortise the per-task IPC
+        yield from pool.map(_extract_page, range(n_pages), chunksize=max(1, n_pages // (workers * 4)))
+
+
+def extract_text_from_pdf(
+    pdf_path: str,
+    workers: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> str:
+    """
+    Extract and clean text from a PDF file. *progress*, if given, is called
+    with (pages done, characters so far) after each page.
+    """
+    start = time.perf_counter()
     text_parts: list[str] = []
+    pages = chars = 0
 
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            cleaned = page_text.strip()
-            cleaned = _fix_spaced_chars(cleaned)      # 1. collapse spaced-out chars first
-            cleaned = _clean_pdf_symbols(cleaned)     # 2. strip icon/glyph artefacts
-            if cleaned:
-                text_parts.append(cleaned)
+    for cleaned in iter_pdf_pages(pdf_path, workers):
+        pages += 1
+        if cleaned:
+            text_parts.append(cleaned)
+            chars += len(cleaned)
+        if progress:
+            progress(pages, chars)
 
     if not text_parts:
         raise ValueError("No text could be extracted from the PDF.")
 
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Extracted {pages} pages ({chars:,} chars) from {pdf_path} in {elapsed:.2f}s "
+        f"({pages / elapsed if elapsed else 0:,.1f} pages/s)"
+    )
     return "\n\n".join(text_parts)
@@ -1,6 +1,19 @@
-from .vector_store import query_vector_store
+import logging
+import re
+from functools import lru_cache
+from typing import Sequence
+
+from starlette.concurrency import run_in_threadpool
+
+from . import metrics
+from .embeddings import count_tokens, count_tokens_many
+from .text_chunker import iter_sentences
+from .vector_store import RetrievedChunk
+from .retrieval import retrieve, retrieve_async
 from ..config import settings
 
+logger = logging.getLogger(__name__)
+
 SYSTEM_PROMPT = """\
 You are a portfolio assistant for Aman Paswan. Your ONLY job is to answer questions \
 using the CONTEXT provided in each user message.
@@ -40,8 +53,127 @@ def build_messages(
     if top_k is None:
         top_k = settings.TOP_K_RESULTS
 
-    # 1. Retrieve relevant context from vector store
-    context_chunks = query_vector_store(user_query, top_k=top_k)
+    # 1. Retrieve relevant context (vector search, fused with BM25 in hybrid mode)
+    with metrics.stage("retrieval"):
+        scored_chunks = retrieve(user_query, top_k=top_k)
+    with metrics.stage("prompt_build"):
+        return _assemble_messages(user_query, scored_chunks, chat_history)
+
+
+async def build_messages_async(
+    user_query: str,
+    chat_history: list[dict] | None = None,
+    top_k: int | None = None,
+    query_embedding: Sequence[float] | None = None,
+) -> list[dict]:
+    """
+    Async counterpart of `build_messages()` for the request path.
+    Embedding and retrieval are awaited instead of blocking the event loop;
+    *query_embedding* skips re-encoding when the caller already has it.
+    """
+    if top_k is None:
+        top_k = settings.TOP_K_RESULTS
+
+    with metrics.stage("retrieval"):
+        scored_chunks = await retrieve_async(user_query, top_k=top_k, query_embedding=query_embedding)
+    # Token counting is synchronous tokenizer work: keep it off the event loop
+    with metrics.stage("prompt_build"):
+        return await run_in_threadpool(_assemble_messages, user_query, scored_chunks, chat_history)
+
+
+# ── Prompt budgeting ───────────────────────────────────────────────────────
+# Prompt length drives upstream time-to-first-token, so retrieved context and
+# history are each fitted into a token budget before the prompt is built.
+_WS_RE = re.compile(r"\s+")
+_MIN_TRUNCATED_TOKENS = 32
+
+
+@lru_cache(maxsize=1)
+def _system_prompt_tokens() -> int:
+    return count_tokens(SYSTEM_PROMPT)
+
+
+def _within(budget: int, used: int, tokens: int) -> bool:
+    return budget <= 0 or used + tokens <= budget
+
+
+def select_context(
+    scored_chunks: list[RetrievedChunk],
+    budget: int,
+) -> tuple[list[str], int]:
+    """
+    Pick retrieved chunks (best first) for the prompt.
+
+    Irrelevant chunks were already cut off by retrieval (MIN_CHUNK_SIMILARITY).
+    Sentences already included via a higher-ranked chunk (the overlap
+    `chunk_text` adds between neighbours) are removed, and chunks are added
+    while they fit in *budget* tokens. All candidates are counted in one
+    tokenizer call. Returns (chunks, tokens used).
+    """
+    seen: set[str] = set()
+    candidates: list[str] = []
+    for chunk in scored_chunks:
+        fresh = []
+        for sentence in iter_sentences((chunk.content,)):
+            key = _WS_RE.sub(" ", sentence).lower()
+            if key not in seen:
+                seen.add(key)
+                fresh.append(sentence)
+        if fresh:
+            candidates.append(" ".join(fresh))
+
+    selected: list[str] = []
+    used = 0
+    for text, tokens in zip(candidates, count_tokens_many(candidates)):
+        if not _within(budget, used, tokens):
+            # A smaller, lower-ranked chunk may still fit
+            continue
+        selected.append(text)
+        used += tokens
+    return selected, used
+
+
+def select_history(chat_history: list[dict], budget: int) -> tuple[list[dict], int]:
+    """
+    Keep the most recent user/assistant turns that fit in *budget* tokens.
+
+    Walks backwards from the newest message; the first one that doesn't fit
+    whole is truncated to the remaining budget (if a useful amount is left)
+    and everything older is dropped. Returns (messages in chronological
+    order, tokens used).
+    """
+    candidates = [
+        (entry.get("role", "user"), entry.get("message", ""))
+        for entry in reversed(chat_history[-settings.MAX_CHAT_HISTORY:])
+    ]
+    candidates = [(role, content) for role, content in candidates if role in ("user", "assistant") and content]
+    counts = count_tokens_many([content for _, content in candidates])
+
+    kept: list[dict] = []
+    used = 0
+    for (role, content), tokens in zip(candidates, counts):
+        if not _within(budget, used, tokens):
+            remaining = budget - used
+            if remaining >= _MIN_TRUNCATED_TOKENS:
+                # Token boundaries aren't exposed, so cut proportionally by characters
+                keep_chars = int(len(content) * remaining / tokens)
+                truncated = content[:keep_chars].rstrip() + " …"
+                kept.append({"role": role, "content": truncated})
+                used += count_tokens(truncated)
+            break
+        kept.append({"role": role, "content": content})
+        used += tokens
+    kept.reverse()
+    return kept, used
+
+
+def _assemble_messages(
+    user_query: str,
+    scored_chunks: list[RetrievedChunk],
+    chat_history: list[dict] | None,
+) -> list[dict]:
+    """Turn retrieved chunks + history into the final LLM message list."""
+    context_chunks, context_tokens = select_context(scored_chunks, settings.CONTEXT_TOKEN_BUDGET)
     context_text = "\n\n---\n\n".join(context_chunks) if context_chunks else "No relevant context found."
 
     # 2. System message
@@ -50,14 +182,11 @@ def build_messages(
     ]
 
     # 3. Add recent chat history for conversational memory
+    history: list[dict] = []
+    history_tokens = 0
     if chat_history:
-        max_history = settings.MAX_CHAT_HISTORY
-        recent_history = chat_history[-max_history:]
-        for entry in recent_history:
-            role = entry.get("role", "user")
-            content = entry.get("message", "")
-            if role in ("user", "assistant") and content:
-                messages.append({"role": role, "content": content})
+        history, history_tokens = select_history(chat_history, settings.HISTORY_TOKEN_BUDGET)
+        messages.extend(history)
 
     # 4. Embed context INSIDE the user message so the model cannot ignore it.
     #    Many free models deprioritise secondary system messages but always read
@@ -71,4 +200,11 @@ Question: {user_query}"""
 
     messages.append({"role": "user", "content": grounded_user_message})
 
-    return messages
\ No newline at end of file
+    logger.info(
+        f"Prompt tokens — system: {_system_prompt_tokens()}, "
+        f"history: {history_tokens} ({len(history)}/{len(chat_history or [])} msgs), "
+        f"context: {context_tokens} ({len(context_chunks)}/{len(scored_chunks)} chunks), "
+        f"question: {count_tokens(user_query)}"
+    )
+
+    return messages
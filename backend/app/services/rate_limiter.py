@@ -0,0 +1,235 @@
+"""
+Request rate limiting for the chat endpoint.
+
+Uses a sliding-window counter: each key stores only the count of the current
+fixed window and of the previous one, and the rate is estimated as
+
+    previous * (1 - elapsed / window) + current
+
+which smooths the burst allowed at window edges while keeping O(1) state per
+key. Two backends share the algorithm:
+
+* "memory"   — a dict in this process; idle keys are evicted periodically.
+* "database" — a row per key in `rate_limit_counters` (the app database,
+               Postgres or SQLite) updated with one atomic upsert, so the limit
+               holds across uvicorn workers and instances.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..database import engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RateLimitResult:
+    allowed: bool
+    key: str
+    retry_after: float = 0.0
+    window_start: int = 0           # window the hit was counted in (for `refund`)
+
+
+def _estimate(previous: int, current: int, window_start: int, window: int, now: float) -> float:
+    weight = 1.0 - (now - window_start) / window
+    return previous * max(weight, 0.0) + current
+
+
+def _retry_after(previous: int, current: int, window_start: int, window: int, now: float, limit: int) -> float:
+    """Seconds until the estimate drops below *limit* again (upper bound: next window)."""
+    if previous and current < limit:
+        # Wait until the previous window's weighted share has decayed enough
+        needed = 1.0 - (limit - current) / previous
+        return max(window_start + needed * window - now, 0.0) + 0.001
+    return max(window_start + window - now, 0.0)
+
+
+class MemoryRateLimiter:
+    """Per-process sliding-window counters: {key: [window_start, previous, current, last_seen]}."""
+
+    def __init__(self, limit: int, window: int, evict_interval: float):
+        self.limit = limit
+        self.window = window
+        self.evict_interval = evict_interval
+        self._counters: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._last_evict = time.time()
+
+    def hit(self, key: str) -> RateLimitResult:
+        now = time.time()
+        window_start = int(now // self.window) * self.window
+        with self._lock:
+            self._maybe_evict(now)
+            state = self._counters.get(key)
+            if state is None or state[0] < window_start - self.window:
+                state = [window_start, 0, 0, now]
+                self._counters[key] = state
+            elif state[0] < window_start:
+                # Roll over: the current window becomes the previous one
+                state[:3] = [window_start, state[2], 0]
+
+            _, previous, current, _ = state
+            state[3] = now
+            if _estimate(previous, current, window_start, self.window, now) >= self.limit:
+                wait = _retry_after(previous, current, window_start, self.window, now, self.limit)
+                return RateLimitResult(False, key, wait)
+            state[2] = current + 1
+            return RateLimitResult(True, key, window_start=window_start)
+
+    def refund(self, result: RateLimitResult) -> None:
+        """Take back an allowed hit (the request was rejected by another key)."""
+        with self._lock:
+            state = self._counters.get(result.key)
+            if state is not None and state[0] == result.window_start and state[2] > 0:
+                state[2] -= 1
+
+    def _maybe_evict(self, now: float) -> None:
+        if now - self._last_evict < self.evict_interval:
+            return
+        self._last_evict = now
+        # Keys untouched for two windows carry no weight any more
+        cutoff = now - 2 * self.window
+        stale = [k for k, state in self._counters.items() if state[3] < cutoff]
+        for k in stale:
+            del self._counters[k]
+        if stale:
+            logger.debug(f"Evicted {len(stale)} idle rate-limit keys")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "keys": len(self._counters)}
+
+
+# Rolls the window and increments in one statement. SET expressions see the
+# row as it was before the update on both Postgres and SQLite (>= 3.35 for
+# RETURNING), so concurrent workers never lose an increment.
+_UPSERT_SQL = text("""
+    INSERT INTO rate_limit_counters (key, window_start, previous_count, current_count, updated_at)
+    VALUES (:key, :window_start, 0, 1, :now)
+    ON CONFLICT (key) DO UPDATE SET
+        previous_count = CASE
+            WHEN rate_limit_counters.window_start = excluded.window_start
+                THEN rate_limit_counters.previous_count
+            WHEN rate_limit_counters.window_start = excluded.window_start - :window
+                THEN rate_limit_counters.current_count
+            ELSE 0
+        END,
+        current_count = CASE
+            WHEN rate_limit_counters.window_start = excluded.window_start
+                THEN rate_limit_counters.current_count + 1
+            ELSE 1
+        END,
+        window_start = excluded.window_start,
+        updated_at = excluded.updated_at
+    RETURNING previous_count, current_count
+""")
+
+# Rejected requests don't count against the client (same as the memory backend)
+_UNDO_SQL = text("""
+    UPDATE rate_limit_counters
+    SET current_count = current_count - 1
+    WHERE key = :key AND window_start = :window_start AND current_count > 0
+""")
+
+_EVICT_SQL = text("DELETE FROM rate_limit_counters WHERE updated_at < :cutoff")
+
+
+class DatabaseRateLimiter:
+    """Sliding-window counters shared through the `rate_limit_counters` table."""
+
+    def __init__(self, limit: int, window: int, evict_interval: float):
+        self.limit = limit
+        self.window = window
+        self.evict_interval = evict_interval
+        self._last_evict = 0.0
+
+    def hit(self, key: str) -> RateLimitResult:
+        now = time.time()
+        window_start = int(now // self.window) * self.window
+        params = {"key": key, "window_start": window_start, "window": self.window, "now": now}
+        with engine.begin() as conn:
+            previous, current = conn.execute(_UPSERT_SQL, params).one()
+            # *current* already includes this request
+            if _estimate(previous, current - 1, window_start, self.window, now) >= self.limit:
+                conn.execute(_UNDO_SQL, params)
+                wait = _retry_after(previous, current - 1, window_start, self.window, now, self.limit)
+                result = RateLimitResult(False, key, wait)
+            else:
+                result = RateLimitResult(True, key, window_start=window_start)
+            if now - self._last_evict >= self.evict_interval:
+                self._last_evict = now
+                conn.execute(_EVICT_SQL, {"cutoff": now - 2 * self.window})
+        return result
+
+    def refund(self, result: RateLimitResult) -> None:
+        """Take back an allowed hit (the request was rejected by another key)."""
+        with engine.begin() as conn:
+            conn.execute(_UNDO_SQL, {"key": result.key, "window_start": result.window_start})
+
+    def stats(self) -> dict:
+        return {"backend": "database"}
+
+
+def _build_limiter() -> MemoryRateLimiter | DatabaseRateLimiter:
+    cls = DatabaseRateLimiter if settings.RATE_LIMIT_BACKEND == "database" else MemoryRateLimiter
+    return cls(
+        limit=settings.RATE_LIMIT_MAX_REQUESTS,
+        window=settings.RATE_LIMIT_WINDOW_SECONDS,
+        evict_interval=settings.RATE_LIMIT_EVICT_INTERVAL_SECONDS,
+    )
+
+
+rate_limiter = _build_limiter()
+
+
+def client_ip(headers, peer_host: str | None) -> str:
+    """
+    Client address; X-Forwarded-For is honoured only behind a trusted proxy.
+
+    Each proxy appends the address it received the request from, and anything
+    to the left of what our own proxies added was sent by the client, so the
+    client is the entry RATE_LIMIT_TRUSTED_PROXY_HOPS from the right.
+    """
+    if settings.RATE_LIMIT_TRUST_PROXY_HEADERS:
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded:
+            hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+            if hops:
+                return hops[-min(max(settings.RATE_LIMIT_TRUSTED_PROXY_HOPS, 1), len(hops))]
+        real_ip = headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+    return peer_host or "unknown"
+
+
+def rate_limit_keys(session_id: str, ip: str) -> list[str]:
+    """Keys to charge for a request according to RATE_LIMIT_KEY."""
+    mode = settings.RATE_LIMIT_KEY
+    keys = []
+    if mode in ("session", "both"):
+        keys.append(f"session:{session_id}")
+    if mode in ("ip", "both"):
+        keys.append(f"ip:{ip}")
+    return keys
+
+
+def check(keys: list[str]) -> RateLimitResult | None:
+    """
+    Charge every key; return the first rejection, or None if all allowed.
+    A rejected request counts against none of its keys: hits already charged
+    to earlier keys are refunded.
+    """
+    charged: list[RateLimitResult] = []
+    for key in keys:
+        result = rate_limiter.hit(key)
+        if not result.allowed:
+            for earlier in charged:
+                rate_limiter.refund(earlier)
+            return result
+        charged.append(result)
+    return None
@@ -0,0 +1,176 @@
+"""
+Hybrid retrieval: cosine search (vector_store.py) fused with BM25 keyword
+search (bm25_index.py).
+
+With RETRIEVAL_MODE="hybrid" each query takes HYBRID_CANDIDATES hits from
+both retrievers and merges them with reciprocal-rank fusion:
+
+    score(chunk) = Σ 1 / (RRF_K + rank)   over the rankings it appears in
+
+RRF only looks at ranks, so cosine distances and BM25 scores never have to
+be put on a common scale. Each result keeps the raw scores of both
+retrievers so later stages can prune on them. Vector hits are cut off at
+MIN_CHUNK_SIMILARITY in the search itself; keyword matches are kept even
+when their cosine similarity is low — that is the point of the index.
+
+The BM25 index is built from pgvector at startup and rebuilt whenever the
+corpus changes (corpus_watch), which covers ingestion from the loader
+scripts in other processes.
+"""
+import logging
+import time
+from typing import Sequence
+
+from ..config import settings
+from . import corpus_watch
+from .bm25_index import BM25Index
+from .db_pool import get_async_conn, get_conn
+from .embeddings import generate_embedding_async
+from .stats import LatencyStats
+from .vector_schema import ensure_schema, ensure_schema_async
+from .vector_store import RetrievedChunk, query_vector_store_scored, query_vector_store_scored_async
+
+logger = logging.getLogger(__name__)
+
+_lexical_index = BM25Index()
+_lexical_search_stats = LatencyStats()
+
+
+def _hybrid() -> bool:
+    return settings.RETRIEVAL_MODE == "hybrid"
+
+
+def _max_distance() -> float | None:
+    """Cosine-distance cutoff for vector hits, from MIN_CHUNK_SIMILARITY."""
+    return 1.0 - settings.MIN_CHUNK_SIMILARITY if settings.MIN_CHUNK_SIMILARITY > 0 else None
+
+
+def fuse_rrf(
+    vector_hits: list[RetrievedChunk],
+    lexical_hits: list[tuple[str, str, str | None, float]],
+    top_k: int,
+    k: int = 60,
+) -> list[RetrievedChunk]:
+    """
+    Merge a vector ranking and a BM25 ranking (chunk_id, content, source, score)
+    with reciprocal-rank fusion; `score` of each result becomes its RRF score.
+    """
+    fused: dict[str, RetrievedChunk] = {}
+    for rank, chunk in enumerate(vector_hits, start=1):
+        chunk.score = 1.0 / (k + rank)
+        fused[chunk.chunk_id] = chunk
+    for rank, (chunk_id, content, source, bm25) in enumerate(lexical_hits, start=1):
+        chunk = fused.get(chunk_id)
+        if chunk is None:
+            chunk = fused[chunk_id] = RetrievedChunk(chunk_id, content, source, distance=None)
+        chunk.score += 1.0 / (k + rank)
+        chunk.lexical_score = bm25
+    return sorted(fused.values(), key=lambda c: c.score, reverse=True)[:top_k]
+
+
+def _lexical_search(query: str, top_k: int) -> list[tuple[str, str, str | None, float]]:
+    start = time.perf_counter()
+    hits = _lexical_index.search(query, top_k)
+    _lexical_search_stats.observe(time.perf_counter() - start)
+    return hits
+
+
+def retrieve(query: str, top_k: int) -> list[RetrievedChunk]:
+    """
+    Top-*top_k* chunks for *query*, best first, per RETRIEVAL_MODE. Vector
+    hits below MIN_CHUNK_SIMILARITY are dropped; keyword matches are kept.
+    """
+    if not _hybrid():
+        return query_vector_store_scored(query, top_k=top_k, max_distance=_max_distance())
+
+    candidates = max(top_k, settings.HYBRID_CANDIDATES)
+    vector_hits = query_vector_store_scored(query, top_k=candidates, max_distance=_max_distance())
+    if not _lexical_index.loaded:
+        try:
+            sync_lexical_index()
+        except Exception as e:
+            logger.warning(f"BM25 index unavailable, using vector search only: {e}")
+    return fuse_rrf(vector_hits, _lexical_search(query, candidates), top_k, settings.RRF_K)
+
+
+async def retrieve_async(
+    query: str,
+    top_k: int,
+    query_embedding: Sequence[float] | None = None,
+) -> list[RetrievedChunk]:
+    """Async variant of `retrieve()`; pass *query_embedding* if the caller already encoded the query."""
+    if query_embedding is None:
+        query_embedding = await generate_embedding_async(query)
+    if not _hybrid():
+        return await query_vector_store_scored_async(
+            query, top_k=top_k, query_embedding=query_embedding, max_distance=_max_distance()
+        )
+
+    candidates = max(top_k, settings.HYBRID_CANDIDATES)
+    vector_hits = await query_vector_store_scored_async(
+        query, top_k=candidates, query_embedding=query_embedding, max_distance=_max_distance()
+    )
+    if not _lexical_index.loaded:
+        try:
+            await sync_lexical_index_async()
+        except Exception as e:
+            logger.warning(f"BM25 index unavailable, using vector search only: {e}")
+    return fuse_rrf(vector_hits, _lexical_search(query, candidates), top_k, settings.RRF_K)
+
+
+# ---------------------------------------------------------------------------
+# BM25 index sync
+# ---------------------------------------------------------------------------
+
+_SYNC_SQL = "SELECT chunk_id, content, source FROM document_embeddings"
+
+
+def _finish_sync(n: int, start: float) -> int:
+    stats = _lexical_index.stats()
+    logger.info(
+        f"BM25 index built: {n} chunks, {stats.get('terms', 0)} terms, "
+        f"{stats.get('postings_bytes', 0) / 1024:.1f} KiB in {(time.perf_counter() - start) * 1000:.1f}ms"
+    )
+    return n
+
+
+def sync_lexical_index() -> int:
+    """Rebuild the BM25 index from pgvector. Returns the number of chunks."""
+    start = time.perf_counter()
+    ensure_schema()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_SYNC_SQL)
+            rows = cur.fetchall()
+    return _finish_sync(_lexical_index.replace(rows), start)
+
+
+async def sync_lexical_index_async() -> int:
+    """Async variant of `sync_lexical_index()`."""
+    start = time.perf_counter()
+    await ensure_schema_async()
+    async with get_async_conn() as conn:
+        rows = await conn.fetch(_SYNC_SQL)
+    return _finish_sync(_lexical_index.replace((r[0], r[1], r[2]) for r in rows), start)
+
+
+async def start_lexical_index() -> None:
+    """Startup hook: build the BM25 index (no-op unless RETRIEVAL_MODE=hybrid)."""
+    if _hybrid():
+        await sync_lexical_index_async()
+
+
+async def _resync_on_corpus_change(_version: str) -> None:
+    if _hybrid():
+        await sync_lexical_index_async()
+
+
+corpus_watch.on_change(_resync_on_corpus_change)
+
+
+def lexical_stats() -> dict:
+    return {
+        "mode": settings.RETRIEVAL_MODE,
+        **_lexical_index.stats(),
+        "search": _lexical_search_stats.snapshot(scale=1e6, unit="us"),
+    }
@@ -0,0 +1,90 @@
+"""
+Helpers for streaming LLM output as Server-Sent Events.
+
+Upstream models emit a delta every few characters; sending each as its own
+SSE event costs a frame, a syscall and a client re-render per token.
+`coalesce()` groups tokens into frames, flushing when the oldest buffered
+token has waited `window_ms` or the frame reaches `max_bytes` (0 = no
+cap). The first token is always sent immediately so time-to-first-token is
+unaffected. A window of 0 streams token by token, as before.
+"""
+import asyncio
+from typing import AsyncIterator
+
+import anyio
+
+
+async def coalesce(
+    tokens: AsyncIterator[str],
+    window_ms: float,
+    max_bytes: int,
+) -> AsyncIterator[str]:
+    """Yield *tokens* grouped into frames; closes *tokens* when done or closed."""
+    if window_ms <= 0:
+        try:
+            async for token in tokens:
+                yield token
+        finally:
+            await tokens.aclose()
+        return
+
+    loop = asyncio.get_running_loop()
+    window = window_ms / 1000
+    buffer: list[str] = []
+    size = 0
+    deadline = 0.0
+    first = True
+    pending: asyncio.Future | None = None
+
+    try:
+        while True:
+            if not buffer:
+                # Nothing waiting to be sent: block on upstream without a timer
+                if pending is None:
+                    pending = asyncio.ensure_future(tokens.__anext__())
+                await asyncio.wait({pending})
+            else:
+                if pending is None:
+                    pending = asyncio.ensure_future(tokens.__anext__())
+                done, _ = await asyncio.wait({pending}, timeout=max(deadline - loop.time(), 0))
+                if not done:
+                    # Window elapsed while upstream is still thinking: flush what we have
+                    yield "".join(buffer)
+                    buffer, size = [], 0
+                    continue
+
+            task, pending = pending, None
+            try:
+                token = task.result()
+            except StopAsyncIteration:
+                break
+            except BaseException:
+                if buffer:
+                    yield "".join(buffer)
+                    buffer = []
+                raise
+
+            if first:
+                first = False
+                yield token
+                continue
+
+            if not buffer:
+                deadline = loop.time() + window
+            buffer.append(token)
+            size += len(token.encode("utf-8"))
+            if max_bytes > 0 and size >= max_bytes:
+                yield "".join(buffer)
+                buffer, size = [], 0
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # Shielded: when the client disconnects this runs inside a cancelled
+        # scope, and the upstream response must still be closed, not leaked.
+        # (asyncio.gather would re-cancel the task mid-close; wait doesn't.)
+        with anyio.CancelScope(shield=True):
+            if pending is not None:
+                pending.cancel()
+                await asyncio.wait({pending})
+            await tokens.aclose()
@@ -0,0 +1,56 @@
+"""
+Small rolling latency/size statistics used for runtime stats (/stats).
+
+Keeps the last N samples in a ring buffer so percentiles reflect recent
+behaviour, plus lifetime count and sum.
+"""
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    """Rolling window of samples with count/mean/percentile snapshots."""
+
+    def __init__(self, window: int = 1000):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+            self.total += value
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        return _percentile(samples, q)
+
+    def snapshot(self, scale: float = 1000.0, unit: str = "ms") -> dict:
+        """Summary of the window; values are multiplied by *scale* (s → ms by default)."""
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total
+        if not samples:
+            return {"count": count}
+
+        def fmt(v: float | None) -> float | None:
+            return round(v * scale, 3) if v is not None else None
+
+        return {
+            "count": count,
+            f"mean_{unit}": fmt(total / count),
+            f"p50_{unit}": fmt(_percentile(samples, 0.50)),
+            f"p95_{unit}": fmt(_percentile(samples, 0.95)),
+            f"p99_{unit}": fmt(_percentile(samples, 0.99)),
+            f"max_{unit}": fmt(samples[-1]),
+        }
+
+
+def _percentile(sorted_samples: list[float], q: float) -> float | None:
+    if not sorted_samples:
+        return None
+    idx = min(len(sorted_samples) - 1, max(0, int(round(q * (len(sorted_samples) - 1)))))
+    return sorted_samples[idx]
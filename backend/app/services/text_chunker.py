@@ -1,4 +1,16 @@
 import re
+from collections import deque
+from typing import Callable, Iterable, Iterator, Literal
+
+ChunkUnit = Literal["chars", "tokens"]
+
+# Where a sentence ends: whitespace after sentence-ending punctuation, or a
+# blank line (section breaks in resumes). Only matched when non-whitespace
+# follows, so the text after it can't change how the text before it splits.
+_SENTENCE_BOUNDARY = re.compile(r'(?:(?<=[.!?])\s+|\s*\n\n\s*)(?=\S)')
+
+# [CLS] and [SEP] count against the model's max_seq_length
+_SPECIAL_TOKENS = 2
 
 
 def _split_into_sentences(text: str) -> list[str]:
@@ -16,59 +28,125 @@ def _split_into_sentences(text: str) -> list[str]:
     return sentences
 
 
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
+def iter_sentences(pieces: Iterable[str]) -> Iterator[str]:
     """
-    Split text into overlapping chunks using sentence-aware boundaries.
+    Sentences of the concatenation of *pieces* (pages, lines, file reads …),
+    exactly as `_split_into_sentences` would split the whole text, yielded
+    as soon as they are complete. Only the current unfinished sentence is
+    buffered.
+    """
+    buffer = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        # Resume the boundary search where the previous one left off: the last
+        # non-whitespace character (a boundary's punctuation) onwards
+        scan_from = max(len(buffer.rstrip()) - 1, 0)
+        buffer += piece
+        cut = 0
+        for m in _SENTENCE_BOUNDARY.finditer(buffer, scan_from):
+            cut = m.end()
+        if cut:
+            yield from _split_into_sentences(buffer[:cut])
+            buffer = buffer[cut:]
+    if buffer:
+        yield from _split_into_sentences(buffer)
+
 
-    Instead of splitting mid-word/sentence, this accumulates full sentences
-    until the chunk_size limit is reached, then starts a new chunk with
-    overlap from the previous one.
+def _token_sized(sentences: Iterable[str], limit: int, count: Callable[[str], int]) -> Iterator[tuple[str, int]]:
     """
-    sentences = _split_into_sentences(text)
+    (sentence, token count) pairs; sentences longer than *limit* tokens are
+    broken between words into pieces of at most *limit* tokens.
+    """
+    for sentence in sentences:
+        size = count(sentence)
+        if size <= limit:
+            yield sentence, size
+            continue
+        window: list[str] = []
+        size = 0
+        for word in sentence.split():
+            cost = count(word)
+            if window and size + cost > limit:
+                yield " ".join(window), size
+                window, size = [], 0
+            window.append(word)
+            size += cost
+        if window:
+            yield " ".join(window), size
 
-    if not sentences:
-        return []
 
-    chunks: list[str] = []
-    current_chunk: list[str] = []
-    current_length = 0
+def iter_chunks(
+    text: str | Iterable[str],
+    chunk_size: int = 500,
+    overlap: int = 50,
+    unit: ChunkUnit = "chars",
+) -> Iterator[str]:
+    """
+    Split text into overlapping chunks using sentence-aware boundaries,
+    yielding each chunk as soon as it is complete.
 
-    for sentence in sentences:
-        sentence_len = len(sentence)
+    *text* is a string or an iterable of pieces (pages, lines) that are
+    concatenated as-is, so a large document never has to be in memory at
+    once. Full sentences are accumulated until the chunk_size limit is
+    reached, then a new chunk starts with the trailing sentences of the
+    previous one that fit in *overlap*.
+
+    With unit="chars" sizes are characters, and a sentence longer than
+    chunk_size becomes a chunk of its own. With unit="tokens" sizes are
+    embedding-model tokens, chunk_size is capped at what the model reads
+    (max_seq_length minus special tokens), and longer sentences are split
+    between words, so nothing is lost to truncation when the chunk is
+    embedded.
+    """
+    sentences = iter_sentences((text,) if isinstance(text, str) else text)
+
+    if unit == "tokens":
+        from .embeddings import count_tokens, max_seq_length
+
+        chunk_size = min(chunk_size, max_seq_length() - _SPECIAL_TOKENS)
+        measured = _token_sized(sentences, chunk_size, count_tokens)
+        separator = 0                          # WordPiece splits on spaces, so counts add up
+    else:
+        measured = ((sentence, len(sentence)) for sentence in sentences)
+        separator = 1                          # +1 for the joining space
 
+    current: deque[tuple[str, int]] = deque()  # (sentence, size including separator)
+    current_length = 0
+
+    for sentence, sentence_len in measured:
         # If a single sentence exceeds chunk_size, add it as its own chunk
         if sentence_len > chunk_size:
             # Flush current chunk first
-            if current_chunk:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = []
+            if current:
+                yield " ".join(s for s, _ in current)
+                current.clear()
                 current_length = 0
-            chunks.append(sentence)
+            yield sentence
             continue
 
         # If adding this sentence would exceed the limit, flush the chunk
-        if current_length + sentence_len + 1 > chunk_size and current_chunk:
-            chunk_text_str = " ".join(current_chunk)
-            chunks.append(chunk_text_str)
-
-            # Calculate overlap: keep trailing sentences that fit within overlap size
-            overlap_chunk: list[str] = []
-            overlap_length = 0
-            for s in reversed(current_chunk):
-                if overlap_length + len(s) + 1 <= overlap:
-                    overlap_chunk.insert(0, s)
-                    overlap_length += len(s) + 1
-                else:
-                    break
-
-            current_chunk = overlap_chunk
-            current_length = overlap_length
-
-        current_chunk.append(sentence)
-        current_length += sentence_len + 1  # +1 for space
+        if current_length + sentence_len + separator > chunk_size and current:
+            yield " ".join(s for s, _ in current)
+
+            # Overlap: the longest run of trailing sentences that fits in *overlap*
+            # and still leaves room for this sentence
+            while current and (current_length > overlap or current_length + sentence_len + separator > chunk_size):
+                current_length -= current.popleft()[1]
+
+        current.append((sentence, sentence_len + separator))
+        current_length += sentence_len + separator
 
     # Don't forget the last chunk
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
+    if current:
+        yield " ".join(s for s, _ in current)
+
 
-    return chunks
\ No newline at end of file
+def chunk_text(
+    text: str,
+    chunk_size: int = 500,
+    overlap: int = 50,
+    unit: ChunkUnit = "chars",
+) -> list[str]:
+    """All chunks of *text*; see `iter_chunks`."""
+    return list(iter_chunks(text, chunk_size, overlap, unit))
@@ -0,0 +1,407 @@
+"""
+Schema and ANN index management for the pgvector store.
+
+`ensure_schema()` creates the `vector` extension, the `document_embeddings`
+table and its approximate-nearest-neighbour index from Settings:
+
+- VECTOR_STORAGE   "vector" (float32) or "halfvec" (float16, pgvector >= 0.7:
+                   half the table/index size and I/O, recall is unaffected
+                   for normalised MiniLM embeddings)
+- VECTOR_INDEX_TYPE "hnsw" (HNSW_M, HNSW_EF_CONSTRUCTION) or "ivfflat"
+                   (IVFFLAT_LISTS) — or "none" for exact scans
+
+It never rebuilds an existing index: if the stored column type or index
+parameters differ from Settings it logs a warning, and `rebuild` (below)
+applies them. Query-time knobs (HNSW_EF_SEARCH / IVFFLAT_PROBES) are applied
+to every search — see `search_settings_sql()`.
+
+CLI (from backend/):
+    python -m app.services.vector_schema init      # create what is missing
+    python -m app.services.vector_schema rebuild   # convert storage, rebuild the index
+    python -m app.services.vector_schema tune --ef-search 10,20,40,80
+        # recall@k and latency of the ANN index vs exact search on stored vectors
+"""
+import argparse
+import logging
+import math
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from .db_pool import get_conn
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSIONS = 384          # all-MiniLM-L6-v2
+INDEX_NAME = "ix_doc_emb_embedding"
+
+# Build parameters pgvector uses when an index was created without WITH (...)
+_PGVECTOR_DEFAULTS = {
+    "hnsw": {"m": "16", "ef_construction": "64"},
+    "ivfflat": {"lists": "100"},
+}
+
+_schema_checked = False
+_schema_lock = threading.Lock()
+_stored_type: str | None = None     # set when the table's column disagrees with VECTOR_STORAGE
+
+
+# ── Names and SQL fragments derived from Settings ──────────────────────────
+def vector_type() -> str:
+    """
+    SQL type of the embedding column ("vector" or "halfvec"). Queries cast to
+    it so the index is used; until `rebuild` converts a table created with the
+    other type, the stored type wins.
+    """
+    return _stored_type or settings.VECTOR_STORAGE
+
+
+def _opclass() -> str:
+    return f"{vector_type()}_cosine_ops"
+
+
+def _index_options(row_count: int) -> str:
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        return f"m = {settings.HNSW_M}, ef_construction = {settings.HNSW_EF_CONSTRUCTION}"
+    return f"lists = {ivfflat_lists(row_count)}"
+
+
+def ivfflat_lists(row_count: int) -> int:
+    """IVFFLAT_LISTS, or pgvector's guideline (rows / 1000, sqrt(rows) past 1M) when 0."""
+    if settings.IVFFLAT_LISTS > 0:
+        return settings.IVFFLAT_LISTS
+    if row_count > 1_000_000:
+        return int(math.sqrt(row_count))
+    return max(1, row_count // 1000)
+
+
+def search_settings_sql(local: bool = False) -> str:
+    """
+    `SET` statements for the configured query-time index parameters ("" if
+    none apply). *local* scopes them to the current transaction.
+    """
+    scope = "SET LOCAL" if local else "SET"
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        return f"{scope} hnsw.ef_search = {int(settings.HNSW_EF_SEARCH)};"
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        return f"{scope} ivfflat.probes = {int(settings.IVFFLAT_PROBES)};"
+    return ""
+
+
+# ── Introspection ──────────────────────────────────────────────────────────
+def _pgvector_version(cur) -> tuple[int, ...]:
+    cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    row = cur.fetchone()
+    return tuple(int(p) for p in row[0].split(".")[:3]) if row else ()
+
+
+def _column_type(cur) -> str | None:
+    """Declared type of document_embeddings.embedding, e.g. 'vector(384)'."""
+    cur.execute(
+        """
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass('document_embeddings') AND attname = 'embedding'
+        """
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _ann_index(cur) -> tuple[str, str] | None:
+    """(name, definition) of the ANN index on the embedding column, whatever it is called."""
+    cur.execute(
+        """
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = 'document_embeddings' AND indexdef ~ 'USING (hnsw|ivfflat)'
+        """
+    )
+    row = cur.fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def _index_definition(cur) -> str | None:
+    index = _ann_index(cur)
+    return index[1] if index else None
+
+
+def _index_matches(definition: str, row_count: int) -> bool:
+    """True if the existing index was built with the configured method and parameters."""
+    normalized = definition.replace(" ", "").replace("'", "")
+    if f"USING{settings.VECTOR_INDEX_TYPE}(embedding{_opclass()})" not in normalized:
+        return False
+    if settings.VECTOR_INDEX_TYPE == "ivfflat" and settings.IVFFLAT_LISTS == 0:
+        return True     # lists follows the row count; don't flag that drift
+    options = normalized.partition("WITH(")[2].rstrip(")")
+    built = dict(_PGVECTOR_DEFAULTS[settings.VECTOR_INDEX_TYPE])
+    built.update(opt.split("=", 1) for opt in options.split(",") if "=" in opt)
+    wanted = dict(opt.split("=", 1) for opt in _index_options(row_count).replace(" ", "").split(","))
+    return built == wanted
+
+
+# ── DDL ────────────────────────────────────────────────────────────────────
+def _check_halfvec(cur) -> None:
+    if vector_type() == "halfvec":
+        version = _pgvector_version(cur)
+        if version < (0, 7, 0):
+            installed = ".".join(map(str, version)) or "not installed"
+            raise RuntimeError(f"VECTOR_STORAGE=halfvec needs pgvector >= 0.7.0 (installed: {installed})")
+
+
+def _create_index(cur, row_count: int) -> None:
+    if settings.VECTOR_INDEX_TYPE == "none":
+        return
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON document_embeddings "
+        f"USING {settings.VECTOR_INDEX_TYPE} (embedding {_opclass()}) "
+        f"WITH ({_index_options(row_count)})"
+    )
+
+
+def _ensure_membership_table(cur) -> None:
+    """
+    `document_chunk_sources` records every (chunk_id, source) pair: a chunk is
+    stored once (chunk_id is a content hash) but may belong to several
+    documents, and is only deleted when the last of them drops it. On
+    creation it is seeded from the `source` column of existing rows.
+    """
+    cur.execute("SELECT to_regclass('document_chunk_sources') IS NOT NULL")
+    if cur.fetchone()[0]:
+        return
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS document_chunk_sources (
+            chunk_id VARCHAR(64) NOT NULL REFERENCES document_embeddings (chunk_id) ON DELETE CASCADE,
+            source   TEXT NOT NULL,
+            PRIMARY KEY (chunk_id, source)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_doc_chunk_sources_source ON document_chunk_sources (source)")
+    cur.execute(
+        """
+        INSERT INTO document_chunk_sources (chunk_id, source)
+        SELECT chunk_id, source FROM document_embeddings WHERE source IS NOT NULL
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+
+def ensure_schema() -> None:
+    """
+    Create the extension, table, `source` column, chunk membership table and
+    ANN index if missing (once per process). Rows ingested before the
+    `source` column existed keep source = NULL until a sync of their document
+    adopts them (or `vector_store.prune_unclaimed` deletes them).
+    """
+    global _schema_checked, _stored_type
+    if _schema_checked:
+        return
+    with _schema_lock:
+        if _schema_checked:
+            return
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+                _check_halfvec(cur)
+                cur.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS document_embeddings (
+                        id         SERIAL PRIMARY KEY,
+                        chunk_id   VARCHAR(64) UNIQUE NOT NULL,
+                        content    TEXT NOT NULL,
+                        embedding  {vector_type()}({EMBEDDING_DIMENSIONS}),
+                        source     TEXT,
+                        created_at TIMESTAMPTZ DEFAULT NOW()
+                    )
+                    """
+                )
+                # Tables created before per-document sync have no source column
+                cur.execute("ALTER TABLE document_embeddings ADD COLUMN IF NOT EXISTS source TEXT")
+                cur.execute("CREATE INDEX IF NOT EXISTS ix_doc_emb_source ON document_embeddings (source)")
+                _ensure_membership_table(cur)
+
+                column = _column_type(cur)
+                if column and not column.startswith(f"{settings.VECTOR_STORAGE}("):
+                    _stored_type = column.partition("(")[0]
+                    logger.warning(
+                        f"document_embeddings.embedding is {column} but VECTOR_STORAGE={settings.VECTOR_STORAGE}; "
+                        f"run `python -m app.services.vector_schema rebuild` to convert it"
+                    )
+                else:
+                    cur.execute("SELECT COUNT(*) FROM document_embeddings")
+                    row_count = cur.fetchone()[0]
+                    definition = _index_definition(cur)
+                    if definition is None:
+                        _create_index(cur, row_count)
+                    elif settings.VECTOR_INDEX_TYPE == "none" or not _index_matches(definition, row_count):
+                        logger.warning(
+                            f"Vector index differs from settings ({definition}); "
+                            f"run `python -m app.services.vector_schema rebuild` to apply them"
+                        )
+            conn.commit()
+        _schema_checked = True
+
+
+async def ensure_schema_async() -> None:
+    """
+    `ensure_schema()` for the async paths: free once the startup check has
+    run, otherwise the DDL and introspection run in the threadpool so they
+    never block the event loop.
+    """
+    if not _schema_checked:
+        await run_in_threadpool(ensure_schema)
+
+
+def rebuild() -> str | None:
+    """
+    Convert the embedding column to VECTOR_STORAGE if needed and rebuild the
+    ANN index with the current parameters. Returns the new index definition.
+    """
+    global _schema_checked, _stored_type
+    _schema_checked = False
+    ensure_schema()
+    _stored_type = None
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            index = _ann_index(cur)
+            if index:
+                cur.execute(f'DROP INDEX IF EXISTS "{index[0]}"')
+            column = _column_type(cur)
+            wanted = f"{settings.VECTOR_STORAGE}({EMBEDDING_DIMENSIONS})"
+            if column != wanted:
+                cur.execute(
+                    f"ALTER TABLE document_embeddings ALTER COLUMN embedding TYPE {wanted} "
+                    f"USING embedding::{wanted}"
+                )
+            cur.execute("SELECT COUNT(*) FROM document_embeddings")
+            _create_index(cur, cur.fetchone()[0])
+            definition = _index_definition(cur)
+        conn.commit()
+    return definition
+
+
+# ── Recall vs latency ──────────────────────────────────────────────────────
+_TUNE_SQL = """
+    SELECT chunk_id FROM document_embeddings
+    ORDER BY embedding <=> %s::{type}
+    LIMIT %s
+"""
+
+
+def _run_queries(cur, queries: list[str], k: int, setup: str) -> tuple[list[list[str]], list[float]]:
+    sql = _TUNE_SQL.format(type=vector_type())
+    results, latencies = [], []
+    for vec in queries:
+        cur.execute("BEGIN")
+        cur.execute(setup)
+        start = time.perf_counter()
+        cur.execute(sql, (vec, k))
+        ids = [row[0] for row in cur.fetchall()]
+        latencies.append(time.perf_counter() - start)
+        cur.execute("ROLLBACK")
+        results.append(ids)
+    return results, latencies
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000
+
+
+def tune(values: list[int], k: int, n_queries: int) -> None:
+    """Print recall@k and latency for each ef_search / probes value against exact search."""
+    if settings.VECTOR_INDEX_TYPE == "none":
+        print("  ✗ VECTOR_INDEX_TYPE=none — every search is already exact")
+        return
+    knob = "hnsw.ef_search" if settings.VECTOR_INDEX_TYPE == "hnsw" else "ivfflat.probes"
+    with get_conn() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                # Stored vectors make realistic queries (queries are embedded chunks too)
+                cur.execute(
+                    "SELECT embedding::text FROM document_embeddings ORDER BY random() LIMIT %s",
+                    (n_queries,),
+                )
+                queries = [row[0] for row in cur.fetchall()]
+                if not queries:
+                    print("  ✗ document_embeddings is empty — load documents first")
+                    return
+                if _index_definition(cur) is None:
+                    print("  ✗ No vector index — run `init` or `rebuild` first")
+                    return
+
+                exact, exact_lat = _run_queries(
+                    cur, queries, k, "SET LOCAL enable_indexscan = off; SET LOCAL enable_bitmapscan = off;"
+                )
+                print(f"  {'setting':<22} {'recall@' + str(k):>9} {'p50 ms':>8} {'p95 ms':>8}")
+                print(f"  {'exact (seq scan)':<22} {1.0:>9.3f} {_pct(exact_lat, .5):>8.2f} {_pct(exact_lat, .95):>8.2f}")
+                for value in values:
+                    # Force the index even where the planner would pick a seq scan on a small table
+                    approx, lat = _run_queries(
+                        cur, queries, k, f"SET LOCAL enable_seqscan = off; SET LOCAL {knob} = {int(value)};"
+                    )
+                    hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+                    recall = hits / max(1, sum(len(e) for e in exact))
+                    label = f"{knob}={value}"
+                    print(f"  {label:<22} {recall:>9.3f} {_pct(lat, .5):>8.2f} {_pct(lat, .95):>8.2f}")
+        finally:
+            conn.autocommit = False
+
+
+def _storage_report() -> None:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            index = _ann_index(cur)
+            cur.execute(
+                """
+                SELECT pg_size_pretty(pg_table_size('document_embeddings')),
+                       pg_size_pretty(COALESCE(pg_relation_size(to_regclass(%s)), 0)),
+                       (SELECT COUNT(*) FROM document_embeddings)
+                """,
+                (index[0] if index else None,),
+            )
+            table_size, index_size, rows = cur.fetchone()
+            print(f"  Column  : {_column_type(cur)}")
+            print(f"  Index   : {index[1] if index else 'none'}")
+            print(f"  Rows    : {rows} (table {table_size}, index {index_size})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pgvector schema / index management")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("init", help="Create the extension, table and index if missing")
+    sub.add_parser("rebuild", help="Apply VECTOR_STORAGE and index parameters (drops and rebuilds the index)")
+    tune_p = sub.add_parser("tune", help="Recall@k and latency vs exact search")
+    tune_p.add_argument("--ef-search", default="10,20,40,80,160",
+                        help="Comma-separated hnsw.ef_search values (or ivfflat.probes for IVFFlat)")
+    tune_p.add_argument("--k", type=int, default=settings.TOP_K_RESULTS)
+    tune_p.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-8s │ %(name)s │ %(message)s")
+    command = args.command or "init"
+
+    print(f"{'─' * 50}")
+    print(f"🗄️  Portfolio RAG — Vector schema ({command})")
+    print(f"{'─' * 50}")
+    print(f"  Storage : {vector_type()}({EMBEDDING_DIMENSIONS}), index {settings.VECTOR_INDEX_TYPE}")
+
+    if command == "init":
+        ensure_schema()
+        print("  ✓ Schema is in place")
+    elif command == "rebuild":
+        start = time.perf_counter()
+        rebuild()
+        print(f"  ✓ Rebuilt in {time.perf_counter() - start:.2f}s")
+    elif command == "tune":
+        ensure_schema()
+        values = [int(v) for v in args.ef_search.split(",") if v.strip()]
+        tune(values, args.k, args.queries)
+    _storage_report()
+
+
+if __name__ == "__main__":
+    main()
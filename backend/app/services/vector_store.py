@@ -3,28 +3,32 @@ Vector store backed by Supabase pgvector.
 
 Replaces the local ChromaDB implementation so that embeddings are stored
 in PostgreSQL and survive deployments without any local file system.
+
+With VECTOR_STORE_BACKEND="memory" Postgres remains the source of truth for
+writes, but queries are answered from an in-process matrix (memory_index.py)
+that is synced from pgvector at startup and whenever the corpus changes.
 """
 import hashlib
-import os
+import io
+import logging
+import struct
+from dataclasses import dataclass
+from typing import Iterable, Sequence
 
-import psycopg2
-import psycopg2.extras
+import numpy as np
+from starlette.concurrency import run_in_threadpool
 
-from .embeddings import generate_embedding
+from ..config import settings
+from . import corpus_watch
+from .corpus_watch import CORPUS_CHANNEL
+from .db_pool import get_async_conn, get_conn
+from .embeddings import generate_embedding, generate_embedding_async, generate_embeddings
+from .memory_index import InMemoryVectorIndex
+from .vector_schema import ensure_schema, ensure_schema_async, search_settings_sql, vector_type
 
+logger = logging.getLogger(__name__)
 
-# ---------------------------------------------------------------------------
-# DB connection
-# ---------------------------------------------------------------------------
-
-def _get_conn():
-    """Open a fresh psycopg2 connection using DATABASE_URL from env."""
-    url = os.environ.get("DATABASE_URL") or ""
-    if not url:
-        # Fallback: try importing settings (may fail during early boot)
-        from ..config import settings
-        url = settings.DATABASE_URL
-    return psycopg2.connect(url)
+_memory_index = InMemoryVectorIndex()
 
 
 # ---------------------------------------------------------------------------
@@ -41,100 +45,591 @@ def _vec_literal(embedding: list[float]) -> str:
     return "[" + ",".join(str(x) for x in embedding) + "]"
 
 
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_TRAILER = struct.pack("!h", -1)
+
+
+def _copy_rows_binary(rows: Iterable[tuple[str, str, np.ndarray]], source: str | None) -> io.BytesIO:
+    """
+    Encode (chunk_id, content, embedding) rows plus *source* in PostgreSQL's
+    binary COPY format. Vectors use pgvector's wire format (int16 dim, int16
+    unused, big-endian float4 values), so no per-float text formatting is needed.
+    """
+    src = source.encode("utf-8") if source is not None else None
+    src_field = struct.pack("!i", len(src)) + src if src is not None else struct.pack("!i", -1)
+
+    buf = io.BytesIO()
+    buf.write(_COPY_HEADER)
+    for chunk_id, content, embedding in rows:
+        cid = chunk_id.encode("utf-8")
+        text = content.encode("utf-8")
+        vec = np.asarray(embedding, dtype=">f4")
+        buf.write(struct.pack("!hi", 4, len(cid)))
+        buf.write(cid)
+        buf.write(struct.pack("!i", len(text)))
+        buf.write(text)
+        buf.write(struct.pack("!ihh", 4 + vec.nbytes, vec.shape[0], 0))
+        buf.write(vec.tobytes())
+        buf.write(src_field)
+    buf.write(_COPY_TRAILER)
+    buf.seek(0)
+    return buf
+
+
+def _copy_insert(cur, rows: Iterable[tuple[str, str, np.ndarray]], source: str | None = None) -> set[str]:
+    """
+    Bulk-load rows through a temp staging table, then move them into
+    document_embeddings with ON CONFLICT DO NOTHING (COPY itself cannot skip
+    conflicts). Returns the chunk_ids that were actually inserted.
+    """
+    cur.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS _staging_embeddings
+            (chunk_id TEXT, content TEXT, embedding vector, source TEXT)
+        ON COMMIT DELETE ROWS
+        """
+    )
+    cur.copy_expert(
+        "COPY _staging_embeddings (chunk_id, content, embedding, source) FROM STDIN WITH (FORMAT BINARY)",
+        _copy_rows_binary(rows, source),
+    )
+    cur.execute(
+        f"""
+        INSERT INTO document_embeddings (chunk_id, content, embedding, source)
+        SELECT chunk_id, content, embedding::{vector_type()}, source FROM _staging_embeddings
+        ON CONFLICT (chunk_id) DO NOTHING
+        RETURNING chunk_id
+        """
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+def _parse_vector(text: str) -> np.ndarray:
+    """Parse a pgvector text literal ('[0.1,0.2,…]') into a float32 array."""
+    return np.array(text.strip("[]").split(","), dtype=np.float32)
+
+
+def _use_memory_index() -> bool:
+    return settings.VECTOR_STORE_BACKEND == "memory"
+
+
+def _notify_corpus_changed(cur) -> None:
+    """Queue a NOTIFY (delivered on commit) so running servers drop corpus-derived caches."""
+    cur.execute("SELECT pg_notify(%s, '')", (CORPUS_CHANNEL,))
+
+
 # ---------------------------------------------------------------------------
 # Public API  (same interface as the ChromaDB version)
 # ---------------------------------------------------------------------------
 
 def count() -> int:
     """Return the total number of documents stored."""
-    conn = _get_conn()
-    try:
+    if _use_memory_index() and _memory_index.loaded:
+        return _memory_index.count()
+    with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT COUNT(*) FROM document_embeddings")
             return cur.fetchone()[0]
-    finally:
-        conn.close()
 
 
-def add_documents(text_chunks: list[str]) -> int:
+def add_documents(
+    text_chunks: list[str],
+    batch_size: int | None = None,
+    source: str | None = None,
+) -> int:
     """
     Embed and insert text chunks into pgvector.
     Skips chunks that already exist (deduplication by content hash).
     Returns the number of *newly* added chunks.
+
+    Existing chunk_ids are found with one lookup, only the missing chunks are
+    embedded (in batches of *batch_size*), and rows are bulk-loaded with a
+    binary COPY instead of one INSERT per chunk. New rows are tagged with
+    *source* (the document they came from).
     """
     if not text_chunks:
         return 0
+    ensure_schema()
 
-    added = 0
-    conn = _get_conn()
-    try:
+    # Hash everything up front; duplicates inside the batch collapse here
+    pending = {_generate_chunk_id(chunk): chunk for chunk in text_chunks}
+    all_ids = list(pending)
+
+    with get_conn() as conn:
         with conn.cursor() as cur:
-            for chunk in text_chunks:
-                chunk_id = _generate_chunk_id(chunk)
-                embedding = generate_embedding(chunk)
-                vec_str = _vec_literal(embedding)
-
-                cur.execute(
-                    """
-                    INSERT INTO document_embeddings (chunk_id, content, embedding)
-                    VALUES (%s, %s, %s::vector)
-                    ON CONFLICT (chunk_id) DO NOTHING
-                    """,
-                    (chunk_id, chunk, vec_str),
-                )
-                added += cur.rowcount
+            cur.execute(
+                "SELECT chunk_id FROM document_embeddings WHERE chunk_id = ANY(%s)",
+                (list(pending),),
+            )
+            for (chunk_id,) in cur.fetchall():
+                pending.pop(chunk_id, None)
+    if not pending and source is None:
+        return 0
+
+    chunk_ids = list(pending)
+    chunks = [pending[cid] for cid in chunk_ids]
+    embeddings = generate_embeddings(chunks, batch_size=batch_size) if chunks else []
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            added_ids = _copy_insert(cur, zip(chunk_ids, chunks, embeddings), source) if chunks else set()
+            if source is not None:
+                # Chunks already stored for another document now belong to this one too
+                _link(cur, source, all_ids)
+            if added_ids:
+                _notify_corpus_changed(cur)
         conn.commit()
-    finally:
-        conn.close()
 
-    return added
+    if _memory_index.loaded:
+        _memory_index.add(
+            (cid, pending[cid], emb, source) for cid, emb in zip(chunk_ids, embeddings) if cid in added_ids
+        )
+    return len(added_ids)
 
 
-def query_vector_store(query: str, top_k: int = 8) -> list[str]:
+@dataclass
+class SyncResult:
+    """What `sync_documents` changed for one source document."""
+    source: str
+    added: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    adopted: int = 0
+    linked: int = 0                 # already stored for another document, shared without re-embedding
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed or self.adopted or self.linked)
+
+
+@dataclass
+class SyncPlan:
+    """The change set that makes the stored chunks of one source match a new chunk list."""
+    source: str
+    chunks: dict[str, str]          # wanted chunk_id → content
+    to_add: list[str]               # not stored at all: embed and insert
+    to_remove: list[str]            # this source's chunks that are no longer wanted
+    to_adopt: list[str]             # stored without a source (legacy rows)
+    to_link: list[str]              # stored for another source: share the row
+
+    @property
+    def new_chunks(self) -> list[str]:
+        """Contents to embed, in `to_add` order."""
+        return [self.chunks[cid] for cid in self.to_add]
+
+
+def plan_sync(source: str, text_chunks: Iterable[str]) -> SyncPlan:
+    """Diff *text_chunks* against what is stored for *source* (reads only, no writes)."""
+    ensure_schema()
+    wanted = {_generate_chunk_id(chunk): chunk for chunk in text_chunks}
+
+    # This source's chunks, and which wanted chunks are stored at all (chunk_id
+    # is a content hash, so a chunk shared by several documents is stored once)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT chunk_id FROM document_chunk_sources WHERE source = %s", (source,))
+            mine = {row[0] for row in cur.fetchall()}
+            cur.execute(
+                "SELECT chunk_id, source FROM document_embeddings WHERE chunk_id = ANY(%s)",
+                (list(wanted),),
+            )
+            stored = dict(cur.fetchall())
+
+    return SyncPlan(
+        source=source,
+        chunks=wanted,
+        to_add=[cid for cid in wanted if cid not in stored],
+        to_remove=[cid for cid in mine if cid not in wanted],
+        to_adopt=[cid for cid in wanted if cid in stored and stored[cid] is None],
+        to_link=[cid for cid in wanted if cid in stored and stored[cid] is not None and cid not in mine],
+    )
+
+
+def _link(cur, source: str, chunk_ids: list[str]) -> int:
+    """Record *chunk_ids* as belonging to *source*; returns how many were new."""
+    cur.execute(
+        """
+        INSERT INTO document_chunk_sources (chunk_id, source)
+        SELECT chunk_id, %s FROM document_embeddings WHERE chunk_id = ANY(%s)
+        ON CONFLICT DO NOTHING
+        """,
+        (source, chunk_ids),
+    )
+    return cur.rowcount
+
+
+def _release(cur, source: str, chunk_ids: list[str] | None = None) -> int:
     """
-    Return the top-k most semantically relevant chunks for *query*.
-    Uses cosine distance (`<=>`) via pgvector's HNSW index.
+    Drop *source*'s claim on *chunk_ids* (all its chunks if None). Rows no
+    other source claims are deleted; rows still shared are re-attributed to
+    one of their remaining sources. Returns the number of claims dropped.
     """
-    total = count()
-    if total == 0:
-        return []
+    if chunk_ids is None:
+        cur.execute("DELETE FROM document_chunk_sources WHERE source = %s RETURNING chunk_id", (source,))
+    else:
+        cur.execute(
+            "DELETE FROM document_chunk_sources WHERE source = %s AND chunk_id = ANY(%s) RETURNING chunk_id",
+            (source, chunk_ids),
+        )
+    released = [row[0] for row in cur.fetchall()]
+    if released:
+        cur.execute(
+            """
+            DELETE FROM document_embeddings d
+            WHERE d.chunk_id = ANY(%s)
+              AND NOT EXISTS (SELECT 1 FROM document_chunk_sources m WHERE m.chunk_id = d.chunk_id)
+            """,
+            (released,),
+        )
+        cur.execute(
+            """
+            UPDATE document_embeddings d
+            SET source = (SELECT MIN(m.source) FROM document_chunk_sources m WHERE m.chunk_id = d.chunk_id)
+            WHERE d.chunk_id = ANY(%s) AND d.source = %s
+            """,
+            (released, source),
+        )
+    return len(released)
 
-    query_embedding = generate_embedding(query)
-    vec_str = _vec_literal(query_embedding)
 
-    conn = _get_conn()
-    try:
+def apply_sync(plan: SyncPlan, embeddings: Sequence[np.ndarray]) -> SyncResult:
+    """
+    Apply *plan* in one transaction; *embeddings* are the vectors of
+    `plan.new_chunks`. Retrieval never sees an empty or half-updated document.
+    """
+    source = plan.source
+    result = SyncResult(
+        source=source,
+        unchanged=len(plan.chunks) - len(plan.to_add) - len(plan.to_adopt) - len(plan.to_link),
+    )
+
+    if plan.to_add or plan.to_remove or plan.to_adopt or plan.to_link:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                if plan.to_add:
+                    rows = zip(plan.to_add, plan.new_chunks, embeddings)
+                    result.added = len(_copy_insert(cur, rows, source))
+                if plan.to_adopt:
+                    cur.execute(
+                        "UPDATE document_embeddings SET source = %s WHERE source IS NULL AND chunk_id = ANY(%s)",
+                        (source, plan.to_adopt),
+                    )
+                    result.adopted = cur.rowcount
+                # Claim the new, adopted and shared chunks (a row another sync
+                # inserted first is shared rather than duplicated)
+                claims = _link(cur, source, plan.to_add + plan.to_adopt + plan.to_link)
+                result.linked = max(0, claims - result.added - result.adopted)
+                if plan.to_remove:
+                    result.removed = _release(cur, source, plan.to_remove)
+                if result.changed:
+                    _notify_corpus_changed(cur)
+            conn.commit()
+
+    if result.changed and _memory_index.loaded:
+        sync_memory_index()
+    return result
+
+
+def prune_unclaimed() -> int:
+    """
+    Delete rows that no document claims: legacy rows ingested before sources
+    were tracked whose content no sync has adopted. Run it once every current
+    document has been synced. Returns the number of rows deleted.
+    """
+    ensure_schema()
+    with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT content
-                FROM document_embeddings
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s
-                """,
-                (vec_str, min(top_k, total)),
+                DELETE FROM document_embeddings d
+                WHERE NOT EXISTS (SELECT 1 FROM document_chunk_sources m WHERE m.chunk_id = d.chunk_id)
+                """
             )
+            n = cur.rowcount
+            if n:
+                _notify_corpus_changed(cur)
+        conn.commit()
+    if n and _memory_index.loaded:
+        sync_memory_index()
+    return n
+
+
+def sync_documents(source: str, text_chunks: list[str], batch_size: int | None = None) -> SyncResult:
+    """
+    Make the stored chunks of *source* match *text_chunks* exactly.
+
+    The new chunk set is diffed against the stored chunk_id hashes: only new
+    chunks are embedded and inserted, only vanished ones are deleted, and the
+    whole change set is committed in one transaction — retrieval never sees
+    an empty or half-updated document. Legacy rows without a source whose
+    content is still wanted are adopted instead of re-embedded, and a chunk
+    another document already stored is shared (it is deleted only once no
+    document wants it).
+
+    The three steps are also available separately (`plan_sync`, embed,
+    `apply_sync`) so a pipeline can embed one document while writing another.
+    """
+    plan = plan_sync(source, text_chunks)
+    # Embed only what is new (outside the write transaction)
+    embeddings = generate_embeddings(plan.new_chunks, batch_size=batch_size) if plan.to_add else []
+    return apply_sync(plan, embeddings)
+
+
+@dataclass(slots=True)
+class RetrievedChunk:
+    """One search hit."""
+    chunk_id: str
+    content: str
+    source: str | None
+    distance: float | None          # cosine distance; None if only keyword search found it
+    score: float = 0.0              # ranking score (similarity, or the fused score in retrieval.py)
+    lexical_score: float = 0.0      # BM25 score, set by hybrid retrieval
+
+    @property
+    def similarity(self) -> float | None:
+        return None if self.distance is None else 1.0 - self.distance
+
+
+def _hit(chunk_id: str, content: str, source: str | None, distance: float) -> RetrievedChunk:
+    return RetrievedChunk(chunk_id, content, source, distance, score=1.0 - distance)
+
+
+# One round trip for any number of query vectors: each one runs its own
+# index-backed top-k through the LATERAL subquery. Cosine distance is at most
+# 2, so that is the "no cutoff" value.
+_NO_CUTOFF = 2.0
+
+_SEARCH_SQL_TEMPLATE = """
+    SELECT q.ord, d.chunk_id, d.content, d.source, d.distance
+    FROM unnest({vectors}::text[]) WITH ORDINALITY AS q(vec, ord)
+    CROSS JOIN LATERAL (
+        SELECT chunk_id, content, source, embedding <=> q.vec::{type} AS distance
+        FROM document_embeddings
+        ORDER BY distance
+        LIMIT {top_k}
+    ) AS d
+    WHERE d.distance <= {cutoff}
+    ORDER BY q.ord, d.distance
+"""
+
+
+def _search_sql(placeholders: tuple[str, str, str]) -> str:
+    vectors, top_k, cutoff = placeholders
+    return _SEARCH_SQL_TEMPLATE.format(vectors=vectors, top_k=top_k, cutoff=cutoff, type=vector_type())
+
+
+def _group_hits(rows, n_queries: int) -> list[list[RetrievedChunk]]:
+    results: list[list[RetrievedChunk]] = [[] for _ in range(n_queries)]
+    for ord_, chunk_id, content, source, distance in rows:
+        results[ord_ - 1].append(_hit(chunk_id, content, source, float(distance)))
+    return results
+
+
+def search_chunks(
+    query_embeddings: Sequence[Sequence[float]],
+    top_k: int = 8,
+    max_distance: float | None = None,
+) -> list[list[RetrievedChunk]]:
+    """
+    Nearest chunks for each of *query_embeddings*, nearest first.
+    Chunks farther than *max_distance* (cosine distance) are left out, so a
+    query may get fewer than *top_k* hits — or none.
+    """
+    if not query_embeddings:
+        return []
+    if _use_memory_index():
+        if not _memory_index.loaded:
+            sync_memory_index()
+        return [
+            [_hit(*row) for row in hits]
+            for hits in _memory_index.search(query_embeddings, top_k, max_distance)
+        ]
+
+    ensure_schema()
+    vectors = [_vec_literal(list(e)) for e in query_embeddings]
+    cutoff = _NO_CUTOFF if max_distance is None else max_distance
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            # Index knobs (hnsw.ef_search / ivfflat.probes) ride along in the same round trip;
+            # SET LOCAL ends with the transaction get_conn() rolls back
+            cur.execute(search_settings_sql(local=True) + _search_sql(("%s", "%s", "%s")), (vectors, top_k, cutoff))
             rows = cur.fetchall()
-    finally:
-        conn.close()
+    return _group_hits(rows, len(vectors))
 
-    return [row[0] for row in rows]
 
+def query_vector_store(query: str, top_k: int = 8) -> list[str]:
+    """
+    Return the top-k most semantically relevant chunks for *query*.
+    Uses cosine distance (`<=>`) via pgvector's ANN index (see vector_schema.py).
+    """
+    return [chunk.content for chunk in query_vector_store_scored(query, top_k=top_k)]
 
-def wipe_collection() -> int:
-    """Delete ALL documents. Returns the count that was removed."""
-    conn = _get_conn()
-    try:
+
+def query_vector_store_scored(
+    query: str,
+    top_k: int = 8,
+    max_distance: float | None = None,
+) -> list[RetrievedChunk]:
+    """Like `query_vector_store()` but returns `RetrievedChunk`s within *max_distance*."""
+    # Embed before borrowing a connection so it isn't held during inference
+    return search_chunks([generate_embedding(query)], top_k, max_distance)[0]
+
+
+def wipe_collection(source: str | None = None) -> int:
+    """
+    Delete ALL documents, or only those of *source* if given.
+    Returns the count that was removed.
+    """
+    if source is not None:
+        ensure_schema()
+    with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT COUNT(*) FROM document_embeddings")
-            n = cur.fetchone()[0]
-            cur.execute("DELETE FROM document_embeddings")
+            if source is None:
+                # Memberships go with their rows (ON DELETE CASCADE)
+                cur.execute("DELETE FROM document_embeddings")
+                n = cur.rowcount
+            else:
+                # Chunks shared with other documents stay
+                n = _release(cur, source)
+            if n:
+                _notify_corpus_changed(cur)
         conn.commit()
-    finally:
-        conn.close()
+    if _memory_index.loaded and n:
+        if source is None:
+            _memory_index.clear()
+        else:
+            sync_memory_index()
+    return n
+
+
+# ---------------------------------------------------------------------------
+# Async API  (same queries over the asyncpg pool, for the request path)
+# ---------------------------------------------------------------------------
+
+async def count_async() -> int:
+    """Async variant of `count()`."""
+    async with get_async_conn() as conn:
+        return await conn.fetchval("SELECT COUNT(*) FROM document_embeddings")
+
+
+async def search_chunks_async(
+    query_embeddings: Sequence[Sequence[float]],
+    top_k: int = 8,
+    max_distance: float | None = None,
+) -> list[list[RetrievedChunk]]:
+    """Async variant of `search_chunks()`."""
+    if not query_embeddings:
+        return []
+    if _use_memory_index():
+        if not _memory_index.loaded:
+            await sync_memory_index_async()
+        return [
+            [_hit(*row) for row in hits]
+            for hits in _memory_index.search(query_embeddings, top_k, max_distance)
+        ]
+
+    await ensure_schema_async()
+    vectors = [_vec_literal(list(e)) for e in query_embeddings]
+    cutoff = _NO_CUTOFF if max_distance is None else max_distance
+    # Bind as text and cast server-side: asyncpg has no codec for `vector`.
+    # Pooled connections already carry the index knobs (db_pool applies them).
+    async with get_async_conn() as conn:
+        rows = await conn.fetch(_search_sql(("$1", "$2", "$3")), vectors, top_k, cutoff)
+    return _group_hits(rows, len(vectors))
+
+
+async def query_vector_store_async(
+    query: str,
+    top_k: int = 8,
+    query_embedding: Sequence[float] | None = None,
+) -> list[str]:
+    """
+    Async variant of `query_vector_store()`.
+    Inference runs on the embedding executor and DB I/O on the asyncpg pool,
+    so neither blocks the event loop. Pass *query_embedding* if the caller
+    already encoded the query.
+    """
+    scored = await query_vector_store_scored_async(query, top_k=top_k, query_embedding=query_embedding)
+    return [chunk.content for chunk in scored]
+
+
+async def query_vector_store_scored_async(
+    query: str,
+    top_k: int = 8,
+    query_embedding: Sequence[float] | None = None,
+    max_distance: float | None = None,
+) -> list[RetrievedChunk]:
+    """Async variant of `query_vector_store_scored()`."""
+    if query_embedding is None:
+        query_embedding = await generate_embedding_async(query)
+    return (await search_chunks_async([query_embedding], top_k, max_distance))[0]
+
+
+# ---------------------------------------------------------------------------
+# In-process index sync  (VECTOR_STORE_BACKEND="memory")
+# ---------------------------------------------------------------------------
+
+_SYNC_SQL = "SELECT chunk_id, content, embedding::text, source FROM document_embeddings"
+
+
+def _finish_sync(n: int) -> int:
+    logger.info(f"In-process vector index synced from pgvector ({n} chunks)")
+    if settings.VECTOR_INDEX_PATH:
+        try:
+            _memory_index.save(settings.VECTOR_INDEX_PATH)
+        except OSError as e:
+            logger.warning(f"Could not persist vector index to {settings.VECTOR_INDEX_PATH}: {e}")
     return n
 
 
+def sync_memory_index() -> int:
+    """Reload the in-process index from pgvector. Returns the number of chunks."""
+    ensure_schema()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_SYNC_SQL)
+            rows = cur.fetchall()
+    n = _memory_index.replace((cid, content, _parse_vector(vec), source) for cid, content, vec, source in rows)
+    return _finish_sync(n)
+
+
+async def sync_memory_index_async() -> int:
+    """Async variant of `sync_memory_index()`."""
+    await ensure_schema_async()
+    async with get_async_conn() as conn:
+        rows = await conn.fetch(_SYNC_SQL)
+    n = _memory_index.replace((r[0], r[1], _parse_vector(r[2]), r[3]) for r in rows)
+    # Writing the .npy/.json pair is blocking file I/O; keep it off the event loop
+    return await run_in_threadpool(_finish_sync, n)
+
+
+async def start_memory_index() -> None:
+    """
+    Startup hook: sync from pgvector, falling back to the persisted
+    (memory-mapped) copy at VECTOR_INDEX_PATH if the database is unreachable.
+    """
+    if not _use_memory_index():
+        return
+    try:
+        await sync_memory_index_async()
+    except Exception as e:
+        if settings.VECTOR_INDEX_PATH and _memory_index.load(settings.VECTOR_INDEX_PATH):
+            logger.warning(
+                f"pgvector sync failed ({e}); serving persisted index "
+                f"from {settings.VECTOR_INDEX_PATH} ({_memory_index.count()} chunks)"
+            )
+        else:
+            raise
+
+
+async def _resync_on_corpus_change(_version: str) -> None:
+    if _use_memory_index():
+        await sync_memory_index_async()
+
+
+corpus_watch.on_change(_resync_on_corpus_change)
+
+
 def clear_collection():
     """Legacy alias for backward compatibility."""
     wipe_collection()
@@ -0,0 +1,71 @@
+"""
+Shared helpers for the benchmark scripts: percentiles and a stored baseline.
+
+The baseline file holds one section per script ("micro", "chat_load"), each
+mapping a benchmark name to its metrics. Each script compares a few stable
+metrics: latencies regress when they grow, throughput (`*_per_s`) when it
+shrinks. Numbers are only comparable on the same machine: record a baseline with
+`--save-baseline` before a change, then rerun after it.
+"""
+import json
+import os
+
+import numpy as np
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def percentiles(samples: list[float], scale: float = 1000.0) -> dict[str, float]:
+    """p50/p95/p99 of *samples* (seconds), multiplied by *scale* (default → ms)."""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    arr = np.asarray(samples) * scale
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+
+
+def load_baseline(path: str, section: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f).get(section, {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, section: str, results: dict) -> None:
+    """Replace *section* of the baseline file, keeping the other scripts' sections."""
+    data: dict = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    data[section] = results
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s")
+
+
+def compare(results: dict, baseline: dict, metrics: tuple[str, ...], tolerance: float) -> int:
+    """
+    Print *metrics* of each benchmark next to their baseline values; flag
+    changes beyond *tolerance* (fraction). Returns the number of regressions.
+    """
+    regressions = 0
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        print(f"\n  {name}")
+        for metric in metrics:
+            value, old = current.get(metric), base.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(value, (int, float)) or old == 0:
+                continue
+            change = (value - old) / old
+            worse = -change if _higher_is_better(metric) else change
+            mark = "✗" if worse > tolerance else "✓"
+            regressions += worse > tolerance
+            print(f"    {mark} {metric:<16}: {value:>10.3f}  (baseline {old:.3f}, {change:+.1%})")
+    return regressions
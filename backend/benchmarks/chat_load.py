@@ -0,0 +1,265 @@
+"""
+Concurrent end-to-end load test of POST /api/chat.
+
+Sends --requests questions with --concurrency in flight and measures, per
+request, time to first answer token (TTFT) and time to the end of the
+stream, as the browser sees them. Server-side stage times come from the
+final `timing` SSE event (see app/services/metrics.py).
+
+With --spawn the driver starts its own stack: the stub LLM
+(benchmarks/stub_llm.py) in place of OpenRouter and the backend on free
+ports, against DATABASE_URL from the environment / .env (use a local
+Postgres with pgvector). The answer cache is off there unless --answer-cache
+is given, so every request goes upstream. Without --spawn it targets --url.
+
+Usage (from backend/):
+    python -m benchmarks.chat_load --spawn --requests 200 --concurrency 20
+    python -m benchmarks.chat_load --spawn --save-baseline
+    python -m benchmarks.chat_load --url http://127.0.0.1:8000 --requests 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import httpx
+import numpy as np
+
+from ._report import DEFAULT_BASELINE, compare, load_baseline, percentiles, save_baseline
+
+QUESTIONS = [
+    "What projects has Aman worked on?",
+    "Which programming languages does he know?",
+    "Tell me about his experience with FastAPI and PostgreSQL.",
+    "Has he built anything with machine learning or RAG?",
+    "How can I contact Aman?",
+    "What did he study and where?",
+    "Does he have experience deploying applications to the cloud?",
+    "Summarise his most recent internship.",
+]
+
+
+class _Result:
+    __slots__ = ("ok", "status", "ttft", "total", "chars", "stages")
+
+    def __init__(self):
+        self.ok = False
+        self.status = 0
+        self.ttft: float | None = None
+        self.total = 0.0
+        self.chars = 0
+        self.stages: dict = {}
+
+
+async def _one(client: httpx.AsyncClient, url: str, question: str) -> _Result:
+    result = _Result()
+    # A fresh session per request: the per-session rate limit would otherwise cap the run
+    payload = {"message": question, "session_id": f"bench-{uuid.uuid4().hex[:12]}"}
+    event = ""
+    start = time.perf_counter()
+    try:
+        async with client.stream("POST", f"{url}/api/chat", json=payload) as response:
+            result.status = response.status_code
+            if response.status_code != 200:
+                await response.aread()
+                return result
+            async for line in response.aiter_lines():
+                if not line:
+                    event = ""
+                elif line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data = line[5:].removeprefix(" ")
+                    if event == "timing":
+                        result.stages = json.loads(data)
+                    elif data:
+                        if result.ttft is None:
+                            result.ttft = time.perf_counter() - start
+                        result.chars += len(data)
+        result.ok = result.ttft is not None
+    except httpx.HTTPError:
+        pass
+    result.total = time.perf_counter() - start
+    return result
+
+
+async def run_load(url: str, requests: int, concurrency: int) -> tuple[list[_Result], float]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(120.0, connect=10.0)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async def bounded(i: int) -> _Result:
+            async with semaphore:
+                return await _one(client, url, QUESTIONS[i % len(QUESTIONS)])
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(bounded(i) for i in range(requests)))
+        return list(results), time.perf_counter() - start
+
+
+def summarize(results: list[_Result], wall: float) -> dict:
+    ok = [r for r in results if r.ok]
+    ttft = percentiles([r.ttft for r in ok])
+    total = percentiles([r.total for r in ok])
+    summary = {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "requests_per_s": round(len(ok) / wall, 2) if wall else 0.0,
+        "chars_per_s": round(sum(r.chars for r in ok) / wall, 1) if wall else 0.0,
+        **{f"ttft_{k}_ms": v for k, v in ttft.items()},
+        **{f"total_{k}_ms": v for k, v in total.items()},
+        # Answers replayed from the answer cache never reach the upstream
+        "cached": sum(1 for r in ok if r.stages and "upstream_ttfb_ms" not in r.stages),
+    }
+    stage_names = sorted({k for r in ok for k in r.stages if k.endswith("_ms")})
+    summary["server_stage_mean_ms"] = {
+        name.removesuffix("_ms"): round(float(np.mean([r.stages[name] for r in ok if name in r.stages])), 2)
+        for name in stage_names
+    }
+    return summary
+
+
+# ── --spawn: stub LLM + backend as subprocesses ───────────────────────────
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+@contextmanager
+def spawn_stack(args):
+    """Start the stub LLM and the backend; yields the backend's base URL."""
+    stub_port, app_port = _free_port(), _free_port()
+    procs: list[subprocess.Popen] = []
+    log = open(args.app_log, "w")
+    try:
+        stub = subprocess.Popen([
+            sys.executable, "-m", "benchmarks.stub_llm", "--port", str(stub_port),
+            "--ttft-ms", str(args.stub_ttft_ms), "--tokens", str(args.stub_tokens), "--token-ms", str(args.stub_token_ms),
+        ])
+        procs.append(stub)
+        _wait_ready(f"http://127.0.0.1:{stub_port}/docs", stub, 30)
+
+        env = {
+            **os.environ,
+            "OPENROUTER_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+            "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY", "bench"),
+            "OPENROUTER_MODEL": "stub",
+            "OPENROUTER_FALLBACK_MODELS": "",
+            "ANSWER_CACHE_ENABLED": "true" if args.answer_cache else "false",
+        }
+        backend = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port), "--log-level", "warning"],
+            env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        procs.append(backend)
+        url = f"http://127.0.0.1:{app_port}"
+        # The first start may download / load the embedding model
+        _wait_ready(f"{url}/health", backend, 180)
+        yield url
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        log.close()
+
+
+def _print_summary(s: dict, wall: float) -> None:
+    mark = "✓" if s["errors"] == 0 else "✗"
+    print(f"\n  {mark} {s['requests'] - s['errors']}/{s['requests']} ok in {wall:.1f}s ({s['cached']} from answer cache)")
+    print(f"    throughput : {s['requests_per_s']:.1f} req/s, {s['chars_per_s']:.0f} chars/s")
+    print(f"    TTFT       : p50 {s['ttft_p50_ms']:.1f}ms  p95 {s['ttft_p95_ms']:.1f}ms  p99 {s['ttft_p99_ms']:.1f}ms")
+    print(f"    total      : p50 {s['total_p50_ms']:.1f}ms  p95 {s['total_p95_ms']:.1f}ms  p99 {s['total_p99_ms']:.1f}ms")
+    if s["server_stage_mean_ms"]:
+        print("    server stages (mean):")
+        for stage, ms in s["server_stage_mean_ms"].items():
+            print(f"      {stage:<14}: {ms:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Backend to test (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Start the stub LLM and the backend locally")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--stub-ttft-ms", type=float, default=300.0)
+    parser.add_argument("--stub-tokens", type=int, default=120)
+    parser.add_argument("--stub-token-ms", type=float, default=15.0)
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the answer cache on (--spawn)")
+    parser.add_argument("--app-log", default="chat_load_backend.log", help="Backend output (--spawn)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    print(f"{'─' * 50}")
+    print(f"⏱  /api/chat load test: {args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'─' * 50}")
+
+    if args.spawn:
+        with spawn_stack(args) as url:
+            print(f"  ✓ Stack up at {url} (stub TTFT {args.stub_ttft_ms:.0f}ms, "
+                  f"{args.stub_tokens} tokens × {args.stub_token_ms:.0f}ms)")
+            results, wall = asyncio.run(run_load(url, args.requests, args.concurrency))
+    else:
+        results, wall = asyncio.run(run_load(args.url, args.requests, args.concurrency))
+
+    summary = summarize(results, wall)
+    _print_summary(summary, wall)
+    statuses = sorted({r.status for r in results if not r.ok})
+    if statuses:
+        print(f"    failed statuses: {statuses} (0 = connection error)")
+
+    # Results depend on the scenario (stub timing or target), so baselines are keyed by it
+    if args.spawn:
+        name = f"c{args.concurrency}_ttft{args.stub_ttft_ms:.0f}_tok{args.stub_tokens}x{args.stub_token_ms:.0f}"
+    else:
+        name = f"c{args.concurrency}_{urlparse(args.url).netloc}"
+    if args.save_baseline:
+        save_baseline(args.baseline, "chat_load", {**load_baseline(args.baseline, "chat_load"), name: summary})
+        print(f"\n  ✓ Baseline saved to {args.baseline} as {name}")
+        return
+
+    baseline = load_baseline(args.baseline, "chat_load")
+    if name not in baseline:
+        print(f"\n  (no baseline for {name} in {args.baseline}; record one with --save-baseline)")
+        return
+    print(f"\n{'─' * 50}")
+    print(f"Compared with {args.baseline} (tolerance {args.tolerance:.0%})")
+    print(f"{'─' * 50}")
+    regressions = compare(
+        {name: summary}, baseline, ("ttft_p50_ms", "ttft_p95_ms", "total_p95_ms", "requests_per_s"), args.tolerance
+    )
+    print(f"\n  {'✗' if regressions else '✓'} {regressions} regression(s)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
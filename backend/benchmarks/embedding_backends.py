@@ -0,0 +1,141 @@
+"""
+Compare embedding backends: cold import time, resident memory and per-query
+encode latency. Each backend is measured in a fresh subprocess so import
+costs and RSS aren't shared between them. When more than one backend runs,
+their vectors are compared too (cosine ≥ 0.99 means stored embeddings stay
+compatible across a backend switch).
+
+Usage (from backend/):
+    python -m benchmarks.embedding_backends
+    python -m benchmarks.embedding_backends --backends onnx --queries 500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+BACKENDS = ["sentence-transformers", "onnx"]
+
+SAMPLE_QUERIES = [
+    "What projects has Aman worked on?",
+    "Which programming languages does he know?",
+    "Tell me about his experience with FastAPI and PostgreSQL.",
+    "Has he built anything with machine learning or RAG?",
+    "How can I contact Aman?",
+    "What did he study and where?",
+    "Does he have experience deploying applications to the cloud?",
+    "Summarise his most recent internship.",
+]
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB (Linux /proc, else peak RSS)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure(queries: int, vectors_path: str) -> None:
+    """Runs inside the subprocess; prints one JSON line of results."""
+    import time
+
+    rss_start = _rss_mb()
+    start = time.perf_counter()
+    from app.services import embeddings
+
+    import_s = time.perf_counter() - start
+
+    # First encode loads the backend (and imports torch for sentence-transformers)
+    start = time.perf_counter()
+    embeddings.generate_embedding_array("warmup", use_cache=False)
+    load_s = time.perf_counter() - start
+    rss_loaded = _rss_mb()
+
+    latencies = []
+    for i in range(queries):
+        text = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]
+        start = time.perf_counter()
+        embeddings.generate_embedding_array(text, use_cache=False)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    embeddings.generate_embeddings(SAMPLE_QUERIES * 8)
+    batch_s = time.perf_counter() - start
+
+    np.save(vectors_path, np.vstack([embeddings.generate_embedding_array(q, use_cache=False) for q in SAMPLE_QUERIES]))
+    lat = np.array(latencies) * 1000
+    print(json.dumps({
+        "import_s": round(import_s, 3),
+        "load_s": round(load_s, 3),
+        "rss_mb": round(rss_loaded, 1),
+        "rss_delta_mb": round(rss_loaded - rss_start, 1),
+        "torch_imported": "torch" in sys.modules,
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+        "batch_texts_per_s": round(len(SAMPLE_QUERIES) * 8 / batch_s, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--queries", type=int, default=200, help="Single-query encodes to time")
+    parser.add_argument("--_child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._child:
+        _measure(args.queries, args._child)
+        return
+
+    print(f"{'─' * 50}")
+    print("⏱  Embedding backend benchmark")
+    print(f"{'─' * 50}")
+
+    results: dict[str, dict] = {}
+    vectors: dict[str, np.ndarray] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            path = os.path.join(tmp, f"{backend}.npy")
+            env = {**os.environ, "EMBEDDING_BACKEND": backend}
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.embedding_backends", "--queries", str(args.queries), "--_child", path],
+                env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"  ✗ {backend}: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}")
+                continue
+            results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+            vectors[backend] = np.load(path)
+            r = results[backend]
+            print(f"\n  ✓ {backend}")
+            print(f"    import          : {r['import_s']:.3f}s (torch imported: {r['torch_imported']})")
+            print(f"    model load      : {r['load_s']:.3f}s")
+            print(f"    RSS             : {r['rss_mb']:.0f} MB (+{r['rss_delta_mb']:.0f} MB)")
+            print(f"    query latency   : p50 {r['p50_ms']:.2f}ms  p95 {r['p95_ms']:.2f}ms")
+            print(f"    batch throughput: {r['batch_texts_per_s']:.0f} texts/s")
+
+    if len(vectors) > 1:
+        (a_name, a), (b_name, b) = list(vectors.items())[:2]
+        if a.shape != b.shape:
+            print(f"\n  ✗ {a_name} vs {b_name}: dimension mismatch {a.shape} vs {b.shape}")
+            return
+        cos = np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+        mark = "✓" if cos.min() >= 0.99 else "✗"
+        print(f"\n  {mark} {a_name} vs {b_name}: cosine min {cos.min():.4f}, mean {cos.mean():.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Microbenchmarks for the ingestion and retrieval hot paths: text chunking,
+PDF cleanup, query/batch embedding, pgvector literal formatting and
+retrieval on each backend (in-process matrix, BM25, pgvector).
+
+Inputs are the shipped portfolio data and resume, plus a synthetic corpus
+of --docs random unit vectors for the index benchmarks, so runs are
+repeatable. Benchmarks whose dependencies aren't available (no embedding
+model, no database) are reported as skipped.
+
+Usage (from backend/):
+    python -m benchmarks.micro
+    python -m benchmarks.micro --only chunk pdf --repeat 500
+    python -m benchmarks.micro --save-baseline        # record benchmarks/baseline.json
+    python -m benchmarks.micro --tolerance 0.15       # compare against it
+"""
+
+import argparse
+import gc
+import sys
+import time
+
+import numpy as np
+
+from ._report import DEFAULT_BASELINE, compare, load_baseline, percentiles, save_baseline
+
+DATA_TXT = "app/data/portfolio_data.txt"
+DATA_PDF = "app/data/Aman-Paswan-Resume.pdf"
+EMBEDDING_DIMENSIONS = 384
+
+SAMPLE_QUERIES = [
+    "What projects has Aman worked on?",
+    "Which programming languages does he know?",
+    "Tell me about his experience with FastAPI and PostgreSQL.",
+    "Has he built anything with machine learning or RAG?",
+]
+
+
+def _time(fn, repeat: int, items: int = 1) -> dict:
+    """Call *fn* *repeat* times; per-call latency percentiles (µs) and items/s."""
+    fn()  # warm-up: lazy imports, caches, compiled regexes
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    p = percentiles(samples, scale=1e6)
+    return {
+        "p50_us": p["p50"],
+        "p95_us": p["p95"],
+        "p99_us": p["p99"],
+        "items_per_s": round(items * len(samples) / sum(samples), 1),
+    }
+
+
+def _raw_pdf_text() -> str:
+    """Resume text as pypdf extracts it, before any cleanup."""
+    from pypdf import PdfReader
+
+    return "\n\n".join(page.extract_text() or "" for page in PdfReader(DATA_PDF).pages)
+
+
+def _unit_vectors(n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, EMBEDDING_DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# ── Benchmarks (each returns {name: metrics}) ─────────────────────────────
+def bench_chunk(args) -> dict:
+    from app.services.text_chunker import chunk_text
+
+    with open(DATA_TXT, encoding="utf-8") as f:
+        text = f.read()
+    # A document ~25× the portfolio file shows how chunking scales with input size
+    large = "\n\n".join([text] * 25)
+    return {
+        "chunk_text": _time(lambda: chunk_text(text), args.repeat),
+        "chunk_text_100kb": _time(lambda: chunk_text(large), max(args.repeat // 10, 5)),
+    }
+
+
+def bench_pdf(args) -> dict:
+    from app.services.pdf_loader import _clean_pdf_symbols, _fix_spaced_chars
+
+    raw = _raw_pdf_text()
+    fixed = _fix_spaced_chars(raw)
+    return {
+        "fix_spaced_chars": _time(lambda: _fix_spaced_chars(raw), args.repeat),
+        "clean_pdf_symbols": _time(lambda: _clean_pdf_symbols(fixed), args.repeat),
+    }
+
+
+def bench_embedding(args) -> dict:
+    from app.services.embeddings import generate_embedding, generate_embeddings
+
+    batch = SAMPLE_QUERIES * 8
+    queries = iter(range(sys.maxsize))
+    return {
+        "generate_embedding": _time(
+            lambda: generate_embedding(SAMPLE_QUERIES[next(queries) % len(SAMPLE_QUERIES)], use_cache=False),
+            args.repeat,
+        ),
+        f"generate_embeddings_x{len(batch)}": _time(
+            lambda: generate_embeddings(batch), max(args.repeat // 10, 5), items=len(batch)
+        ),
+    }
+
+
+def bench_vec_literal(args) -> dict:
+    from app.services.vector_store import _vec_literal
+
+    embedding = _unit_vectors(1, seed=1)[0].tolist()
+    return {"vec_literal": _time(lambda: _vec_literal(embedding), args.repeat)}
+
+
+def bench_memory_index(args) -> dict:
+    from app.services.memory_index import InMemoryVectorIndex
+
+    index = InMemoryVectorIndex()
+    vectors = _unit_vectors(args.docs, seed=2)
+    index.replace((f"c{i}", f"chunk {i}", vectors[i], "bench") for i in range(args.docs))
+    query = _unit_vectors(1, seed=3)
+    return {f"memory_index_search_{args.docs}": _time(lambda: index.search(query, 8), args.repeat)}
+
+
+def bench_bm25(args) -> dict:
+    from app.services.bm25_index import BM25Index
+    from app.services.text_chunker import chunk_text
+
+    with open(DATA_TXT, encoding="utf-8") as f:
+        chunks = chunk_text(f.read())
+    rows = [(f"c{i}", chunks[i % len(chunks)], "bench") for i in range(args.docs)]
+    index = BM25Index()
+    results = {f"bm25_build_{args.docs}": _time(lambda: index.replace(rows), max(args.repeat // 20, 3))}
+    queries = iter(range(sys.maxsize))
+    results[f"bm25_search_{args.docs}"] = _time(
+        lambda: index.search(SAMPLE_QUERIES[next(queries) % len(SAMPLE_QUERIES)], 20), args.repeat
+    )
+    return results
+
+
+def bench_pgvector(args) -> dict:
+    """Search the configured database's document_embeddings (one round trip per call)."""
+    from app.config import settings
+    from app.services import vector_store
+
+    settings.VECTOR_STORE_BACKEND = "pgvector"
+    if vector_store.count() == 0:
+        raise RuntimeError("document_embeddings is empty (run a loader first)")
+    one = _unit_vectors(1, seed=4).tolist()
+    four = _unit_vectors(4, seed=5).tolist()
+    return {
+        "pgvector_search": _time(lambda: vector_store.search_chunks(one, 8), args.repeat),
+        "pgvector_search_x4": _time(lambda: vector_store.search_chunks(four, 8), args.repeat, items=4),
+    }
+
+
+BENCHMARKS = {
+    "chunk": bench_chunk,
+    "pdf": bench_pdf,
+    "embedding": bench_embedding,
+    "vec_literal": bench_vec_literal,
+    "memory_index": bench_memory_index,
+    "bm25": bench_bm25,
+    "pgvector": bench_pgvector,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run only these groups")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed calls per benchmark")
+    parser.add_argument("--docs", type=int, default=5000, help="Synthetic corpus size for index benchmarks")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    print(f"{'─' * 50}")
+    print("⏱  Microbenchmarks")
+    print(f"{'─' * 50}")
+
+    results: dict[str, dict] = {}
+    for group in args.only or BENCHMARKS:
+        try:
+            group_results = BENCHMARKS[group](args)
+        except Exception as e:
+            print(f"  ✗ {group}: skipped ({e})")
+            continue
+        for name, r in group_results.items():
+            print(
+                f"  ✓ {name:<28} p50 {r['p50_us']:>10.1f}µs  p95 {r['p95_us']:>10.1f}µs  "
+                f"p99 {r['p99_us']:>10.1f}µs  {r['items_per_s']:>12.1f}/s"
+            )
+        results.update(group_results)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, "micro", results)
+        print(f"\n  ✓ Baseline saved to {args.baseline}")
+        return
+
+    baseline = load_baseline(args.baseline, "micro")
+    if not baseline:
+        print(f"\n  (no baseline at {args.baseline}; record one with --save-baseline)")
+        return
+    print(f"\n{'─' * 50}")
+    print(f"Compared with {args.baseline} (tolerance {args.tolerance:.0%})")
+    print(f"{'─' * 50}")
+    # Tail percentiles of µs-scale calls are too noisy to gate on
+    regressions = compare(results, baseline, ("p50_us", "items_per_s"), args.tolerance)
+    print(f"\n  {'✗' if regressions else '✓'} {regressions} regression(s)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
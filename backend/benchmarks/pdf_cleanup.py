@@ -0,0 +1,217 @@
+"""
+Golden-output check and throughput benchmark for the PDF cleanup pipeline.
+
+The pre-optimisation `_fix_spaced_chars` / `_clean_pdf_symbols` are kept
+below verbatim as the reference. Every input is cleaned by both and the
+outputs must be byte-identical:
+
+  * each page of the shipped resume and of any PDFs given on the command line
+  * hand-written edge cases (runs ending in a word, icon residue, glyphs …)
+  * --fuzz random strings built from the characters the patterns care about
+
+It then times both on the same pages and on a spaced-out page (the old
+fixed-point loop always rescans the whole text once more), and compares
+serial and process-pool extraction of the given PDFs. Exits 1 on any
+mismatch.
+
+Usage (from backend/):
+    python -m benchmarks.pdf_cleanup
+    python -m benchmarks.pdf_cleanup reports/*.pdf --fuzz 20000 --workers 4
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+
+from app.services.pdf_loader import _clean_pdf_symbols, _fix_spaced_chars, clean_page, extract_text_from_pdf
+
+DATA_PDF = "app/data/Aman-Paswan-Resume.pdf"
+
+
+# ── Reference implementation (before the single-pass rewrite) ─────────────
+def _legacy_fix_spaced_chars(text: str) -> str:
+    pattern = re.compile(
+        r'(?<!\w)'
+        r'([A-Za-z0-9])'
+        r'(?: ([A-Za-z0-9]))'
+        r'(?: ([A-Za-z0-9]))+'
+        r'(?!\w)'
+    )
+
+    def _collapse(m: re.Match) -> str:
+        return m.group(0).replace(' ', '')
+
+    prev = None
+    while prev != text:
+        prev = text
+        text = pattern.sub(_collapse, text)
+
+    return text
+
+
+def _legacy_clean_pdf_symbols(text: str) -> str:
+    text = re.sub(r'/[a-z][a-z0-9\-]+\b', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'[^\x00-\x7F\u00A0-\u024F\u2013\u2014\u2018\u2019\u201C\u201D\u2022\u2026\u20B9]', '', text)
+    text = re.sub(r'[⌢♂¶▪◦●◆■□▶►]', '', text)
+    text = re.sub(r'\b(mobile-alt|envelope|alt)\b', '', text, flags=re.IGNORECASE)
+    text = re.sub(r' {2,}', ' ', text)
+    lines = text.splitlines()
+    cleaned_lines = []
+    for line in lines:
+        stripped = line.strip()
+        if len(re.sub(r'[^A-Za-z0-9]', '', stripped)) >= 2:
+            cleaned_lines.append(stripped)
+        elif stripped == '':
+            cleaned_lines.append('')
+    text = '\n'.join(cleaned_lines)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def _legacy_clean_page(page_text: str) -> str:
+    return _legacy_clean_pdf_symbols(_legacy_fix_spaced_chars(page_text.strip()))
+
+
+# ── Inputs ─────────────────────────────────────────────────────────────────
+EDGE_CASES = [
+    "N a x c u r e is a project",
+    "a b",
+    "a b c",
+    "a b cd",
+    "a b c d_",
+    "xa b c d",
+    "a b c-d e f",
+    "a b c é",
+    "é a b c",
+    "_a b c",
+    "a  b  c",
+    "A B C 1 2 3",
+    "a b c\nd e f\n\n\n\ng h i",
+    "/envel⌢pe aman@example.com ♂¶obile-alt +91 99999",
+    "/linkedin /github /ENVELOPE mobile-alt alt Alt altitude",
+    "₹ 5,000 — “quoted” ‘single’ • bullet … end",
+    " a b c ",
+    "x\n\n\n\n\ny",
+    "   \n ¶ \n  ab  \n",
+    "/a-b-c d e f",
+]
+
+_FUZZ_ALPHABET = (
+    list("abcXYZ019") * 4
+    + [" "] * 12
+    + list("_-/\n\t.,é²") + ["\u00a0", "\uf0e0", "\u2322", "\u2642", "\u00b6", "\u25cf", "\u20b9", "\u2014"]
+    + ["alt", "envelope", "mobile-alt", "/github", "/linkedin", "  "]
+)
+
+
+def _fuzz_inputs(n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_FUZZ_ALPHABET) for _ in range(rng.randint(1, 60))) for _ in range(n)]
+
+
+def _raw_pages(path: str) -> list[str]:
+    """Page texts as pypdf extracts them, before any cleanup."""
+    from pypdf import PdfReader
+
+    return [page.extract_text() or "" for page in PdfReader(path).pages]
+
+
+# ── Checks ─────────────────────────────────────────────────────────────────
+def _check(label: str, inputs: list[str]) -> int:
+    """Compare both pipelines (and each step) on *inputs*; returns the number of mismatches."""
+    mismatches = 0
+    for text in inputs:
+        pairs = (
+            ("fix_spaced_chars", _legacy_fix_spaced_chars(text), _fix_spaced_chars(text)),
+            ("clean_pdf_symbols", _legacy_clean_pdf_symbols(text), _clean_pdf_symbols(text)),
+            ("clean_page", _legacy_clean_page(text), clean_page(text)),
+        )
+        for step, expected, got in pairs:
+            if expected != got:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"    ✗ {step}({text!r}):\n        expected {expected!r}\n        got      {got!r}")
+    mark = "✓" if mismatches == 0 else "✗"
+    print(f"  {mark} {label:<28}: {len(inputs):>6} inputs, {mismatches} mismatches")
+    return mismatches
+
+
+def _time(fn, inputs: list[str], min_seconds: float = 0.5) -> float:
+    """Throughput of *fn* over *inputs* in characters per second."""
+    chars = sum(map(len, inputs))
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        for text in inputs:
+            fn(text)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return chars * rounds / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="Extra PDFs to check (the resume is always included)")
+    parser.add_argument("--fuzz", type=int, default=5000, help="Random inputs to compare")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0, help="Pool size for the extraction run (0 = one per CPU)")
+    args = parser.parse_args()
+
+    print(f"{'─' * 50}")
+    print("📄 PDF cleanup: golden-output check")
+    print(f"{'─' * 50}")
+
+    pages: list[str] = []
+    mismatches = 0
+    for path in [DATA_PDF, *args.pdfs]:
+        doc_pages = _raw_pages(path)
+        pages += doc_pages
+        mismatches += _check(f"{path.rsplit('/', 1)[-1]} ({len(doc_pages)} pages)", doc_pages)
+    mismatches += _check("edge cases", EDGE_CASES)
+    mismatches += _check(f"fuzz (seed {args.seed})", _fuzz_inputs(args.fuzz, args.seed))
+
+    # The parallel pipeline must give the same document as cleaning pages one by one
+    for path in [DATA_PDF, *args.pdfs]:
+        expected = "\n\n".join(c for c in (_legacy_clean_page(p) for p in _raw_pages(path) if p) if c)
+        got = extract_text_from_pdf(path, workers=args.workers)
+        ok = expected == got
+        mismatches += not ok
+        print(f"  {'✓' if ok else '✗'} extract_text_from_pdf      : {path.rsplit('/', 1)[-1]}")
+
+    print(f"\n{'─' * 50}")
+    print("⏱  Throughput (characters/s)")
+    print(f"{'─' * 50}")
+    old = _time(_legacy_clean_page, pages)
+    new = _time(clean_page, pages)
+    print(f"  pages            : old {old:>12,.0f}  new {new:>12,.0f}  ({new / old:.1f}×)")
+
+    # A page whose font extracts every character spaced out
+    spaced = ["\n".join(f"{' '.join('Naxcure')} | {' '.join('FastAPI')} 2 0 2 4" for _ in range(500))]
+    old = _time(_legacy_fix_spaced_chars, spaced)
+    new = _time(_fix_spaced_chars, spaced)
+    print(f"  spaced-out page  : old {old:>12,.0f}  new {new:>12,.0f}  ({new / old:.1f}×)")
+
+    if args.pdfs:
+        print(f"\n{'─' * 50}")
+        print(f"⏱  Extraction (pages/s, --workers {args.workers})")
+        print(f"{'─' * 50}")
+    for path in args.pdfs:
+        start = time.perf_counter()
+        extract_text_from_pdf(path, workers=1)
+        serial = time.perf_counter() - start
+        start = time.perf_counter()
+        extract_text_from_pdf(path, workers=args.workers)
+        parallel = time.perf_counter() - start
+        n = len(_raw_pages(path))
+        print(f"  {path.rsplit('/', 1)[-1]:<17}: serial {n / serial:,.1f}  pool {n / parallel:,.1f}  "
+              f"({serial / parallel:.1f}×)")
+
+    print(f"\n  {'✗' if mismatches else '✓'} {mismatches} mismatch(es)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Stand-in for OpenRouter's streaming chat-completions endpoint, for load
+tests that shouldn't depend on (or pay for) a real model.
+
+Every request streams --tokens deltas in the OpenAI SSE format: the first
+after --ttft-ms, then one every --token-ms, followed by `data: [DONE]`.
+Point the backend at it with OPENROUTER_BASE_URL=http://127.0.0.1:<port>/v1
+(`benchmarks.chat_load --spawn` does this for you).
+
+Usage (from backend/):
+    python -m benchmarks.stub_llm --port 8765 --ttft-ms 300 --tokens 120 --token-ms 15
+"""
+
+import argparse
+import asyncio
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Stub LLM")
+
+# Overridden from the command line
+config = {"ttft_ms": 300.0, "tokens": 120, "token_ms": 15.0}
+
+
+def _frame(content: str, model: str) -> str:
+    return f"data: {json.dumps({'model': model, 'choices': [{'index': 0, 'delta': {'content': content}}]})}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+
+    async def stream():
+        await asyncio.sleep(config["ttft_ms"] / 1000)
+        for i in range(config["tokens"]):
+            if i:
+                await asyncio.sleep(config["token_ms"] / 1000)
+            yield _frame(f"token{i} ", model)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=config["ttft_ms"], help="Delay before the first token")
+    parser.add_argument("--tokens", type=int, default=config["tokens"], help="Deltas per answer")
+    parser.add_argument("--token-ms", type=float, default=config["token_ms"], help="Delay between deltas")
+    args = parser.parse_args()
+    config.update(ttft_ms=args.ttft_ms, tokens=args.tokens, token_ms=args.token_ms)
+
+    import uvicorn
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -53,17 +53,29 @@ export function ChatProvider({ children }: { children: ReactNode }) {
             if (!reader) throw new Error('No reader available');
 
             let assistantText = '';
+            let pending = ''; // partial line carried over between reads
+            let eventName = ''; // named events (e.g. the final "timing" event) aren't answer text
             setMessages((prev) => [...prev, { role: 'assistant', text: '' }]);
 
             while (true) {
                 const { done, value } = await reader.read();
                 if (done) break;
 
-                const chunk = decoder.decode(value, { stream: true });
-                const lines = chunk.split('\n');
+                // Coalesced frames can span network reads: only parse complete lines.
+                pending += decoder.decode(value, { stream: true });
+                const lines = pending.split('\n');
+                pending = lines.pop() ?? '';
 
                 for (const line of lines) {
-                    if (!line.startsWith('data:')) continue;
+                    if (line === '' || line === '\r') {
+                        eventName = ''; // blank line ends the event
+                        continue;
+                    }
+                    if (line.startsWith('event:')) {
+                        eventName = line.slice(6).trim();
+                        continue;
+                    }
+                    if (!line.startsWith('data:') || (eventName && eventName !== 'message')) continue;
 
                     // Remove the "data:" prefix and the single SSE protocol space.
                     // Strip trailing \r because sse_starlette sends CRLF (\r\n) line endings;